@@ -17,20 +17,22 @@
 #
 #  Last modified: 2021.07.31 at 15:54:28 CEST
 
+from concurrent.futures import ThreadPoolExecutor
 from importlib import import_module, reload
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
-import paho.mqtt.client as mqtt
 from googletrans import Translator
 from langdetect import detect
 
 from core.asr.model import Asr
 from core.asr.model.ASRResult import ASRResult
+from core.asr.model.AsrSession import AsrSession
 from core.asr.model.Recorder import Recorder
 from core.base.model.Manager import Manager
 from core.commons import constants
 from core.dialog.model.DialogSession import DialogSession
+from core.server.model.AudioFrame import AudioFrame
 
 
 class ASRManager(Manager):
@@ -43,21 +45,45 @@ class ASRManager(Manager):
 		self._streams: Dict[str, Recorder] = dict()
 		self._translator = Translator()
 		self._usingFallback = False
+		self._decoderPool: Optional[ThreadPoolExecutor] = None
 
 
 	def onStart(self):
 		super().onStart()
 		self._startASREngine()
+		self._startDecoderPool()
+		self.AudioServer.subscribeAudioFrames(deviceUid=None, callback=self.feedAudioFrame)
 
 
 	def onStop(self):
+		self.AudioServer.unsubscribeAudioFrames(callback=self.feedAudioFrame)
+
 		if self._asr:
 			self._asr.onStop()
 
+		if self._decoderPool:
+			self._decoderPool.shutdown(wait=False)
+			self._decoderPool = None
+
 
 	def restartEngine(self):
 		self._asr.onStop()
 		self._startASREngine()
+		self._startDecoderPool()
+		self.AudioServer.updateAudioFrameFormat()
+
+
+	def _startDecoderPool(self):
+		"""
+		Sessions are decoded on a pool sized by what the engine can handle at once. Sessions
+		beyond that wait for a free worker, their audio being recorded in the meantime
+		:return:
+		"""
+		if self._decoderPool:
+			self._decoderPool.shutdown(wait=False)
+
+		workers = self._asr.MAX_SESSIONS if self._asr else 1
+		self._decoderPool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='asrDecoder')
 
 
 	def _startASREngine(self, forceAsr=None):
@@ -143,7 +169,8 @@ class ASRManager(Manager):
 
 	def onStartListening(self, session: DialogSession):
 		self._asr.onStartListening(session)
-		self.ThreadManager.newThread(name=f'streamdecode_{session.deviceUid}', target=self.decodeStream, args=[session])
+		asrSession = self._asr.newSession(session)
+		self._decoderPool.submit(self.decodeStream, asrSession)
 
 
 	def onStopListening(self, session: DialogSession):
@@ -157,8 +184,16 @@ class ASRManager(Manager):
 		self.logDebug(f'Capturing {text}')
 
 
-	def decodeStream(self, session: DialogSession):
-		result: ASRResult = self._asr.decodeStream(session)
+	def decodeStream(self, asrSession: AsrSession):
+		session = asrSession.session
+		result: Optional[ASRResult] = None
+		try:
+			self._asr.beginDecoding(asrSession)
+			result = self._asr.decodeStream(asrSession)
+		except Exception as e:
+			self.logError(f'Error decoding speech on device **{session.deviceUid}**: {e}')
+		finally:
+			self._asr.closeSession(asrSession)
 
 		if result and result.text:
 			if session.hasEnded:
@@ -184,11 +219,11 @@ class ASRManager(Manager):
 			self.MqttManager.endSession(sessionId=session.sessionId)
 
 
-	def onAudioFrame(self, message: mqtt.MQTTMessage, deviceUid: str):
+	def feedAudioFrame(self, frame: AudioFrame, deviceUid: str):
 		if deviceUid not in self._streams or not self._streams[deviceUid].isRecording:
 			return
 
-		self._streams[deviceUid].onAudioFrame(message, deviceUid)
+		self._streams[deviceUid].feedAudioFrame(frame, deviceUid)
 
 
 	def onSessionError(self, session: DialogSession):
@@ -203,7 +238,10 @@ class ASRManager(Manager):
 		if not self._asr or session.deviceUid not in self._streams or not self._streams[session.deviceUid].isRecording:
 			return
 
-		self._asr.end()
+		asrSession = self._asr.getSession(session.deviceUid)
+		if asrSession:
+			self._asr.end(asrSession)
+
 		self._streams.pop(session.deviceUid, None)
 
 
@@ -211,14 +249,14 @@ class ASRManager(Manager):
 		if not self._asr or deviceUid not in self._streams or not self._streams[deviceUid].isRecording:
 			return
 
-		self._asr.onVadUp()
+		self._asr.onVadUp(deviceUid)
 
 
 	def onVadDown(self, deviceUid: str):
 		if not self._asr or deviceUid not in self._streams or not self._streams[deviceUid].isRecording:
 			return
 
-		self._asr.onVadDown()
+		self._asr.onVadDown(deviceUid)
 
 
 	def addRecorder(self, deviceUid: str, recorder: Recorder):
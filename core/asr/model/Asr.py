@@ -18,28 +18,30 @@
 #  Last modified: 2021.04.13 at 12:56:45 CEST
 
 import json
-import threading
+import queue
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 
-from core.asr.model.Recorder import Recorder
+from core.asr.model.ASRResult import ASRResult
+from core.asr.model.AsrSession import AsrSession
+from core.asr.model.Endpointer import Endpointer, VadEndpointer
+from core.asr.model.StreamingDecoder import StreamingDecoder
 from core.base.model.ProjectAliceObject import ProjectAliceObject
 from core.commons import constants
 from core.dialog.model.DialogSession import DialogSession
-from core.util.model.AliceEvent import AliceEvent
 
 
 class Asr(ProjectAliceObject):
 	NAME = 'Generic Asr'
 	DEPENDENCIES = dict()
+	MAX_SESSIONS = 4  # How many devices can be decoded at the same time
 
 
 	def __init__(self):
 		self._capableOfArbitraryCapture = False
 		self._isOnlineASR = False
-		self._timeout: AliceEvent = self.ThreadManager.newEvent('asrTimeout')
-		self._timeoutTimer: Optional[threading.Timer] = None
-		self._recorder: Optional[Recorder] = None
+		self._sessions: Dict[str, AsrSession] = dict()
+		self._decoders = queue.LifoQueue()
 		super().__init__()
 
 
@@ -59,7 +61,11 @@ class Asr(ProjectAliceObject):
 
 	def onStop(self):
 		self.logInfo(f'Stopping {self.NAME}')
-		self._timeout.set()
+		for asrSession in list(self._sessions.values()):
+			asrSession.timeoutFlag.set()
+
+		while not self._decoders.empty():
+			self._decoders.get_nowait()
 
 
 	def decodeFile(self, filepath: Path, session: DialogSession):
@@ -67,22 +73,112 @@ class Asr(ProjectAliceObject):
 		pass
 
 
-	def decodeStream(self, session: DialogSession):
-		self._timeout.clear()
-		self._timeoutTimer = self.ThreadManager.newTimer(interval=int(self.ConfigManager.getAliceConfigByName('asrTimeout')), func=self.timeout)
+	def newSession(self, session: DialogSession) -> AsrSession:
+		"""
+		Starts recording for the device right away, decoding might have to wait for a free decoder worker
+		:param session:
+		:return:
+		"""
+		asrSession = AsrSession(session, endpointer=self.newEndpointer())
+		self._sessions[session.deviceUid] = asrSession
+		self.ASRManager.addRecorder(session.deviceUid, asrSession.recorder)
+		asrSession.recorder.startRecording()
+		return asrSession
+
+
+	def beginDecoding(self, asrSession: AsrSession):
+		"""
+		Called by the decoding worker taking the session. The timeout runs from there, time spent waiting for a free worker doesn't count
+		:param asrSession:
+		:return:
+		"""
+		asrSession.timeoutTimer = self.ThreadManager.newTimer(interval=int(self.ConfigManager.getAliceConfigByName('asrTimeout')), func=self.timeout, args=[asrSession])
+
+
+	def newEndpointer(self) -> Optional[Endpointer]:
+		"""
+		The endpointer ending the recording once the user stopped talking. Engines detecting the end of speech
+		themselves can return None
+		:return:
+		"""
+		if not self.ConfigManager.getAliceConfigByName('asrEndpointing'):
+			return None
+
+		return VadEndpointer(
+			sampleRate=self.AudioServer.SAMPLERATE,
+			hangover=int(self.ConfigManager.getAliceConfigByName('asrEndpointHangover')),
+			maxUtterance=int(self.ConfigManager.getAliceConfigByName('asrMaxUtterance')) * 1000
+		)
+
+
+	def getSession(self, deviceUid: str) -> Optional[AsrSession]:
+		return self._sessions.get(deviceUid, None)
+
+
+	def closeSession(self, asrSession: AsrSession):
+		"""
+		Called by the decoding worker once done, gives the decoder back to the pool
+		:param asrSession:
+		:return:
+		"""
+		self.end(asrSession)
+
+		if asrSession.decoder is not None:
+			self.releaseDecoder(asrSession.decoder)
+			asrSession.decoder = None
+
+		if self._sessions.get(asrSession.deviceUid) is asrSession:
+			self._sessions.pop(asrSession.deviceUid, None)
+
+
+	def decodeStream(self, asrSession: AsrSession) -> Optional[ASRResult]:
+		pass
 
 
-	def end(self):
-		self._recorder.stopRecording()
-		if self._timeoutTimer and self._timeoutTimer.is_alive():
-			self._timeoutTimer.cancel()
+	def end(self, asrSession: AsrSession):
+		asrSession.recorder.stopRecording()
+		if asrSession.timeoutTimer and asrSession.timeoutTimer.is_alive():
+			asrSession.timeoutTimer.cancel()
 
 
-	def timeout(self):
-		self._timeout.set()
+	def timeout(self, asrSession: AsrSession):
+		asrSession.timeoutFlag.set()
 		self.logWarning('Asr timed out')
 
 
+	def newDecoder(self) -> Any:
+		"""
+		Engines keeping a decoding state override this. Decoders are pooled and reused across sessions
+		:return:
+		"""
+		return None
+
+
+	def acquireDecoder(self) -> Any:
+		try:
+			return self._decoders.get_nowait()
+		except queue.Empty:
+			return self.newDecoder()
+
+
+	def releaseDecoder(self, decoder: Any):
+		# Sessions still decoding on a replaced worker pool can bring back more decoders than the workers can use
+		if self._decoders.qsize() >= self.MAX_SESSIONS:
+			return
+
+		self._decoders.put(decoder)
+
+
+	def onVadUp(self, deviceUid: str):
+		asrSession = self.getSession(deviceUid)
+		if asrSession:
+			asrSession.triggerFlag.set()
+
+
+	def onVadDown(self, deviceUid: str):
+		pass
+
+
 	def checkLanguage(self) -> bool:
 		return True
 
@@ -95,6 +191,24 @@ class Asr(ProjectAliceObject):
 		pass  # Superseeded
 
 
+	def newStreamingDecoder(self, feed: Callable, intermediate: Callable, finish: Callable) -> StreamingDecoder:
+		"""
+		Wraps the stream of a local streaming decoder, with the partial result cadence and early endpointing from the config
+		:param feed: feeds int16 samples to the stream
+		:param intermediate: returns the stream's current transcript
+		:param finish: closes the stream and returns the final transcript
+		:return:
+		"""
+		return StreamingDecoder(
+			feed=feed,
+			intermediate=intermediate,
+			finish=finish,
+			partialInterval=int(self.ConfigManager.getAliceConfigByName('asrPartialInterval')),
+			stableDecodes=int(self.ConfigManager.getAliceConfigByName('asrStableEndpoint')),
+			sampleRate=self.AudioServer.SAMPLERATE
+		)
+
+
 	def partialTextCaptured(self, session: DialogSession, text: str, likelihood: float, seconds: float):
 		self.MqttManager.publish(constants.TOPIC_PARTIAL_TEXT_CAPTURED, json.dumps({
 			'text'      : text,
@@ -0,0 +1,55 @@
+#  Copyright (c) 2021
+#
+#  This file, AsrSession.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import threading
+from typing import Any, Optional
+
+from core.asr.model.Endpointer import Endpointer
+from core.asr.model.Recorder import Recorder
+from core.dialog.model.DialogSession import DialogSession
+from core.util.model.AliceEvent import AliceEvent
+from core.util.model.ThreadTimer import ThreadTimer
+
+
+class AsrSession(object):
+	"""
+	What one device needs to get its speech decoded. Every device listening gets its own,
+	so that sessions on different devices never share a recorder, a timeout or a decoder
+	"""
+
+	def __init__(self, session: DialogSession, endpointer: Optional[Endpointer] = None):
+		self.session = session
+		self.timeoutFlag = AliceEvent('asrTimeout')
+		self.timeoutTimer: Optional[ThreadTimer] = None
+		self.triggerFlag = threading.Event()
+		self.recorder = Recorder(self.timeoutFlag, session.user, session.deviceUid, endpointer)
+		self.decoder: Any = None  # Engine specific, borrowed from the engine decoder pool for the session's lifetime
+		self.previousCapture = ''
+		self.lastResultCheck = 0
+
+
+	@property
+	def deviceUid(self) -> str:
+		return self.session.deviceUid
+
+
+	@property
+	def endOfSpeech(self) -> bool:
+		return self.recorder.endOfSpeech
@@ -17,13 +17,12 @@
 #
 #  Last modified: 2021.04.13 at 12:56:45 CEST
 
-import numpy as np
 from pathlib import Path
 from typing import Generator, Optional
 
 from core.asr.model.ASRResult import ASRResult
 from core.asr.model.Asr import Asr
-from core.asr.model.Recorder import Recorder
+from core.asr.model.AsrSession import AsrSession
 from core.dialog.model.DialogSession import DialogSession
 from core.util.Stopwatch import Stopwatch
 
@@ -36,6 +35,7 @@ except:
 
 class CoquiAsr(Asr):
 	NAME = 'Coqui Asr'
+	MAX_SESSIONS = 2  # Streams share the model but each one keeps a core busy
 	DEPENDENCIES = {
 		'system': [],
 		'pip'   : {
@@ -52,7 +52,6 @@ class CoquiAsr(Asr):
 		self._langPath = Path(self.Commons.rootDir(), f'trained/asr/coqui/{self.LanguageManager.activeLanguage}')
 
 		self._model: Optional[stt.Model] = None
-		self._triggerFlag = self.ThreadManager.newEvent('asrTriggerFlag')
 
 
 	def onStart(self):
@@ -126,48 +125,42 @@ class CoquiAsr(Asr):
 			return False
 
 
-	def onVadUp(self):
-		self._triggerFlag.set()
-
-
-	def onVadDown(self):
-		if not self._triggerFlag.is_set():
+	def onVadDown(self, deviceUid: str):
+		asrSession = self.getSession(deviceUid)
+		if not asrSession or not asrSession.triggerFlag.is_set():
 			return
 
-		self._recorder.stopRecording()
+		asrSession.recorder.stopRecording()
 
 
-	def decodeStream(self, session: DialogSession) -> Optional[ASRResult]:
-		super().decodeStream(session)
-		result = None
-		previous = ''
+	def decodeStream(self, asrSession: AsrSession) -> Optional[ASRResult]:
+		session = asrSession.session
 
 		with Stopwatch() as processingTime:
-			with Recorder(self._timeout, session.user, session.deviceUid) as recorder:
-				self.ASRManager.addRecorder(session.deviceUid, recorder)
-				self._recorder = recorder
+			with asrSession.recorder as recorder:
 				streamContext = self._model.createStream()
+				decoder = self.newStreamingDecoder(feed=streamContext.feedAudioContent, intermediate=streamContext.intermediateDecode, finish=streamContext.finishStream)
 				for chunk in recorder:
 					if not chunk:
 						break
 
-					streamContext.feedAudioContent(np.frombuffer(chunk, np.int16))
+					partialText = decoder.feed(chunk)
+					if partialText:
+						self.partialTextCaptured(session=session, text=partialText, likelihood=1, seconds=0)
 
-					result = streamContext.intermediateDecode()
-					if result and result != previous:
-						previous = result
-						self.partialTextCaptured(session=session, text=result, likelihood=1, seconds=0)
+					if decoder.stable:
+						self.logDebug('Partial result is stable, ending capture')
+						break
 
-			text = streamContext.finishStream()
-			self._triggerFlag.clear()
-			self.end()
+			text = decoder.finish()
+			self.end(asrSession)
 
 		return ASRResult(
 			text=text,
 			session=session,
 			likelihood=1.0,
 			processingTime=processingTime.time
-		) if result else None
+		) if text else None
 
 
 	# noinspection DuplicatedCode
@@ -17,14 +17,13 @@
 #
 #  Last modified: 2021.04.13 at 12:56:45 CEST
 
+from functools import partial
 from pathlib import Path
 from typing import Generator, Optional
 
-import numpy as np
-
 from core.asr.model.ASRResult import ASRResult
 from core.asr.model.Asr import Asr
-from core.asr.model.Recorder import Recorder
+from core.asr.model.AsrSession import AsrSession
 from core.dialog.model.DialogSession import DialogSession
 from core.util.Stopwatch import Stopwatch
 
@@ -37,6 +36,7 @@ except:
 
 class DeepSpeechAsr(Asr):
 	NAME = 'DeepSpeech Asr'
+	MAX_SESSIONS = 2  # Streams share the model but each one keeps a core busy
 	DEPENDENCIES = {
 		'system': [],
 		'pip'   : {
@@ -53,7 +53,6 @@ class DeepSpeechAsr(Asr):
 		self._langPath = Path(self.Commons.rootDir(), f'trained/asr/deepspeech/{self.LanguageManager.activeLanguage}')
 
 		self._model: Optional[deepspeech.Model] = None
-		self._triggerFlag = self.ThreadManager.newEvent('asrTriggerFlag')
 
 
 	def onStart(self):
@@ -100,48 +99,46 @@ class DeepSpeechAsr(Asr):
 			return False
 
 
-	def onVadUp(self):
-		self._triggerFlag.set()
-
-
-	def onVadDown(self):
-		if not self._triggerFlag.is_set():
+	def onVadDown(self, deviceUid: str):
+		asrSession = self.getSession(deviceUid)
+		if not asrSession or not asrSession.triggerFlag.is_set():
 			return
 
-		self._recorder.stopRecording()
+		asrSession.recorder.stopRecording()
 
 
-	def decodeStream(self, session: DialogSession) -> Optional[ASRResult]:
-		super().decodeStream(session)
-		result = None
-		previous = ''
+	def decodeStream(self, asrSession: AsrSession) -> Optional[ASRResult]:
+		session = asrSession.session
 
 		with Stopwatch() as processingTime:
-			with Recorder(self._timeout, session.user, session.deviceUid) as recorder:
-				self.ASRManager.addRecorder(session.deviceUid, recorder)
-				self._recorder = recorder
+			with asrSession.recorder as recorder:
 				streamContext = self._model.createStream()
+				decoder = self.newStreamingDecoder(
+					feed=partial(self._model.feedAudioContent, streamContext),
+					intermediate=partial(self._model.intermediateDecode, streamContext),
+					finish=partial(self._model.finishStream, streamContext)
+				)
 				for chunk in recorder:
 					if not chunk:
 						break
 
-					self._model.feedAudioContent(streamContext, np.frombuffer(chunk, np.int16))
+					partialText = decoder.feed(chunk)
+					if partialText:
+						self.partialTextCaptured(session=session, text=partialText, likelihood=1, seconds=0)
 
-					result = self._model.intermediateDecode(streamContext)
-					if result and result != previous:
-						previous = result
-						self.partialTextCaptured(session=session, text=result, likelihood=1, seconds=0)
+					if decoder.stable:
+						self.logDebug('Partial result is stable, ending capture')
+						break
 
-			text = self._model.finishStream(streamContext)
-			self._triggerFlag.clear()
-			self.end()
+			text = decoder.finish()
+			self.end(asrSession)
 
 		return ASRResult(
 			text=text,
 			session=session,
 			likelihood=1.0,
 			processingTime=processingTime.time
-		) if result else None
+		) if text else None
 
 
 	def _checkResponses(self, session: DialogSession, responses: Generator) -> Optional[tuple]:
@@ -0,0 +1,103 @@
+#  Copyright (c) 2021
+#
+#  This file, Endpointer.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+
+from webrtcvad import Vad
+
+
+class Endpointer(object):
+	"""
+	Decides from the recorded audio when the user is done talking, so that the Asr can finalize right away
+	instead of waiting for its timeout. The base endpointer never ends anything
+	"""
+
+	def reset(self):
+		pass
+
+
+	def process(self, pcm: bytes) -> bool:
+		"""
+		Called with every recorded chunk, on the audio thread
+		:param pcm: 16 bits mono pcm
+		:return: True once the end of speech is reached
+		"""
+		return False
+
+
+class VadEndpointer(Endpointer):
+	"""
+	Voice activity based endpointer. The utterance ends once speech was heard and was followed by hangover
+	milliseconds of silence, or once it lasted maxUtterance milliseconds
+	"""
+
+	FRAME_MS = 20
+	SPEECH_START_MS = 60  # Speech needed before silence can end the utterance, so that a click or a breath does not
+
+
+	def __init__(self, sampleRate: int = 16000, aggressiveness: int = 2, hangover: int = 700, maxUtterance: int = 8000):
+		self._vad = Vad(aggressiveness)
+		self._sampleRate = sampleRate
+		self._frameBytes = sampleRate * self.FRAME_MS // 1000 * 2
+		self._hangover = hangover
+		self._maxUtterance = maxUtterance
+
+		self._pending = b''
+		self._speech = 0
+		self._silence = 0
+		self._utterance = 0
+
+
+	@property
+	def speaking(self) -> bool:
+		return self._speech >= self.SPEECH_START_MS
+
+
+	def reset(self):
+		self._pending = b''
+		self._speech = 0
+		self._silence = 0
+		self._utterance = 0
+
+
+	def process(self, pcm: bytes) -> bool:
+		data = self._pending + pcm
+		offset = 0
+		ended = False
+
+		while len(data) - offset >= self._frameBytes:
+			frame = data[offset:offset + self._frameBytes]
+			offset += self._frameBytes
+
+			if self._vad.is_speech(frame, self._sampleRate):
+				self._speech += self.FRAME_MS
+				self._silence = 0
+			elif self.speaking:
+				self._silence += self.FRAME_MS
+
+			if not self._speech:
+				continue
+
+			self._utterance += self.FRAME_MS
+			if (self.speaking and self._silence >= self._hangover) or self._utterance >= self._maxUtterance:
+				ended = True
+				break
+
+		self._pending = data[offset:]
+		return ended
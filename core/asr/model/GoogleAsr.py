@@ -25,8 +25,7 @@ from typing import Iterable, Optional
 
 from core.asr.model.ASRResult import ASRResult
 from core.asr.model.Asr import Asr
-from core.asr.model.Recorder import Recorder
-from core.dialog.model.DialogSession import DialogSession
+from core.asr.model.AsrSession import AsrSession
 from core.util.Stopwatch import Stopwatch
 
 
@@ -40,6 +39,7 @@ except:
 # noinspection PyAbstractClass
 class GoogleAsr(Asr):
 	NAME = 'Google Asr'
+	MAX_SESSIONS = 8  # Decoding happens remotely, workers mostly wait on the network
 	DEPENDENCIES = {
 		'system': [],
 		'pip'   : {
@@ -61,9 +61,6 @@ class GoogleAsr(Asr):
 			self.ConfigManager.updateAliceConfiguration(key='googleASRCredentials', value=self._credentialsFile.read_text(), doPreAndPostProcessing=False)
 
 		self._internetLostFlag = Event()  # Set if internet goes down, cut the decoding
-		self._lastResultCheck = 0  # The time the intermediate results were last checked. If actual time is greater than this value + 3, stop processing, internet issues
-
-		self._previousCapture = ''  # The text that was last captured in the iteration
 
 
 	def onStart(self):
@@ -81,26 +78,22 @@ class GoogleAsr(Asr):
 		self._streamingConfig = types.StreamingRecognitionConfig(config=config, interim_results=True)
 
 
-	def decodeStream(self, session: DialogSession) -> Optional[ASRResult]:
-		super().decodeStream(session)
-
-		recorder = Recorder(self._timeout, session.user, session.deviceUid)
-		self.ASRManager.addRecorder(session.deviceUid, recorder)
-		self._recorder = recorder
+	def decodeStream(self, asrSession: AsrSession) -> Optional[ASRResult]:
+		session = asrSession.session
 		result = None
 		with Stopwatch() as processingTime:
-			with recorder as stream:
+			with asrSession.recorder as stream:
 				audioStream = stream.audioStream()
 				# noinspection PyUnresolvedReferences
 				try:
 					requests = (types.StreamingRecognizeRequest(audio_content=content) for content in audioStream)
 					responses = self._client.streaming_recognize(self._streamingConfig, requests)
-					result = self._checkResponses(session, responses)
+					result = self._checkResponses(asrSession, responses)
 				except Exception as e:
 					self._internetLostFlag.clear()
 					self.logWarning(f'Failed ASR request: {e}')
 
-			self.end()
+			self.end(asrSession)
 
 		return ASRResult(
 			text=result[0],
@@ -114,10 +107,19 @@ class GoogleAsr(Asr):
 		self._internetLostFlag.set()
 
 
-	def _checkResponses(self, session: DialogSession, responses: Iterable) -> Optional[tuple]:
+	def _checkResponses(self, asrSession: AsrSession, responses: Iterable) -> Optional[tuple]:
+		"""
+		Reads the responses until a final one. If the same intermediate text keeps coming back
+		for more than 3 seconds, there are connectivity issues and what we have is returned
+		:param asrSession:
+		:param responses:
+		:return:
+		"""
 		if responses is None:
 			return None
 
+		session = asrSession.session
+
 		for response in responses:
 			if self._internetLostFlag.is_set():
 				self.logDebug('Internet connectivity lost during ASR decoding')
@@ -137,20 +139,20 @@ class GoogleAsr(Asr):
 
 			if result.is_final:
 				return result.alternatives[0].transcript, result.alternatives[0].confidence
-			elif result.alternatives[0].transcript != self._previousCapture:
+			elif result.alternatives[0].transcript != asrSession.previousCapture:
 				self.partialTextCaptured(session=session, text=result.alternatives[0].transcript, likelihood=result.alternatives[0].confidence, seconds=0)
-				self._previousCapture = result.alternatives[0].transcript
-			elif result.alternatives[0].transcript == self._previousCapture:
+				asrSession.previousCapture = result.alternatives[0].transcript
+			elif result.alternatives[0].transcript == asrSession.previousCapture:
 				now = int(time())
 
-				if self._lastResultCheck == 0:
-					self._lastResultCheck = 0
+				if asrSession.lastResultCheck == 0:
+					asrSession.lastResultCheck = 0
 					continue
 
-				if now > self._lastResultCheck + 3:
+				if now > asrSession.lastResultCheck + 3:
 					self.logDebug(f'Stopping process as there seems to be connectivity issues')
 					return result.alternatives[0].transcript, result.alternatives[0].confidence
 
-				self._lastResultCheck = now
+				asrSession.lastResultCheck = now
 
 		return None
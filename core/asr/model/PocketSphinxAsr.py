@@ -24,9 +24,8 @@ from typing import Optional
 
 from core.asr.model.ASRResult import ASRResult
 from core.asr.model.Asr import Asr
-from core.asr.model.Recorder import Recorder
+from core.asr.model.AsrSession import AsrSession
 from core.commons import constants
-from core.dialog.model.DialogSession import DialogSession
 from core.util.Stopwatch import Stopwatch
 
 
@@ -38,6 +37,7 @@ except:
 
 class PocketSphinxAsr(Asr):
 	NAME = 'Pocketsphinx Asr'
+	MAX_SESSIONS = 2  # Every decoder loads its own language model
 	DEPENDENCIES = {
 		'system': [
 			'swig',
@@ -59,7 +59,6 @@ class PocketSphinxAsr(Asr):
 		super().__init__()
 		self._capableOfArbitraryCapture = True
 		self._isOnlineASR = False
-		self._decoder: Optional[Decoder] = None
 		self._config = None
 
 
@@ -78,7 +77,11 @@ class PocketSphinxAsr(Asr):
 		self._config.set_string('-hmm', f'{pocketSphinxPath}/model/{self.LanguageManager.activeLanguageAndCountryCode.lower()}')
 		self._config.set_string('-lm', f'{pocketSphinxPath}/model/{self.LanguageManager.activeLanguageAndCountryCode.lower()}.lm.bin')
 		self._config.set_string('-dict', f'{pocketSphinxPath}/model/cmudict-{self.LanguageManager.activeLanguageAndCountryCode.lower()}.dict')
-		self._decoder = Decoder(self._config)
+		self.releaseDecoder(self.newDecoder())
+
+
+	def newDecoder(self) -> Decoder:
+		return Decoder(self._config)
 
 
 	def checkLanguage(self) -> bool:
@@ -94,10 +97,10 @@ class PocketSphinxAsr(Asr):
 		return True
 
 
-	def timeout(self):
-		super().timeout()
+	def timeout(self, asrSession: AsrSession):
+		super().timeout(asrSession)
 		try:
-			self._decoder.end_utt()
+			asrSession.decoder.end_utt()
 		except:
 			# If this fails we don't care, at least we tried to close the utterance
 			pass
@@ -139,41 +142,52 @@ class PocketSphinxAsr(Asr):
 		return True
 
 
-	def decodeStream(self, session: DialogSession) -> Optional[ASRResult]:
-		super().decodeStream(session)
+	def decodeStream(self, asrSession: AsrSession) -> Optional[ASRResult]:
+		session = asrSession.session
+		asrSession.decoder = decoder = self.acquireDecoder()
 
 		result = None
 		counter = 0
 		with Stopwatch() as processingTime:
-			with Recorder(self._timeout, session.user, session.deviceUid) as recorder:
-				self.ASRManager.addRecorder(session.deviceUid, recorder)
-				self._recorder = recorder
-				self._decoder.start_utt()
+			with asrSession.recorder as recorder:
+				decoder.start_utt()
 				inSpeech = False
+				ended = False
 				for chunk in recorder:
-					if self._timeout.is_set():
+					if asrSession.timeoutFlag.is_set():
 						break
 
-					self._decoder.process_raw(chunk, False, False)
-					hypothesis = self._decoder.hyp()
+					decoder.process_raw(chunk, False, False)
+					hypothesis = decoder.hyp()
 					if hypothesis:
 						counter += 1
 						if counter == 10:
 							self.partialTextCaptured(session, hypothesis.hypstr, hypothesis.prob, processingTime.time)
 							counter = 0
-					if self._decoder.get_in_speech() != inSpeech:
-						inSpeech = self._decoder.get_in_speech()
+					if decoder.get_in_speech() != inSpeech:
+						inSpeech = decoder.get_in_speech()
 						if not inSpeech:
-							self._decoder.end_utt()
-							result = self._decoder.hyp() if self._decoder.hyp() else None
+							decoder.end_utt()
+							ended = True
 							break
 
-				self.end()
+				if not ended:
+					# The endpointer or the timeout ended the recording first, the utterance must still be closed
+					# for its text and for the decoder to be reused
+					try:
+						decoder.end_utt()
+					except:
+						# The timeout may have closed it already
+						pass
+
+				result = decoder.hyp() if decoder.hyp() else None
+
+				self.end(asrSession)
 
 		return ASRResult(
 			text=result.hypstr.strip(),
 			session=session,
-			likelihood=self._decoder.hyp().prob,
+			likelihood=result.prob,
 			processingTime=processingTime.time
 		) if result else None
 
@@ -17,28 +17,29 @@
 #
 #  Last modified: 2021.07.30 at 19:56:37 CEST
 
-import io
 import queue
-import wave
-from typing import Generator
-
-import paho.mqtt.client as mqtt
+from typing import Generator, Optional
 
+from core.asr.model.Endpointer import Endpointer
 from core.base.model.ProjectAliceObject import ProjectAliceObject
 from core.dialog.model.DialogSession import DialogSession
+from core.server.model.AudioFrame import AudioFrame
 from core.util.model.AliceEvent import AliceEvent
 from core.voice.WakewordRecorder import WakewordRecorderState
 
 
 class Recorder(ProjectAliceObject):
 
-	def __init__(self, timeoutFlag: AliceEvent, user: str, deviceUid: str):
+	def __init__(self, timeoutFlag: AliceEvent, user: str, deviceUid: str, endpointer: Optional[Endpointer] = None):
 		super().__init__()
 		self._user = user,
 		self._deviceUid = deviceUid
 		self._recording = False
 		self._timeoutFlag = timeoutFlag
 		self._buffer = queue.Queue()
+		self._endpointer = endpointer
+		self._endOfSpeech = False
+		self._keepAudio = False
 
 
 	def __enter__(self):
@@ -55,11 +56,27 @@ class Recorder(ProjectAliceObject):
 		return self._recording
 
 
+	@property
+	def endOfSpeech(self) -> bool:
+		"""
+		Whether the recording was ended by the endpointer, the user having stopped talking
+		:return:
+		"""
+		return self._endOfSpeech
+
+
 	def onSessionError(self, session: DialogSession):
 		self.stopRecording()
 
 
 	def startRecording(self):
+		if self._recording or self._endOfSpeech:
+			return  # Recording starts with the asr session, decoding enters the recorder once more, maybe only after the user stopped talking
+
+		self._keepAudio = self.ConfigManager.getAliceConfigByName('recordAudioAfterWakeword') or self.WakewordRecorder.state == WakewordRecorderState.RECORDING
+		if self._endpointer:
+			self._endpointer.reset()
+
 		self._recording = True
 
 
@@ -68,21 +85,19 @@ class Recorder(ProjectAliceObject):
 		self._buffer.put(None)
 
 
-	def onAudioFrame(self, message: mqtt.MQTTMessage, deviceUid: str):
-		with io.BytesIO(message.payload) as buffer:
-			try:
-				with wave.open(buffer, 'rb') as wav:
-					frame = wav.readframes(512)
-					while frame:
-						self._buffer.put(frame)
+	def feedAudioFrame(self, frame: AudioFrame, deviceUid: str):
+		if not frame.pcm:
+			return  # Nothing to record, and an empty chunk must not be taken for the end of the recording
 
-						if self.ConfigManager.getAliceConfigByName('recordAudioAfterWakeword') or self.WakewordRecorder.state == WakewordRecorderState.RECORDING:
-							self.AudioServer.recordFrame(deviceUid, frame)
+		self._buffer.put(frame.pcm)
 
-						frame = wav.readframes(512)
+		if self._keepAudio:
+			self.AudioServer.recordFrame(deviceUid, frame.pcm)
 
-			except Exception as e:
-				self.logError(f'Error recording user speech: {e}')
+		if self._endpointer and self._recording and self._endpointer.process(frame.pcm):
+			self.logDebug(f'End of speech on device **{deviceUid}**')
+			self._endOfSpeech = True
+			self.stopRecording()
 
 
 	def __iter__(self):
@@ -93,20 +108,12 @@ class Recorder(ProjectAliceObject):
 			chunk = self._buffer.get()
 
 			if not chunk:
-				break
+				return
 
 			yield chunk
 
-		# Empty the buffer
-		data = list()
-		while not self._buffer.empty():
-			chunk = self._buffer.get(block=False)
-			if not chunk or not self._recording:
-				break
-
-			data.append(chunk)
-
-		yield b''.join(data)
+		# Recording stopped before the decoding caught up, what was recorded until then is still queued
+		yield b''.join(self._drain())
 
 
 	def audioStream(self) -> Generator:
@@ -119,15 +126,31 @@ class Recorder(ProjectAliceObject):
 				return
 
 			data = [chunk]
+			for chunk in self._drain(withEndMark=True):
+				if not chunk:
+					yield b''.join(data)
+					return
 
-			while self._recording:
-				try:
-					chunk = self._buffer.get(block=False)
-					if not chunk or not self._recording:
-						return
-
-					data.append(chunk)
-				except queue.Empty:
-					break
+				data.append(chunk)
 
 			yield b''.join(data)
+
+
+	def _drain(self, withEndMark: bool = False) -> Generator:
+		"""
+		Takes the queued chunks without waiting, up to the end of recording mark. Audio fed after it doesn't belong to the recording
+		:param withEndMark: if True, the end of recording mark is yielded too, as None, so that the caller knows the recording is over
+		:return:
+		"""
+		while True:
+			try:
+				chunk = self._buffer.get(block=False)
+			except queue.Empty:
+				return
+
+			if not chunk:
+				if withEndMark:
+					yield None
+				return
+
+			yield chunk
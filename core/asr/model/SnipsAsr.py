@@ -22,7 +22,7 @@ import time
 from typing import Optional
 
 from core.asr.model.Asr import Asr
-from core.dialog.model.DialogSession import DialogSession
+from core.asr.model.AsrSession import AsrSession
 
 
 class SnipsAsr(Asr):
@@ -65,7 +65,7 @@ class SnipsAsr(Asr):
 		self._listening = False
 
 
-	def decodeStream(self, session: DialogSession):
+	def decodeStream(self, asrSession: AsrSession):
 		while self._listening:
 			time.sleep(0.1)
 
@@ -0,0 +1,118 @@
+#  Copyright (c) 2021
+#
+#  This file, StreamingDecoder.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+
+from typing import Callable, List, Optional
+
+import numpy as np
+
+
+class StreamingDecoder(object):
+	"""
+	Sits between the recorder and a streaming offline decoder such as Coqui or DeepSpeech. Recorded chunks are
+	coalesced into larger feeds and the costly intermediate decode, only used for partial results, runs once per
+	partialInterval of audio instead of on every chunk. A partial result that no longer changes marks the
+	utterance as stable, so the capture can be ended without waiting for the vad
+	"""
+
+	FEED_SIZE = 3200  # bytes, 100ms of 16 bits mono audio at 16kHz
+
+
+	def __init__(self, feed: Callable[[np.ndarray], None], intermediate: Callable[[], str], finish: Callable[[], str], partialInterval: int = 500, stableDecodes: int = 0, sampleRate: int = 16000):
+		"""
+		:param feed: feeds int16 samples to the stream
+		:param intermediate: returns the stream's current transcript
+		:param finish: closes the stream and returns the final transcript
+		:param partialInterval: milliseconds of audio between two intermediate decodes
+		:param stableDecodes: how many intermediate decodes in a row have to return the same text for it to be stable, 0 to never end early
+		:param sampleRate:
+		"""
+		self._feed = feed
+		self._intermediate = intermediate
+		self._finish = finish
+		self._partialBytes = max(1, partialInterval) * sampleRate * 2 // 1000
+		self._stableDecodes = stableDecodes
+
+		self._pending: List[bytes] = list()
+		self._pendingSize = 0
+		self._sinceDecode = 0
+		self._sameDecodes = 0
+		self._text = ''
+
+
+	@property
+	def text(self) -> str:
+		return self._text
+
+
+	@property
+	def stable(self) -> bool:
+		return self._stableDecodes > 0 and bool(self._text) and self._sameDecodes >= self._stableDecodes
+
+
+	def feed(self, chunk: bytes) -> Optional[str]:
+		"""
+		Adds recorded audio
+		:param chunk: 16 bits pcm
+		:return: the new partial result, if an intermediate decode was due and its text changed
+		"""
+		self._pending.append(chunk)
+		self._pendingSize += len(chunk)
+		if self._pendingSize < self.FEED_SIZE:
+			return None
+
+		self._flush()
+		if self._sinceDecode < self._partialBytes:
+			return None
+
+		return self.decode()
+
+
+	def decode(self) -> Optional[str]:
+		"""
+		Runs an intermediate decode right away, on a vad pause for example
+		:return: the new partial result, None if the text did not change
+		"""
+		self._flush()
+		self._sinceDecode = 0
+
+		text = self._intermediate() or ''
+		if text == self._text:
+			self._sameDecodes += 1
+			return None
+
+		self._sameDecodes = 0
+		self._text = text
+		return text or None
+
+
+	def finish(self) -> str:
+		self._flush()
+		return self._finish()
+
+
+	def _flush(self):
+		if not self._pendingSize:
+			return
+
+		self._feed(np.frombuffer(b''.join(self._pending), np.int16))
+		self._sinceDecode += self._pendingSize
+		self._pending = list()
+		self._pendingSize = 0
@@ -59,7 +59,7 @@ class AssistantManager(Manager):
 			self.train()
 			self.DialogTemplateManager.clearCache(rebuild=False)
 			self.DialogTemplateManager.train()
-			self.NluManager.clearCache()
+			self.NluManager.clearCache(engines=True)
 			self.NluManager.train()
 		elif not self._assistantPath.exists():
 			self.logInfo('Assistant not found')
@@ -16,7 +16,6 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>
 #
 #  Last modified: 2021.04.13 at 12:56:45 CEST
-import inspect
 import json
 import logging
 import re
@@ -218,9 +217,10 @@ class ConfigManager(Manager):
 		"""
 
 		rootSkills = [name.lower() for name in self.SkillManager.NEEDED_SKILLS]
-		callers = [inspect.getmodulename(frame[1]).lower() for frame in inspect.stack()]
+		# Walks the stack only as far as needed, the skill being the module calling into AliceSkill
+		callers = (name.lower() for name in self.Commons.getCallerModules())
 		if 'aliceskill' in callers:
-			skillName = callers[callers.index('aliceskill') + 1]
+			skillName = next(callers, '')
 			if skillName not in rootSkills:
 				self._pendingAliceConfUpdates[key] = value
 				self.logWarning(f'Skill **{skillName}** is trying to modify a core configuration')
@@ -673,6 +673,7 @@ class ConfigManager(Manager):
 
 	def reloadWakeword(self):
 		SuperManager.getInstance().restartManager(manager=self.WakewordManager.name)
+		self.AudioServer.updateAudioFrameFormat()
 
 
 	def refreshStoreData(self):
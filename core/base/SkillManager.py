@@ -25,7 +25,7 @@ import shutil
 import traceback
 from contextlib import suppress
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from AliceGit import Exceptions as GitErrors
 from AliceGit.Exceptions import NotGitRepository, PathNotFoundException
@@ -35,6 +35,7 @@ from core.base.SuperManager import SuperManager
 from core.base.model import Intent
 from core.base.model.AliceSkill import AliceSkill
 from core.base.model.FailedAliceSkill import FailedAliceSkill
+from core.base.model.IntentRouter import IntentRouter
 from core.base.model.Manager import Manager
 from core.base.model.Version import Version
 from core.commons import constants
@@ -84,6 +85,12 @@ class SkillManager(Manager):
 		self._deactivatedSkills: Dict[str, AliceSkill] = dict()
 		self._failedSkills: Dict[str, Union[AliceSkill, FailedAliceSkill]] = dict()
 
+		# Event name: (skill name, skill instance, handles the event, handles onEvent) of the active skills really listening to it
+		self._skillEventSubscribers: Dict[str, List[Tuple[str, AliceSkill, bool, bool]]] = dict()
+
+		# Intent routing table compiled from the active skills, None until the next dispatch needs it
+		self._intentRouter: Optional[IntentRouter] = None
+
 
 	@property
 	def supportedIntents(self) -> List[Dict]:
@@ -532,11 +539,14 @@ class SkillManager(Manager):
 		:return:
 		"""
 
+		self.resetSkillCaches()
+
 		for skillName in self._skillList:
 			if onlyInit and skillName != onlyInit:
 				continue
 
-			self._activeSkills.pop(skillName, None)
+			if self._activeSkills.pop(skillName, None):
+				self.resetSkillCaches()
 			self._failedSkills.pop(skillName, None)
 			self._deactivatedSkills.pop(skillName, None)
 
@@ -569,6 +579,8 @@ class SkillManager(Manager):
 
 					if skillActiveState:
 						self._activeSkills[skillInstance.name] = skillInstance
+						# Broadcasts sent while the skills are loading may have cached a partial subscriber table
+						self.resetSkillCaches()
 					else:
 						self._deactivatedSkills[skillName] = skillInstance
 
@@ -792,6 +804,7 @@ class SkillManager(Manager):
 		skill = None
 		if skillName in self._activeSkills:
 			skill = self._activeSkills.pop(skillName, None)
+			self.resetSkillCaches()
 			self.deactivatedSkills[skillName] = skill
 			skill.onStop()
 			self.broadcast(
@@ -883,6 +896,7 @@ class SkillManager(Manager):
 
 			if skillInstance:
 				self.activeSkills[skillName] = skillInstance
+				self.resetSkillCaches()
 			else:
 				return dict()
 		else:
@@ -916,6 +930,7 @@ class SkillManager(Manager):
 			except:
 				self._activeSkills.pop(skillName, None)
 				self._deactivatedSkills.pop(skillName, None)
+				self.resetSkillCaches()
 
 			self._failedSkills[skillName] = FailedAliceSkill(skillInstance.installer)
 
@@ -1023,9 +1038,15 @@ class SkillManager(Manager):
 		:param session:
 		:return:
 		"""
-		for skillName, skillInstance in self._activeSkills.items():
+		for skillInstance, intent in self.intentRouter.route(session.message.topic):
+			skillName = skillInstance.name
 			try:
-				consumed = skillInstance.onMessageDispatch(session)
+				if intent is None:
+					consumed = skillInstance.onMessageDispatch(session)
+				elif not skillInstance.active:
+					continue
+				else:
+					consumed = skillInstance.dispatchIntent(session, intent)
 			except AccessLevelTooLow:
 				# The command was recognized but required higher access level
 				return True
@@ -1144,24 +1165,69 @@ class SkillManager(Manager):
 		if not method.startswith('on'):
 			method = f'on{method[0].capitalize() + method[1:]}'
 
-		for skillName, skillInstance in self._activeSkills.items():
+		for skillName, skillInstance, handlesMethod, handlesEvent in self.getSkillEventSubscribers(method):
 
 			if filterOut and skillName in filterOut:
 				continue
 
 			try:
-				func = getattr(skillInstance, method, None)
-				if func:
-					func(**kwargs)
+				if handlesMethod:
+					getattr(skillInstance, method)(**kwargs)
 
-				func = getattr(skillInstance, 'onEvent', None)
-				if func:
-					func(event=method, **kwargs)
+				if handlesEvent:
+					skillInstance.onEvent(event=method, **kwargs)
 
 			except TypeError as e:
 				self.logWarning(f'Failed to broadcast event {method} to {skillName}: {e}')
 
 
+	def resetSkillCaches(self):
+		"""
+		Drops what was resolved from the active skills, to be rebuilt on next use. To be called whenever
+		skills are started, stopped or change their supported intents
+		:return:
+		"""
+		self._skillEventSubscribers = dict()
+		self._intentRouter = None
+
+
+	@property
+	def intentRouter(self) -> IntentRouter:
+		"""
+		Returns the intent routing table of the active skills, compiling it if needed
+		:return:
+		"""
+		router = self._intentRouter
+		if router is None:
+			router = IntentRouter(list(self._activeSkills.values()))
+			self._intentRouter = router
+		return router
+
+
+	def getSkillEventSubscribers(self, method: str) -> List[Tuple[str, AliceSkill, bool, bool]]:
+		"""
+		Returns the active skills that really implement the given event or a generic onEvent.
+		Resolved once per event and dropped whenever the active skills change
+		:param method: str, the event method name, such as onHotword
+		:return:
+		"""
+		cache = self._skillEventSubscribers
+		subscribers = cache.get(method, None)
+		if subscribers is not None:
+			return subscribers
+
+		subscribers = list()
+		for skillName, skillInstance in list(self._activeSkills.items()):
+			handlesMethod = skillInstance.isSubscribedTo(method)
+			handlesEvent = skillInstance.isSubscribedTo('onEvent')
+			if handlesMethod or handlesEvent:
+				subscribers.append((skillName, skillInstance, handlesMethod, handlesEvent))
+
+		# Stored in the cache it was resolved for, so that it's dropped if the active skills changed meanwhile
+		cache[method] = subscribers
+		return subscribers
+
+
 	def removeSkill(self, skillName: str):
 		"""
 		Deletes a skill completely
@@ -1181,6 +1247,7 @@ class SkillManager(Manager):
 
 		self._skillList.remove(skillName)
 		self._activeSkills.pop(skillName, None)
+		self.resetSkillCaches()
 		self._deactivatedSkills.pop(skillName, None)
 		self._failedSkills.pop(skillName, None)
 
@@ -1267,6 +1334,7 @@ class SkillManager(Manager):
 		self._deactivatedSkills = dict()
 		self._failedSkills = dict()
 		self._skillList = dict()
+		self.resetSkillCaches()
 
 
 	def isSkillUserModified(self, skillName: str) -> bool:
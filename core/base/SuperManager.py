@@ -19,6 +19,8 @@
 
 from __future__ import annotations
 
+from typing import Dict, List, Optional
+
 from core.device.model.DeviceAbility import DeviceAbility
 from core.util.model.Logger import Logger
 
@@ -39,6 +41,9 @@ class SuperManager(object):
 		SuperManager._INSTANCE = self
 		self._managers = dict()
 
+		# Event name: managers really implementing it, in broadcasting order. None until all managers are started
+		self._eventSubscribers: Optional[Dict[str, List]] = None
+
 		self.projectAlice             = mainClass
 		self.aliceWatchManager        = None
 		self.apiManager               = None
@@ -163,6 +168,8 @@ class SuperManager(object):
 			self._managers[stateManager.name] = stateManager
 			self._managers[subprocessManager.name] = subprocessManager
 			self._managers[bugReportManager.name] = bugReportManager
+
+			self.buildEventSubscribers()
 		except Exception as e:
 			import traceback
 
@@ -264,6 +271,8 @@ class SuperManager(object):
 
 
 	def onStop(self):
+		self._eventSubscribers = None
+
 		mqttManager = self._managers.pop('MqttManager', None) # Mqtt goes down last with bug reporter
 		bugReportManager = self._managers.pop('BugReportManager', None) # bug reporter goes down as last
 
@@ -307,6 +316,45 @@ class SuperManager(object):
 		self._managers[manager].onStart()
 		self._managers[manager].onBooted()
 
+		if self._eventSubscribers is not None:
+			self.buildEventSubscribers()
+
+
+	def buildEventSubscribers(self):
+		"""
+		Builds the event dispatch table, so that broadcasting only iterates the managers
+		that really override the event hook instead of calling every manager's no-op
+		:return:
+		"""
+		from core.base.model.ProjectAliceObject import ProjectAliceObject
+
+		for name in [name for name, manager in self._managers.items() if not manager]:
+			del self._managers[name]
+
+		self._eventSubscribers = dict()
+		for method in dir(ProjectAliceObject):
+			if method.startswith('on'):
+				self.getEventSubscribers(method)
+
+
+	def getEventSubscribers(self, method: str) -> List:
+		"""
+		Returns the managers handling the given event. Unknown events, such as custom ones, are
+		resolved on first use and then cached
+		:param method: str, the event method name, such as onHotword
+		:return:
+		"""
+		if self._eventSubscribers is not None and method in self._eventSubscribers:
+			return self._eventSubscribers[method]
+
+		subscribers = [manager for manager in self._managers.values() if manager and manager.isSubscribedTo(method)]
+
+		# While managers are starting they are moved around, so nothing gets cached
+		if self._eventSubscribers is not None:
+			self._eventSubscribers[method] = subscribers
+
+		return subscribers
+
 
 	@property
 	def managers(self) -> dict:
@@ -39,10 +39,14 @@ from core.base.model.Version import Version
 from core.commons import constants
 from core.device.model.Device import Device
 from core.dialog.model.DialogSession import DialogSession
+from core.server.model.AudioFrame import AudioFrame
 from core.user.model.AccessLevels import AccessLevel
 
 
 class AliceSkill(ProjectAliceObject):
+	# Audio frames are not broadcast, a skill that wants them declares it and implements onAudioFrame(frame, deviceUid)
+	AUDIO_FRAME_SUBSCRIBER = False
+
 
 	def __init__(self, supportedIntents: Iterable = None, databaseSchema: dict = None, **kwargs):
 		super().__init__(**kwargs)
@@ -436,6 +440,7 @@ class AliceSkill(ProjectAliceObject):
 	@supportedIntents.setter
 	def supportedIntents(self, value: list):
 		self._supportedIntents = value
+		self.SkillManager.resetSkillCaches()
 
 
 	@property
@@ -545,6 +550,25 @@ class AliceSkill(ProjectAliceObject):
 		if not intent:
 			return False
 
+		return self.dispatchIntent(session, intent)
+
+
+	def handlesOwnDispatch(self) -> bool:
+		"""
+		Whether this skill overrides how messages are matched to its intents, in which case
+		the intent routing table has to hand it every message
+		:return: bool
+		"""
+		return type(self).onMessageDispatch is not AliceSkill.onMessageDispatch or type(self).filterIntent is not AliceSkill.filterIntent
+
+
+	def dispatchIntent(self, session: DialogSession, intent: Intent) -> bool:
+		"""
+		Handles the given message with the intent it was matched to
+		:param session: the dialog session
+		:param intent: the matching intent
+		:return: whether the message was consumed
+		"""
 		if intent.authLevel != AccessLevel.ZERO:
 			try:
 				self.authenticateIntent(session)
@@ -556,6 +580,17 @@ class AliceSkill(ProjectAliceObject):
 		return True if ret is None or ret == True else False
 
 
+	def onAudioFrame(self, frame: AudioFrame, deviceUid: str):
+		"""
+		Receives every captured audio frame if the skill declares AUDIO_FRAME_SUBSCRIBER. Called on the audio
+		thread, so anything heavier than queuing the frame slows down the whole audio pipeline
+		:param frame: the decoded frame
+		:param deviceUid: the device that captured it
+		:return:
+		"""
+		pass  # Super object function is overridden only if needed
+
+
 	def getResource(self, resourcePathFile: str = '') -> Path:
 		return self.skillPath / resourcePathFile
 
@@ -579,12 +614,20 @@ class AliceSkill(ProjectAliceObject):
 		self.loadWidgets()
 		self.loadScenarioNodes()
 
+		if self.AUDIO_FRAME_SUBSCRIBER:
+			self.AudioServer.subscribeAudioFrames(deviceUid=None, callback=self.onAudioFrame)
+		elif type(self).onAudioFrame is not AliceSkill.onAudioFrame:
+			self.logWarning('Overriding **onAudioFrame** without declaring **AUDIO_FRAME_SUBSCRIBER** is deprecated, audio frames are no longer broadcast and this skill will not receive them')
+
 		self._failedStarting = False
 		self.logInfo(f'![green](Started!)')
 
 
 	def onStop(self):
 		self._active = False
+		if self.AUDIO_FRAME_SUBSCRIBER:
+			self.AudioServer.unsubscribeAudioFrames(callback=self.onAudioFrame)
+
 		self.SkillManager.configureSkillIntents(self._name, False)
 		self.logInfo(f'![green](Stopped)')
 
@@ -592,7 +635,7 @@ class AliceSkill(ProjectAliceObject):
 	def onBooted(self) -> bool:
 		if self.delayed:
 			self.logInfo('Delayed start')
-			self.ThreadManager.doLater(interval=5, func=self.onStart)
+			self.ThreadManager.doLaterInThread(interval=5, name=f'delayedStart_{self._name}', func=self.onStart)
 
 		return True
 
@@ -665,6 +708,14 @@ class AliceSkill(ProjectAliceObject):
 		return self.DatabaseManager.insert(tableName=tableName, query=query, values=values, callerName=self.name)
 
 
+	def databaseInsertMany(self, tableName: str, values: List[dict], query: str = None) -> int:
+		return self.DatabaseManager.insertMany(tableName=tableName, query=query, values=values, callerName=self.name)
+
+
+	def databaseQueueInsert(self, tableName: str, values: dict, query: str = None):
+		self.DatabaseManager.queueInsert(tableName=tableName, query=query, values=values, callerName=self.name)
+
+
 	def randomTalk(self, text: str, replace: Union[str, List] = None, skill: str = None) -> str:
 		if not isinstance(replace, list):
 			replace = [replace]
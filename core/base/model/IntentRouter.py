@@ -0,0 +1,122 @@
+#  Copyright (c) 2021
+#
+#  This file, IntentRouter.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, TYPE_CHECKING, Tuple
+
+from core.base.model.Intent import Intent
+
+
+if TYPE_CHECKING:
+	from core.base.model.AliceSkill import AliceSkill
+
+
+# (skill position, intent position, intent name, intent)
+Route = Tuple[int, int, str, Intent]
+
+
+class TopicNode(object):
+
+	def __init__(self):
+		self.children: Dict[str, TopicNode] = dict()
+		self.routes: List[Route] = list()  # subscriptions ending on this level
+		self.multiLevel: List[Route] = list()  # subscriptions ending with '#' on this level
+
+
+class IntentRouter(object):
+	"""
+	Routing table compiled from the supported intents of the active skills.
+	Plain intent topics are resolved through a hash map, wildcard ones through a topic trie,
+	so that routing a message costs one lookup instead of matching every intent of every skill
+	"""
+
+	def __init__(self, skills: List[AliceSkill]):
+		self._skills = skills
+		self._exact: Dict[str, List[Route]] = dict()
+		self._wildcards = TopicNode()
+		self._catchAll: List[int] = list()
+
+		for skillPosition, skill in enumerate(skills):
+			if skill.handlesOwnDispatch():
+				self._catchAll.append(skillPosition)
+				continue
+
+			for intentPosition, (intentName, intent) in enumerate(skill.supportedIntents.items()):
+				route = (skillPosition, intentPosition, intentName, intent)
+				if '+' in intentName or '#' in intentName:
+					self._addWildcard(intentName, route)
+				else:
+					self._exact.setdefault(intentName, list()).append(route)
+
+
+	def _addWildcard(self, intentName: str, route: Route):
+		node = self._wildcards
+		for level in intentName.split('/'):
+			if level == '#':
+				node.multiLevel.append(route)
+				return
+			node = node.children.setdefault(level, TopicNode())
+
+		node.routes.append(route)
+
+
+	def _matchWildcards(self, node: TopicNode, levels: List[str], depth: int, matches: List[Route]):
+		# Same rules as MQTT: '+' matches one level, '#' the remaining ones, including none. Wildcards never match a leading '$' level
+		wildcardsAllowed = depth > 0 or not levels[0].startswith('$')
+
+		if wildcardsAllowed:
+			matches.extend(node.multiLevel)
+
+		if depth == len(levels):
+			matches.extend(node.routes)
+			return
+
+		child = node.children.get(levels[depth])
+		if child:
+			self._matchWildcards(child, levels, depth + 1, matches)
+
+		child = node.children.get('+')
+		if child and wildcardsAllowed:
+			self._matchWildcards(child, levels, depth + 1, matches)
+
+
+	def route(self, topic: str) -> List[Tuple[AliceSkill, Optional[Intent]]]:
+		"""
+		Returns the skills to dispatch the topic to, in dispatch order, along with the intent each of them
+		matched. Skills handling the dispatch themselves are returned with no intent
+		:param topic: the message topic
+		:return: list of (skill, intent or None)
+		"""
+		matches = list(self._exact.get(topic, list()))
+		if self._wildcards.children or self._wildcards.multiLevel:
+			self._matchWildcards(self._wildcards, topic.split('/'), 0, matches)
+
+		# Per skill, the first most specific intent wins, in the skill's intent order
+		selected: Dict[int, Tuple[str, Intent]] = dict()
+		for skillPosition, _, intentName, intent in sorted(matches, key=lambda match: match[:2]):
+			current = selected.get(skillPosition)
+			if not current or self._skills[skillPosition].intentNameMoreSpecific(intentName, current[0]):
+				selected[skillPosition] = (intentName, intent)
+
+		for skillPosition in self._catchAll:
+			selected[skillPosition] = (topic, None)
+
+		return [(self._skills[skillPosition], selected[skillPosition][1]) for skillPosition in sorted(selected)]
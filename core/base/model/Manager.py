@@ -110,5 +110,13 @@ class Manager(ProjectAliceObject):
 		return self.DatabaseManager.insert(tableName=tableName, query=query, values=values, callerName=self.name)
 
 
+	def databaseInsertMany(self, tableName: str, values: List[dict], query: str = None) -> int:
+		return self.DatabaseManager.insertMany(tableName=tableName, query=query, values=values, callerName=self.name)
+
+
+	def databaseQueueInsert(self, tableName: str, values: dict, query: str = None):
+		self.DatabaseManager.queueInsert(tableName=tableName, query=query, values=values, callerName=self.name)
+
+
 	def pruneTable(self, tableName: str):
 		return self.DatabaseManager.prune(tableName=tableName, callerName=self.name)
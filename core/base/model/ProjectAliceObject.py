@@ -113,38 +113,29 @@ class ProjectAliceObject(object):
 		if not method.startswith('on'):
 			method = f'on{method[0].capitalize() + method[1:]}'
 
+		superManager = SM.SuperManager.getInstance()
+
 		# Give absolute priority to DialogManager
 		try:
-			func = getattr(SM.SuperManager.getInstance().getManager('DialogManager'), method, None)
-			if func:
-				func(**kwargs)
+			dialogManager = superManager.getManager('DialogManager')
+			if dialogManager and dialogManager.isSubscribedTo(method):
+				getattr(dialogManager, method)(**kwargs)
 
 		except TypeError as e:
 			self.logWarning(f'Failed to broadcast event **{method}** to **DialogManager**: {e}')
 
-		deadManagers = list()
-		for name, man in SM.SuperManager.getInstance().managers.copy().items():
-			if not man:
-				deadManagers.append(name)
-				continue
-
+		for man in superManager.getEventSubscribers(method):
 			if (manager and man.name != manager.name) or man.name in exceptions:
 				continue
 
 			try:
-				func = getattr(man, method, None)
-				if func:
-					func(**kwargs)
-
+				getattr(man, method)(**kwargs)
 			except TypeError as e:
 				self.logWarning(f'Failed to broadcast event **{method}** to **{man.name}**: {e}')
 
 		if propagateToSkills:
 			self.SkillManager.skillBroadcast(method=method, **kwargs)
 
-		for name in deadManagers:
-			del SM.SuperManager.getInstance().managers[name]
-
 		if method == 'onAudioFrame':
 			return
 
@@ -163,6 +154,20 @@ class ProjectAliceObject(object):
 		)
 
 
+	def isSubscribedTo(self, method: str) -> bool:
+		"""
+		Whether this object really handles the given event, meaning it overrides the default hook
+		or defines a custom one
+		:param method: str, the event method name, such as onHotword
+		:return:
+		"""
+		func = getattr(type(self), method, None)
+		if func is None:
+			return callable(getattr(self, method, None))
+
+		return func is not getattr(ProjectAliceObject, method, None)
+
+
 	def checkDependencies(self) -> bool:
 		self.logInfo('Checking dependencies')
 
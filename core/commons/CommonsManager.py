@@ -17,19 +17,18 @@
 #
 #  Last modified: 2021.04.13 at 12:56:46 CEST
 
-from collections import defaultdict
 from ctypes import *
 
 import hashlib
 import inspect
 import jinja2
-import json
 import random
 import requests
 import socket
 import sqlite3
 import string
 import subprocess
+import sys
 import tempfile
 import time
 import uuid
@@ -38,20 +37,22 @@ from datetime import datetime
 from googletrans import Translator
 from paho.mqtt.client import MQTTMessage
 from pathlib import Path
-from typing import Any, Union
+from types import FrameType
+from typing import Any, Dict, Iterator, Union
 from uuid import UUID
 
 import core.base.SuperManager as SuperManager
-import core.commons.model.Slot as slotModel
 from core.base.model.Manager import Manager
 from core.commons import constants
 from core.commons.model.PartOfDay import PartOfDay
 from core.dialog.model.DialogSession import DialogSession
+from core.server.model.MqttEnvelope import MqttEnvelope
 from core.webui.model.UINotificationType import UINotificationType
 
 
 class CommonsManager(Manager):
 	ERROR_HANDLER_FUNC = CFUNCTYPE(None, c_char_p, c_int, c_char_p, c_int, c_char_p)
+	_MODULE_NAMES: Dict[str, str] = dict()  # source file: module name, for caller lookups
 
 
 	def __init__(self):
@@ -67,9 +68,38 @@ class CommonsManager(Manager):
 		asound.snd_lib_error_set_handler(None)
 
 
-	@staticmethod
-	def getFunctionCaller(depth: int = 3) -> str:
-		return inspect.getmodulename(inspect.stack()[depth][1])
+	@classmethod
+	def getFunctionCaller(cls, depth: int = 3) -> str:
+		"""
+		Returns the module name of the function found depth frames up the stack, 0 being this very function.
+		Only the frame is looked up, the source file to module name resolution is cached
+		:param depth: int
+		:return: module name
+		"""
+		return cls.getModuleName(sys._getframe(depth))
+
+
+	@classmethod
+	def getCallerModules(cls) -> Iterator[str]:
+		"""
+		Lazily yields the module names of the stack, innermost first, starting with the frame consuming this generator
+		:return: module names
+		"""
+		frame = sys._getframe(1)
+		while frame:
+			yield cls.getModuleName(frame)
+			frame = frame.f_back
+
+
+	@classmethod
+	def getModuleName(cls, frame: FrameType) -> str:
+		filename = frame.f_code.co_filename
+		try:
+			return cls._MODULE_NAMES[filename]
+		except KeyError:
+			name = inspect.getmodulename(filename) or ''
+			cls._MODULE_NAMES[filename] = name
+			return name
 
 
 	def getMethodCaller(self, **methodParam):
@@ -131,59 +161,42 @@ class CommonsManager(Manager):
 
 	@staticmethod
 	def payload(message: MQTTMessage) -> dict:
-		try:
-			payload = json.loads(message.payload)
-			if isinstance(payload, bool):
-				message.payload = payload
-				raise TypeError
-		except (ValueError, TypeError):
-			var = message.topic.split('/')[-1]
-			payload = {var: message.payload}
+		if isinstance(message, MqttEnvelope):
+			return message.data
 
-		return payload
+		return MqttEnvelope.parsePayload(message)
 
 
 	@classmethod
 	def parseSlotsToObjects(cls, message: MQTTMessage) -> dict:
-		slots = defaultdict(list)
-		data = cls.payload(message)
-
-		if not isinstance(data, dict):
-			return dict()
+		if isinstance(message, MqttEnvelope):
+			return message.slotsAsObjects
 
-		for slotData in data.get('slots', dict()):
-			slot = slotModel.Slot(**slotData)
-			slots[slot.slotName].append(slot)
-		return slots
+		return MqttEnvelope.parseSlotsToObjects(cls.payload(message))
 
 
 	@classmethod
 	def parseSlots(cls, message: MQTTMessage) -> dict:
-		data = cls.payload(message)
-
-		if not isinstance(data, dict):
-			return dict()
+		if isinstance(message, MqttEnvelope):
+			return message.slots
 
-		return {slot['slotName']: slot['rawValue'] for slot in data.get('slots', dict())}
+		return MqttEnvelope.parseSlots(cls.payload(message))
 
 
 	@classmethod
 	def parseSessionId(cls, message: MQTTMessage) -> Union[str, bool]:
-		data = cls.payload(message)
-
-		if not isinstance(data, dict):
-			return False
+		if isinstance(message, MqttEnvelope):
+			return message.sessionId
 
-		return data.get('sessionId', False)
+		return MqttEnvelope.parseSessionId(cls.payload(message))
 
 
 	@classmethod
 	def parseCustomData(cls, message: MQTTMessage) -> dict:
-		try:
-			data = cls.payload(message)
-			return json.loads(data['customData'])
-		except (ValueError, TypeError, KeyError):
-			return dict()
+		if isinstance(message, MqttEnvelope):
+			return message.customData
+
+		return MqttEnvelope.parseCustomData(cls.payload(message))
 
 
 	@classmethod
@@ -61,6 +61,7 @@ TOPIC_NLU_QUERY                        = 'hermes/nlu/query'
 TOPIC_PARTIAL_TEXT_CAPTURED            = 'hermes/asr/partialTextCaptured'
 TOPIC_PLAY_BYTES                       = 'hermes/audioServer/{}/playBytes/#'  # hermes/audioServer/<SITE_ID>/playBytes/<REQUEST_ID>
 TOPIC_PLAY_BYTES_FINISHED              = 'hermes/audioServer/{}/playFinished'
+TOPIC_PLAY_BYTES_STREAMING             = 'hermes/audioServer/{}/playBytesStreaming/#'  # hermes/audioServer/<SITE_ID>/playBytesStreaming/<REQUEST_ID>/<CHUNK>/<IS_LAST_CHUNK>
 TOPIC_SESSION_ENDED                    = 'hermes/dialogueManager/sessionEnded'
 TOPIC_SESSION_QUEUED                   = 'hermes/dialogueManager/sessionQueued'
 TOPIC_SESSION_STARTED                  = 'hermes/dialogueManager/sessionStarted'
@@ -17,6 +17,7 @@
 #
 #  Last modified: 2021.04.15 at 00:08:34
 
+import heapq
 import importlib
 import socket
 import threading
@@ -24,7 +25,7 @@ import time
 import uuid
 from paho.mqtt.client import MQTTMessage
 from serial.tools import list_ports
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 from core.base.model.Manager import Manager
 from core.commons import constants
@@ -35,6 +36,7 @@ from core.device.model.DeviceLink import DeviceLink
 from core.device.model.DeviceType import DeviceType
 from core.device.model.Heartbeat import Heartbeat
 from core.dialog.model.DialogSession import DialogSession
+from core.util.model.ThreadTimer import ThreadTimer
 
 
 class DeviceManager(Manager):
@@ -60,18 +62,36 @@ class DeviceManager(Manager):
 	}
 
 
+	LOADING_TIMEOUT = 20
+
+
 	def __init__(self):
 		super().__init__(databaseSchema=self.DATABASE)
 
-		self.loadingDone = False
-		self._loopCounter = 0
+		self._loadingDone = threading.Event()
+		self._loadingThread: Optional[int] = None
 
 		self._devices: Dict[int, Device] = dict()
 		self._deviceLinks: Dict[int, DeviceLink] = dict()
 		self._deviceTypes: Dict[str, Dict[str, DeviceType]] = dict()
 
-		self._heartbeats = dict()
-		self._heartbeatsCheckTimer = None
+		# Secondary indexes, kept in sync by indexDevice/unindexDevice and indexLink/unindexLink
+		self._indexLock = threading.RLock()
+		self._devicesByUid: Dict[str, Device] = dict()
+		self._devicesByLocation: Dict[int, Dict[int, Device]] = dict()
+		self._devicesByType: Dict[Tuple[str, str], Dict[int, Device]] = dict()
+		self._devicesByAbility: Dict[int, Dict[int, Device]] = dict()  # single ability bit: devices having it
+		self._deviceIndexKeys: Dict[int, Tuple[str, int, Tuple[str, str], int]] = dict()  # device id: keys it is indexed under
+		self._linksByDevice: Dict[int, Dict[int, DeviceLink]] = dict()
+		self._linksByLocation: Dict[int, Dict[int, DeviceLink]] = dict()
+		self._linkIndexKeys: Dict[int, Tuple[int, int]] = dict()  # link id: (device id, target location)
+
+		self._heartbeats: Dict[str, float] = dict()  # uid: last signal
+		self._heartbeatExpiries: List[Tuple[float, str]] = list()  # heap of (expiry, uid), one entry per tracked uid
+		self._heartbeatTracked: Set[str] = set()
+		self._heartbeatsLock = threading.Lock()
+		self._heartbeatsCheckTimer: Optional[ThreadTimer] = None
+		self._heartbeatsCheckDeadline = 0
 		self._heartbeat: Optional[Heartbeat] = None
 
 		self._broadcastFlag = threading.Event()
@@ -89,6 +109,8 @@ class DeviceManager(Manager):
 
 	def onStart(self):
 		super().onStart()
+		self._loadingDone.clear()
+		self._loadingThread = threading.get_ident()
 		self.loadDevices()
 		self.loadLinks()
 
@@ -115,7 +137,8 @@ class DeviceManager(Manager):
 			device.onStart()
 
 		self.logInfo(f'Loaded **{len(self._devices)}** device instance', plural='instance')
-		self.loadingDone = True
+		self._loadingThread = None
+		self._loadingDone.set()
 
 
 	def onBooted(self):
@@ -124,13 +147,12 @@ class DeviceManager(Manager):
 		self.MqttManager.publish(topic=constants.TOPIC_CORE_RECONNECTION)
 		self.getMainDevice().connected = True
 
-		if self._devices:
-			self.ThreadManager.newThread(name='checkHeartbeats', target=self.checkHeartbeats)
-
 		for device in self._devices.values():
 			device.onBooted()
 
-		self._heartbeat = Heartbeat(device=self.getMainDevice())
+		self._heartbeat = Heartbeat()
+		self._heartbeat.addDevice(device=self.getMainDevice())
+		self._heartbeat.startHeartbeat()
 
 
 	def onStop(self):
@@ -144,6 +166,10 @@ class DeviceManager(Manager):
 
 		if self._heartbeat:
 			self._heartbeat.stopHeartBeat()
+
+		if self._heartbeatsCheckTimer:
+			self._heartbeatsCheckTimer.cancel()
+
 		self.MqttManager.publish(topic=constants.TOPIC_CORE_DISCONNECTION)
 
 
@@ -160,10 +186,9 @@ class DeviceManager(Manager):
 
 	def onSkillDeactivated(self, skill: str):
 		self.removeDeviceTypesForSkill(skillName=skill)
-		tmp = self._devices.copy()
-		for deviceUid, device in tmp.items():
+		for device in list(self._devices.values()):
 			if device.skillName == skill:
-				self._devices.pop(deviceUid, None)
+				self.unindexDevice(device)
 
 
 	def loadDevices(self):
@@ -180,7 +205,7 @@ class DeviceManager(Manager):
 				skillImport = importlib.import_module(f'skills.{data.get("skillName")}.devices.{data.get("typeName")}')
 				klass = getattr(skillImport, data.get('typeName'))
 				device = klass(data)
-				self._devices[device.id] = device
+				self.indexDevice(device)
 			except Exception:
 				self.logError("Couldn't create device instance")
 
@@ -197,63 +222,266 @@ class DeviceManager(Manager):
 				self.deleteDeviceLinks(linkId=link.id)
 				self.loadLinks()
 			else:
-				self._deviceLinks[row['id']] = link
+				self.indexLink(link)
 
 
 	def checkHeartbeats(self):
 		"""
-		Routine that checks all heartbeats and disconnects devices that haven't signaled their presence for hearbeatRate time
+		Routine that disconnects devices that haven't signaled their presence for twice their heartbeat rate.
+		Expiries are kept ordered, so that only devices that are due are looked at, and the routine only
+		runs when the next one is due
 		:return: None
 		"""
-		now = round(time.time())
-		for uid, lastTime in self._heartbeats.copy().items():
-			device = self.getDevice(uid=uid)
-			if not device:
-				self._heartbeats.pop(uid, None)
-			else:
-				if lastTime < now - (device.heartbeatRate * 2):
-					self.logWarning(f'Device **{device.displayName}** has not given a signal since {device.deviceType.heartbeatRate} seconds or more')
+		now = time.time()
+		due = list()
+		expired = list()
+
+		with self._heartbeatsLock:
+			while self._heartbeatExpiries and self._heartbeatExpiries[0][0] <= now:
+				_, uid = heapq.heappop(self._heartbeatExpiries)
+				if uid not in self._heartbeats:
+					self._heartbeatTracked.discard(uid)
+					continue
+
+				due.append(uid)
+
+		# Resolving a device can wait on the devices loading, heartbeats must not be held meanwhile.
+		# Due devices stay tracked, heartbeats they send meanwhile are accounted for below
+		devices = {uid: self.getDevice(uid=uid) for uid in due}
+
+		with self._heartbeatsLock:
+			for uid, device in devices.items():
+				lastTime = self._heartbeats.get(uid)
+				if lastTime is None or not device:
 					self._heartbeats.pop(uid, None)
-					device.connected = False
-					self.MqttManager.publish(constants.TOPIC_DEVICE_UPDATED, payload={'device': device.toDict()})
+					self._heartbeatTracked.discard(uid)
+					continue
+
+				expiry = lastTime + device.heartbeatRate * 2
+				if expiry > now:
+					heapq.heappush(self._heartbeatExpiries, (expiry, uid))
+					continue
+
+				self._heartbeats.pop(uid, None)
+				self._heartbeatTracked.discard(uid)
+				expired.append(device)
+
+			self._heartbeatsCheckTimer = None
+			if self._heartbeatExpiries:
+				self.scheduleHeartbeatsCheck(self._heartbeatExpiries[0][0])
+
+		for device in expired:
+			self.logWarning(f'Device **{device.displayName}** has not given a signal since {device.deviceType.heartbeatRate} seconds or more')
+			device.connected = False
+			self.MqttManager.publish(constants.TOPIC_DEVICE_UPDATED, payload={'device': device.toDict()})
+
+
+	def scheduleHeartbeatsCheck(self, deadline: float):
+		"""
+		Makes sure heartbeats are checked by the given time. Must be called with the heartbeats lock held
+		:param deadline: timestamp
+		:return: None
+		"""
+		if self._heartbeatsCheckTimer and self._heartbeatsCheckTimer.is_alive():
+			if self._heartbeatsCheckDeadline <= deadline:
+				return
+			self._heartbeatsCheckTimer.cancel()
+
+		self._heartbeatsCheckDeadline = deadline
+		self._heartbeatsCheckTimer = self.ThreadManager.newTimer(interval=max(0.0, deadline - time.time()), func=self.checkHeartbeats)
 
-		self._heartbeatsCheckTimer = self.ThreadManager.newTimer(interval=2, func=self.checkHeartbeats)
+
+	def registerHeartbeat(self, device: Device):
+		"""
+		Notes a sign of life for the given device. Costs a dict update, unless the device isn't tracked yet
+		:param device:
+		:return: None
+		"""
+		now = time.time()
+		with self._heartbeatsLock:
+			self._heartbeats[device.uid] = now
+			if device.uid in self._heartbeatTracked:
+				return
+
+			self._heartbeatTracked.add(device.uid)
+			expiry = now + device.heartbeatRate * 2
+			heapq.heappush(self._heartbeatExpiries, (expiry, device.uid))
+			self.scheduleHeartbeatsCheck(expiry)
+
+
+	@property
+	def loadingDone(self) -> bool:
+		return self._loadingDone.is_set()
 
 
 	def getDevice(self, deviceId: int = None, uid: [str, uuid.UUID] = None) -> Optional[Device]:
 		"""
 		Returns a Device with the provided id or uid, if any
+		If devices are still loading, waits for the loading to complete before giving up
 		:param deviceId: The device id
 		:param uid: The device uid
 		:return: Device instance if any or None
 		"""
-		ret = None
-		if deviceId:
-			ret = self._devices.get(deviceId, None)
-		elif uid:
-			if not isinstance(uid, str):
-				uid = str(uid)
-			for device in self._devices.values():
-				if device.uid == uid:
-					ret = device
-		else:
+		if not deviceId and not uid:
 			raise Exception('Cannot get a device without id or uid')
 
-		if ret is None and not self.loadingDone:
-			if self.ProjectAlice.shuttingDown:
-				return None
+		ret = self._lookupDevice(deviceId=deviceId, uid=uid)
+		if ret is not None or self._loadingDone.is_set() or self._loadingThread == threading.get_ident():
+			return ret
 
-			self._loopCounter += 1
-			self.logInfo(f'Waiting for {self.name} ({self._loopCounter})')
-			if self._loopCounter > 20:
-				self.logWarning(f'Impossible to find device instance for id/uid {deviceId}/{uid}, skipping')
-				self._loopCounter = 0
-				return None
+		if self.ProjectAlice.shuttingDown:
+			return None
+
+		self.logInfo(f'Waiting for {self.name}')
+		if not self._loadingDone.wait(timeout=self.LOADING_TIMEOUT):
+			self.logWarning(f'Impossible to find device instance for id/uid {deviceId}/{uid}, skipping')
+			return None
+
+		return self._lookupDevice(deviceId=deviceId, uid=uid)
+
+
+	def _lookupDevice(self, deviceId: int = None, uid: [str, uuid.UUID] = None) -> Optional[Device]:
+		if deviceId:
+			return self._devices.get(deviceId, None)
+
+		return self._devicesByUid.get(str(uid), None)
+
+
+	def indexDevice(self, device: Device):
+		"""
+		Registers the device and indexes it by uid, location, type and abilities.
+		Indexing an already registered device refreshes its index entries
+		:param device: Device instance
+		:return: None
+		"""
+		with self._indexLock:
+			self.unindexDevice(device)
+
+			typeKey = (device.skillName.lower(), device.deviceTypeName.lower())
+			abilities = device.getAbilities() or 0
+
+			self._devices[device.id] = device
+			self._devicesByUid[str(device.uid)] = device
+			self._devicesByLocation.setdefault(device.parentLocation, dict())[device.id] = device
+			self._devicesByType.setdefault(typeKey, dict())[device.id] = device
+			for bit in self.abilityBits(abilities):
+				self._devicesByAbility.setdefault(bit, dict())[device.id] = device
+
+			self._deviceIndexKeys[device.id] = (str(device.uid), device.parentLocation, typeKey, abilities)
+
+
+	def unindexDevice(self, device: Device):
+		"""
+		Unregisters the device and removes it from all indexes, using the keys it was indexed under
+		:param device: Device instance
+		:return: None
+		"""
+		with self._indexLock:
+			keys = self._deviceIndexKeys.pop(device.id, None)
+			self._devices.pop(device.id, None)
+			if not keys:
+				return
+
+			uid, locationId, typeKey, abilities = keys
+			if self._devicesByUid.get(uid) is device:
+				self._devicesByUid.pop(uid, None)
+
+			self._discard(self._devicesByLocation, locationId, device.id)
+			self._discard(self._devicesByType, typeKey, device.id)
+			for bit in self.abilityBits(abilities):
+				self._discard(self._devicesByAbility, bit, device.id)
+
+
+	def reindexDevice(self, device: Device):
+		"""
+		Called by devices when their uid, location, type or abilities change.
+		Does nothing for devices that aren't registered yet
+		:param device: Device instance
+		:return: None
+		"""
+		with self._indexLock:
+			if self._devices.get(device.id) is device:
+				self.indexDevice(device)
+
+
+	def reindexDeviceType(self, deviceType: DeviceType):
+		"""
+		Called by device types when their abilities change, as devices without abilities of their own are indexed under their type's
+		:param deviceType: DeviceType instance
+		:return: None
+		"""
+		with self._indexLock:
+			typeKey = (deviceType.skillName.lower(), deviceType.deviceTypeName.lower())
+			for device in list(self._devicesByType.get(typeKey, dict()).values()):
+				self.indexDevice(device)
+
+
+	def indexLink(self, link: DeviceLink):
+		"""
+		Registers the link and indexes it by device and target location
+		:param link: DeviceLink instance
+		:return: None
+		"""
+		with self._indexLock:
+			self.unindexLink(link.id)
+			self._deviceLinks[link.id] = link
+			self._linksByDevice.setdefault(link.deviceId, dict())[link.id] = link
+			self._linksByLocation.setdefault(link.targetLocation, dict())[link.id] = link
+			self._linkIndexKeys[link.id] = (link.deviceId, link.targetLocation)
+
+
+	def unindexLink(self, linkId: int):
+		"""
+		Unregisters the given link and removes it from all indexes
+		:param linkId: int
+		:return: None
+		"""
+		with self._indexLock:
+			keys = self._linkIndexKeys.pop(linkId, None)
+			self._deviceLinks.pop(linkId, None)
+			if not keys:
+				return
+
+			deviceId, locationId = keys
+			self._discard(self._linksByDevice, deviceId, linkId)
+			self._discard(self._linksByLocation, locationId, linkId)
+
+
+	def reindexLink(self, link: DeviceLink):
+		"""
+		Called by links when their target location changes
+		:param link: DeviceLink instance
+		:return: None
+		"""
+		with self._indexLock:
+			if self._deviceLinks.get(link.id) is link:
+				self.indexLink(link)
 
-			time.sleep(1)
-			return self.getDevice(deviceId=deviceId, uid=uid)
-		else:
-			return ret
+
+	@staticmethod
+	def _discard(index: dict, key: Any, itemId: int):
+		bucket = index.get(key)
+		if bucket is None:
+			return
+
+		bucket.pop(itemId, None)
+		if not bucket:
+			index.pop(key, None)
+
+
+	@staticmethod
+	def abilityBits(abilities: int) -> List[int]:
+		"""
+		Splits an abilities bitmask into its single bits
+		:param abilities: bitmask
+		:return: list of int
+		"""
+		bits = list()
+		while abilities:
+			bit = abilities & -abilities
+			bits.append(bit)
+			abilities ^= bit
+		return bits
 
 
 	def registerDeviceType(self, skillName: str, data: dict):
@@ -281,7 +509,10 @@ class DeviceManager(Manager):
 				return
 
 		self._deviceTypes.setdefault(skillName.lower(), dict())
-		self._deviceTypes[skillName.lower()].setdefault(data['deviceTypeName'].lower(), deviceType)
+		known = self._deviceTypes[skillName.lower()].setdefault(data['deviceTypeName'].lower(), deviceType)
+		if known is not deviceType and known.abilities != deviceType.abilities:
+			# Devices keep the type they were created with, an updated skill can come with new abilities for it
+			known.setAbilities(data.get('abilities', list()))
 
 
 	def getDevicesWithAbilities(self, abilities: List[DeviceAbility], connectedOnly: bool = True) -> List[Device]:
@@ -291,15 +522,24 @@ class DeviceManager(Manager):
 		:param connectedOnly: Whether to return non-connected devices
 		:return: A list of Device instances
 		"""
-		ret = list()
-		for device in self._devices.values():
-			if connectedOnly and not device.connected:
-				continue
+		return [device for device in self._candidatesByAbilities(abilities) if (not connectedOnly or device.connected) and device.hasAbilities(abilities)]
 
-			if device.hasAbilities(abilities):
-				ret.append(device)
 
-		return ret
+	def _candidatesByAbilities(self, abilities: List[DeviceAbility]) -> List[Device]:
+		"""
+		Returns the smallest index bucket for the given abilities, every device having them all is in it
+		:param abilities: A list of DeviceAbility
+		:return: list of Device instances
+		"""
+		check = 0
+		for ability in abilities or list():
+			check |= ability.value
+
+		if not check:
+			return list(self._devices.values())
+
+		buckets = [self._devicesByAbility.get(bit, dict()) for bit in self.abilityBits(check)]
+		return list(min(buckets, key=len).values())
 
 
 	def getDevicesByType(self, deviceType: DeviceType, connectedOnly: bool = True) -> List[Device]:
@@ -309,16 +549,8 @@ class DeviceManager(Manager):
 		:param deviceType: DeviceType
 		:return: list of Device instances
 		"""
-
-		ret = list()
-		for device in self._devices.values():
-			if connectedOnly and not device.connected:
-				continue
-
-			if device.deviceType == deviceType:
-				ret.append(device)
-
-		return ret
+		devices = self._devicesByType.get((deviceType.skillName.lower(), deviceType.deviceTypeName.lower()), dict())
+		return [device for device in list(devices.values()) if not connectedOnly or device.connected]
 
 
 	def getDevicesByLocation(self, locationId: int, deviceType: DeviceType = None, abilities: List[DeviceAbility] = None, connectedOnly: bool = True) -> List[Device]:
@@ -355,9 +587,15 @@ class DeviceManager(Manager):
 		:param connectedOnly: Whether to return non-connected devices
 		:return: list of Device instances
 		"""
+		if locationId:
+			candidates = list(self._devicesByLocation.get(locationId, dict()).values())
+		elif deviceType:
+			candidates = list(self._devicesByType.get((deviceType.skillName.lower(), deviceType.deviceTypeName.lower()), dict()).values())
+		else:
+			candidates = self._candidatesByAbilities(abilities)
 
 		ret = list()
-		for device in self._devices.values():
+		for device in candidates:
 			if (locationId and device.parentLocation != locationId) \
 					or (skillName and device.skillName != skillName) \
 					or (deviceType and device.deviceType != deviceType) \
@@ -385,11 +623,7 @@ class DeviceManager(Manager):
 		Returns the main device, the only one having the IS_CORE ability
 		:return: Device instance
 		"""
-		try:
-			devices = self.getDevicesWithAbilities(abilities=[DeviceAbility.IS_CORE], connectedOnly=False)
-			return devices[0]
-		except:
-			return None
+		return next(iter(self._devicesByAbility.get(DeviceAbility.IS_CORE.value, dict()).values()), None)
 
 
 	def addNewDeviceFromWebUI(self, data: Dict) -> Optional[Device]:
@@ -458,7 +692,7 @@ class DeviceManager(Manager):
 		skillImport = importlib.import_module(f'skills.{skillName}.devices.{deviceType}')
 		klass = getattr(skillImport, deviceType)
 		device = klass(data)
-		self._devices[device.id] = device
+		self.indexDevice(device)
 
 		if device.deviceType.allowLocationLinks:
 			self.addDeviceLink(targetLocation=locationId, deviceId=device.id)
@@ -547,7 +781,7 @@ class DeviceManager(Manager):
 		else:
 			device.onStop()
 			self.deleteDeviceLinks(deviceId=device.id)
-			self._devices.pop(device.id, None)
+			self.unindexDevice(device)
 			self.DatabaseManager.delete(tableName=self.DB_DEVICE, callerName=self.name, values={'id': device.id})
 
 		self.MqttManager.publish(constants.TOPIC_DEVICE_DELETED, payload={'uid': device.uid, 'id': device.id})
@@ -620,10 +854,7 @@ class DeviceManager(Manager):
 			self.MqttManager.publish(constants.TOPIC_DEVICE_UPDATED, payload={'device': device.toDict()})
 			self.logInfo(f'Device named **{device.displayName}** ({device.uid}) in {self.LocationManager.getLocation(locId=device.parentLocation).name} connected')
 
-		self._heartbeats[uid] = round(time.time())
-		if not self._heartbeatsCheckTimer:
-			self._heartbeatsCheckTimer = self.ThreadManager.newTimer(interval=2, func=self.checkHeartbeats)
-
+		self.registerHeartbeat(device)
 		return device
 
 
@@ -633,7 +864,8 @@ class DeviceManager(Manager):
 		:param uid:
 		:return:
 		"""
-		self._heartbeats.pop(uid, None)
+		with self._heartbeatsLock:
+			self._heartbeats.pop(uid, None)
 
 		device = self.getDevice(uid=uid)
 
@@ -676,7 +908,7 @@ class DeviceManager(Manager):
 		}
 
 		link = DeviceLink(data)
-		self._deviceLinks[link.id] = link
+		self.indexLink(link)
 		return link
 
 
@@ -695,7 +927,7 @@ class DeviceManager(Manager):
 		"""
 		if linkId:
 			self.DatabaseManager.delete(tableName=self.DB_LINKS, callerName=self.name, values={'id': linkId})
-			self._deviceLinks.pop(linkId, None)
+			self.unindexLink(linkId)
 
 		elif deviceId or deviceUid:
 			device = self.getDevice(deviceId=deviceId, uid=deviceUid)
@@ -710,16 +942,15 @@ class DeviceManager(Manager):
 
 			self.DatabaseManager.delete(tableName=self.DB_LINKS, callerName=self.name, values=delete)
 
-			for link in self._deviceLinks.copy().values():
-				if link.deviceId == device.id and (not targetLocationId or targetLocationId == link.targetLocation):
-					self._deviceLinks.pop(link.id, None)
+			for link in list(self._linksByDevice.get(device.id, dict()).values()):
+				if not targetLocationId or targetLocationId == link.targetLocation:
+					self.unindexLink(link.id)
 
 		elif targetLocationId:
 			self.DatabaseManager.delete(tableName=self.DB_LINKS, callerName=self.name, values={'targetLocation': targetLocationId})
 
-			for link in self._deviceLinks.copy().values():
-				if link.targetLocation == targetLocationId:
-					self._deviceLinks.pop(link.id, None)
+			for link in list(self._linksByLocation.get(targetLocationId, dict()).values()):
+				self.unindexLink(link.id)
 
 
 	@property
@@ -834,7 +1065,7 @@ class DeviceManager(Manager):
 			return
 
 		device.connected = True
-		self._heartbeats[uid] = round(time.time())
+		self.registerHeartbeat(device)
 
 
 	def onDeviceStatus(self, session: DialogSession):
@@ -888,9 +1119,13 @@ class DeviceManager(Manager):
 		if devTypeNames and not isinstance(devTypeNames, List):
 			devTypeNames = [devTypeNames]
 
-		return [x for x in self._deviceLinks.values()
-		        if (not locationId or x.targetLocation in locationId)
-		        and x.device is not None
+		if locationId:
+			candidates = [link for location in locationId for link in list(self._linksByLocation.get(location, dict()).values())]
+		else:
+			candidates = list(self._deviceLinks.values())
+
+		return [x for x in candidates
+		        if x.device is not None
 		        and (not devTypeNames or x.device.deviceTypeName.lower() in devTypeNames)
 		        and (not connectedOnly or x.device.connected)
 		        and (not pairedOnly or x.device.paired)]
@@ -926,7 +1161,17 @@ class DeviceManager(Manager):
 
 
 	def getLinksForDevice(self, device: Device) -> List[DeviceLink]:
-		return [link for link in self._deviceLinks.values() if link.deviceId == device.id]
+		return list(self._linksByDevice.get(device.id, dict()).values())
+
+
+	def getDeviceLink(self, deviceId: int, targetLocation: int) -> Optional[DeviceLink]:
+		"""
+		Returns the link from the given device to the given location, if any
+		:param deviceId: int
+		:param targetLocation: int
+		:return: DeviceLink instance or None
+		"""
+		return next((link for link in list(self._linksByDevice.get(deviceId, dict()).values()) if link.targetLocation == targetLocation), None)
 
 
 	@staticmethod
@@ -259,6 +259,8 @@ class Device(ProjectAliceObject):
 		for ability in abilities:
 			self._abilities |= ability.value
 
+		self.DeviceManager.reindexDevice(self)
+
 
 	# noinspection SqlResolve
 	def saveToDB(self):
@@ -326,6 +328,7 @@ class Device(ProjectAliceObject):
 		:return:
 		"""
 		self._uid = uid
+		self.DeviceManager.reindexDevice(self)
 		self.saveToDB()
 		self.broadcastUpdated()
 
@@ -399,6 +402,7 @@ class Device(ProjectAliceObject):
 	@parentLocation.setter
 	def parentLocation(self, value: int):
 		self._parentLocation = value
+		self.DeviceManager.reindexDevice(self)
 
 
 	@property
@@ -519,18 +523,11 @@ class Device(ProjectAliceObject):
 		:param targetLocation: int
 		:return: bool
 		"""
-		for link in self.DeviceManager.deviceLinks.values():
-			if link.deviceId == self.id and link.targetLocation == targetLocation:
-				return True
-		return False
+		return self.DeviceManager.getDeviceLink(deviceId=self.id, targetLocation=targetLocation) is not None
 
 
 	def getLinks(self) -> dict:
-		links = dict()
-		for link in self.DeviceManager.deviceLinks.values():
-			if link.deviceId == self.id:
-				links[link.id] = link
-		return links
+		return {link.id: link for link in self.DeviceManager.getLinksForDevice(self)}
 
 
 	def getLink(self, targetLocation: int):
@@ -539,11 +536,7 @@ class Device(ProjectAliceObject):
 		:param targetLocation: int
 		:return: DeviceLink
 		"""
-		for link in self.DeviceManager.deviceLinks.values():
-			"""self.logInfo(f'I\'m {self.id}, the link is for {link.deviceId} to location {link.targetLocation} ({targetLocation}?)')"""
-			if link.deviceId == self.id and link.targetLocation == targetLocation:
-				return link
-		return None
+		return self.DeviceManager.getDeviceLink(deviceId=self.id, targetLocation=targetLocation)
 
 
 	def __repr__(self):
@@ -159,6 +159,7 @@ class DeviceLink(ProjectAliceObject):
 	@targetLocation.setter
 	def targetLocation(self, newTarget: int):
 		self._targetLocation = newTarget
+		self.DeviceManager.reindexLink(self)
 
 
 	@property
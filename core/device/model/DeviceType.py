@@ -81,6 +81,19 @@ class DeviceType(ProjectAliceObject):
 		return self._abilities & check == check
 
 
+	def setAbilities(self, abilities: List[DeviceAbility]):
+		"""
+		Sets this device type's abilities. Devices of this type not having abilities of their own get them too
+		:param abilities:
+		:return:
+		"""
+		self._abilities = 0
+		for ability in abilities:
+			self._abilities |= ability.value
+
+		self.DeviceManager.reindexDeviceType(self)
+
+
 	def getDeviceTypeIcon(self) -> Path:
 		"""
 		Return the path of the icon representing this device type
@@ -17,10 +17,11 @@
 #
 #  Last modified: 2021.04.13 at 12:56:46 CEST
 
+import heapq
 import json
-from time import time
-
-import paho.mqtt.client as mqtt
+import threading
+import time
+from typing import Dict, List, Tuple
 
 from core.base.model.ProjectAliceObject import ProjectAliceObject
 from core.commons import constants
@@ -28,47 +29,76 @@ from core.device.model.Device import Device
 
 
 class Heartbeat(ProjectAliceObject):
+	"""
+	Publishes the heartbeats of all local devices over the main mqtt connection, from a single loop
+	that only wakes up when the next beat is due
+	"""
 
-	def __init__(self, device: Device, tempo: int = 0, topic: str = constants.TOPIC_CORE_HEARTBEAT):
+	def __init__(self):
 		super().__init__()
-		self._client = None
+		self._beats: Dict[str, Tuple[float, str, str]] = dict()  # uid: tempo, topic, payload
+		self._schedule: List[Tuple[float, str]] = list()
+		self._lock = threading.Lock()
+		self._wakeup = threading.Event()
+		self._running = False
 
-		if tempo == 0:
-			self._tempo = device.deviceType.heartbeatRate
-		else:
-			self._tempo = tempo
 
-		self._topic = topic
-		self._rnd = 0
-		self._device = device
-		self.startHeartbeat()
+	def addDevice(self, device: Device, tempo: int = 0, topic: str = constants.TOPIC_CORE_HEARTBEAT):
+		"""
+		Starts beating for the given device, right away
+		:param device:
+		:param tempo: seconds between beats, defaults to the device type heartbeat rate
+		:param topic:
+		:return:
+		"""
+		tempo = tempo or device.deviceType.heartbeatRate
 
+		with self._lock:
+			known = device.uid in self._beats
+			self._beats[device.uid] = (tempo, topic, json.dumps({'uid': device.uid}))
+			if not known:
+				heapq.heappush(self._schedule, (time.monotonic(), device.uid))
 
-	def startHeartbeat(self):
-		self._rnd = int(time())
-		self.ThreadManager.newThread(name=f'heartBeatThread-{self._rnd}', target=self.thread)
+		self._wakeup.set()
 
 
-	def stopHeartBeat(self):
-		self.ThreadManager.terminateThread(name=f'heartBeatThread-{self._rnd}')
+	def removeDevice(self, uid: str):
+		with self._lock:
+			self._beats.pop(uid, None)
+			self._schedule = [beat for beat in self._schedule if beat[1] != uid]
+			heapq.heapify(self._schedule)
 
 
-	def thread(self):
-		self._client = mqtt.Client()
+	def startHeartbeat(self):
+		if self._running:
+			return
 
-		if self.ConfigManager.getAliceConfigByName('mqttUser') and self.ConfigManager.getAliceConfigByName('mqttPassword'):
-			self._client.username_pw_set(self.ConfigManager.getAliceConfigByName('mqttUser'), self.ConfigManager.getAliceConfigByName('mqttPassword'))
+		self._running = True
+		self.ThreadManager.newThread(name='heartBeatThread', target=self.thread)
 
-		if self.ConfigManager.getAliceConfigByName('mqttTLSFile'):
-			self._client.tls_set(certfile=self.ConfigManager.getAliceConfigByName('mqttTLSFile'))
-			self._client.tls_insecure_set(False)
 
-		self._client.connect(self.ConfigManager.getAliceConfigByName('mqttHost'), int(self.ConfigManager.getAliceConfigByName('mqttPort')))
-		self._client.loop_start()
-		self.beat()
+	def stopHeartBeat(self):
+		self._running = False
+		self._wakeup.set()
+		self.ThreadManager.terminateThread(name='heartBeatThread')
 
 
-	def beat(self):
-		if not self.ProjectAlice.shuttingDown:
-			self._client.publish(topic=self._topic, payload=json.dumps({'uid': self._device.uid}), qos=0, retain=False)
-		self.ThreadManager.newTimer(interval=self._tempo, func=self.beat)
+	def thread(self):
+		while self._running:
+			self._wakeup.clear()
+			due = list()
+			with self._lock:
+				now = time.monotonic()
+				while self._schedule and self._schedule[0][0] <= now:
+					_, uid = heapq.heappop(self._schedule)
+					tempo, topic, payload = self._beats[uid]
+					due.append((topic, payload))
+					heapq.heappush(self._schedule, (now + tempo, uid))
+
+				timeout = self._schedule[0][0] - now if self._schedule else None
+
+			if not self.ProjectAlice.shuttingDown:
+				for topic, payload in due:
+					self.MqttManager.publish(topic=topic, payload=payload, qos=0, retain=False)
+
+			self._wakeup.wait(timeout=timeout)
@@ -20,7 +20,6 @@
 import json
 import uuid
 from pathlib import Path
-from threading import Timer
 from typing import Dict, Optional, Set
 
 from paho.mqtt.client import MQTTMessage
@@ -29,6 +28,7 @@ from core.base.model.Manager import Manager
 from core.commons import constants
 from core.device.model.DeviceAbility import DeviceAbility
 from core.dialog.model.DialogSession import DialogSession
+from core.util.model.ThreadTimer import ThreadTimer
 from core.voice.WakewordRecorder import WakewordRecorderState
 
 
@@ -46,7 +46,7 @@ class DialogManager(Manager):
 		self._sessionsByDeviceUids: Dict[str: DialogSession] = dict()
 		self._endedSessions: Dict[str: DialogSession] = dict()
 		self._feedbackSounds: Dict[str: bool] = dict()
-		self._sessionTimeouts: Dict[str, Timer] = dict()
+		self._sessionTimeouts: Dict[str, ThreadTimer] = dict()
 		self._revivePendingSessions: Dict[str, DialogSession] = dict()
 
 		self._disabledByDefaultIntents = set()
@@ -257,6 +257,7 @@ class DialogManager(Manager):
 			payload={
 				'input'       : session.payload['text'],
 				'intentFilter': session.intentFilter if session.intentFilter else list(self._enabledByDefaultIntents),
+				'id'          : str(uuid.uuid4()),
 				'sessionId'   : session.sessionId
 			}
 		)
@@ -504,7 +505,7 @@ class DialogManager(Manager):
 			return
 
 		session.previousInput = session.input
-		self.databaseInsert(
+		self.databaseQueueInsert(
 			tableName='notRecognizedIntents',
 			values={
 				'text': session.input
@@ -241,7 +241,7 @@ class DialogTemplateManager(Manager):
 
 		skill.addUtterance(text=text, intent=intent)
 		self.DialogManager.cleanNotRecognizedIntent(text=text)
-		self.ThreadManager.doLater(interval=2, func=self.AssistantManager.checkAssistant)
+		self.ThreadManager.doLaterInThread(interval=2, name='checkAssistant', func=self.AssistantManager.checkAssistant)
 
 
 	@classmethod
@@ -17,6 +17,7 @@
 #
 #  Last modified: 2021.04.13 at 12:56:47 CEST
 
+import uuid
 from collections import deque
 
 from paho.mqtt.client import MQTTMessage
@@ -90,7 +91,8 @@ class MultiIntentManager(Manager):
 		self.MqttManager.publish(topic=constants.TOPIC_NLU_QUERY, payload={
 			'input'       : string,
 			'sessionId'   : session.sessionId,
-			'intentFilter': session.intentFilter
+			'intentFilter': session.intentFilter,
+			'id'          : str(uuid.uuid4())
 		})
 
 
@@ -19,6 +19,7 @@
 
 from __future__ import annotations
 
+from collections import defaultdict
 from dataclasses import dataclass, field
 from typing import Any, Optional
 
@@ -74,9 +75,10 @@ class DialogSession(object):
 		self.message = message
 		self.intentName = message.topic
 		self.payload = commonsManager.payload(message)
-		self.slots = commonsManager.parseSlots(message)
-		self.slotsAsObjects = commonsManager.parseSlotsToObjects(message)
-		self.customData = commonsManager.parseCustomData(message)
+		# Parsed values are shared with the message, the session gets its own copies to update
+		self.slots = dict(commonsManager.parseSlots(message))
+		self.slotsAsObjects = defaultdict(list, commonsManager.parseSlotsToObjects(message))
+		self.customData = dict(commonsManager.parseCustomData(message))
 
 
 	def update(self, message: MQTTMessage):
@@ -18,14 +18,26 @@
 #  Last modified: 2021.04.13 at 12:56:47 CEST
 
 import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from pathlib import Path
+from typing import Dict, List, Optional
 
 from core.base.model.Manager import Manager
 from core.base.model.StateType import StateType
+from core.commons import constants
 
 
 class NluManager(Manager):
 
+	PROBE_PREFIX = 'nluProbe_'
+	PROBE_TEXT = 'hello'
+	PROBE_INTERVAL = 0.5
+	ANSWERED_MEMORY = 256
+
+
 	def __init__(self):
 		super().__init__()
 		self._nluEngine = None
@@ -34,6 +46,10 @@ class NluManager(Manager):
 			self._pathToCache.mkdir(parents=True)
 		self._training = False
 
+		self._answered: Dict[str, bool] = OrderedDict()  # Query ids already answered, oldest first
+		self._probes: Dict[str, int] = dict()  # Probe query id: answers received
+		self._responses = threading.Condition()
+
 
 	def onStart(self):
 		super().onStart()
@@ -52,6 +68,88 @@ class NluManager(Manager):
 		self._nluEngine.start()
 
 
+	def reloadEngine(self):
+		"""
+		Makes the running engine serve the newly trained model
+		:return:
+		"""
+		self._nluEngine.reload()
+
+
+	def acceptResponse(self, msg) -> bool:
+		"""
+		While an engine is being swapped, two NLU processes answer every query. Only the first answer to
+		a query goes through, the answers to readiness probes are counted and dropped. Queries sent without
+		an id, by skills or satellites, are told apart by their session and input during a swap
+		:param msg: the NLU answer
+		:return: False if the answer must be ignored
+		"""
+		payload = self.Commons.payload(msg)
+		queryId = payload.get('id')
+		if not queryId:
+			if not self._nluEngine or not self._nluEngine.swapping:
+				return True
+
+			queryId = f'{payload.get("sessionId", "")}/{payload.get("input", "")}'
+
+		with self._responses:
+			if queryId in self._probes:
+				self._probes[queryId] += 1
+				self._responses.notify_all()
+				return False
+
+			if queryId in self._answered:
+				return False
+
+			self._answered[queryId] = True
+			if len(self._answered) > self.ANSWERED_MEMORY:
+				self._answered.popitem(last=False)
+
+		return True
+
+
+	def isProbe(self, msg) -> bool:
+		return str(self.Commons.payload(msg).get('id', '')).startswith(self.PROBE_PREFIX)
+
+
+	def probe(self, answers: int, timeout: float, cancel: Optional[threading.Event] = None) -> bool:
+		"""
+		Readiness probe. Queries the NLU until a query is answered the given amount of times, once per running NLU process
+		:param answers: how many answers a query needs
+		:param timeout: seconds after which to give up
+		:param cancel: gives up as soon as this is set
+		:return: False if not enough answers came in time
+		"""
+		deadline = time.monotonic() + timeout
+		probeIds: List[str] = list()
+
+		try:
+			while self.isActive and time.monotonic() < deadline and not (cancel and cancel.is_set()):
+				probeId = f'{self.PROBE_PREFIX}{uuid.uuid4()}'
+				with self._responses:
+					self._probes[probeId] = 0
+				probeIds.append(probeId)
+
+				self.MqttManager.publish(
+					topic=constants.TOPIC_NLU_QUERY,
+					payload={
+						'input'    : self.PROBE_TEXT,
+						'id'       : probeId,
+						'sessionId': probeId
+					}
+				)
+
+				with self._responses:
+					if self._responses.wait_for(lambda: any(self._probes[queryId] >= answers for queryId in probeIds), timeout=self.PROBE_INTERVAL):
+						return True
+
+			return False
+		finally:
+			with self._responses:
+				for probeId in probeIds:
+					self._probes.pop(probeId, None)
+
+
 	def onBooted(self):
 		super().onBooted()
 		self._nluEngine.start()
@@ -95,10 +193,13 @@ class NluManager(Manager):
 		self._nluEngine.train()
 
 
-	def clearCache(self):
+	def clearCache(self, engines: bool = False):
 		shutil.rmtree(self._pathToCache)
 		self._pathToCache.mkdir()
 
+		if engines and self._nluEngine:
+			self._nluEngine.clearEngineCache()
+
 
 	@property
 	def training(self) -> bool:
@@ -38,9 +38,35 @@ class NluEngine(ProjectAliceObject):
 		self.logInfo(f'Stopping {self.NAME}')
 
 
+	@property
+	def swapping(self) -> bool:
+		"""
+		Whether two processes of the engine are answering the same queries, while the engine is being reloaded
+		:return:
+		"""
+		return False
+
+
+	def reload(self):
+		"""
+		Makes the engine serve its newly trained model. Engines able to do it without downtime should redefine this
+		:return:
+		"""
+		self.stop()
+		self.start()
+
+
 	def train(self):
 		self.logInfo(f'Training {self.NAME}')
 
 
+	def clearEngineCache(self):
+		"""
+		Forgets the engines kept from previous trainings, if the engine keeps any
+		:return:
+		"""
+		pass
+
+
 	def convertDialogTemplate(self, file: Path):
 		self.logFatal(f'NLU Engine {self.NAME} is missing implementation of "convertDialogTemplate"')
@@ -0,0 +1,181 @@
+#  Copyright (c) 2021
+#
+#  This file, NluEngineCache.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Optional
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+
+
+class NluEngineCache(ProjectAliceObject):
+	"""
+	Trained NLU engines, kept by fingerprint of the dataset they were trained on. Training again on a
+	dataset already seen, such as after a skill toggle that was reverted, only needs the engine to be
+	copied back in place. Least recently used engines are deleted beyond the configured amount
+	"""
+
+	ACTIVE_FILE = 'active.json'
+
+
+	def __init__(self, root: Path):
+		super().__init__()
+		self._root = root
+		self._lock = threading.Lock()
+
+
+	@property
+	def size(self) -> int:
+		return int(self.ConfigManager.getAliceConfigByName('nluEngineCache'))
+
+
+	@staticmethod
+	def fingerprint(dataset: dict) -> str:
+		"""
+		Identifies a training dataset by its content, no matter the order skills were merged in
+		:param dataset:
+		:return:
+		"""
+		return hashlib.blake2b(json.dumps(dataset, ensure_ascii=False, sort_keys=True).encode()).hexdigest()
+
+
+	def path(self, fingerprint: str) -> Path:
+		return self._root / fingerprint
+
+
+	def contains(self, fingerprint: str) -> bool:
+		return self.path(fingerprint).is_dir()
+
+
+	def active(self, language: str) -> Optional[str]:
+		"""
+		The fingerprint of the engine in use for the given language
+		:param language:
+		:return:
+		"""
+		try:
+			return json.loads((self._root / self.ACTIVE_FILE).read_text()).get(language)
+		except (OSError, ValueError):
+			return None
+
+
+	def setActive(self, language: str, fingerprint: Optional[str]):
+		with self._lock:
+			activeFile = self._root / self.ACTIVE_FILE
+			try:
+				actives = json.loads(activeFile.read_text())
+			except (OSError, ValueError):
+				actives = dict()
+
+			if fingerprint:
+				actives[language] = fingerprint
+			else:
+				actives.pop(language, None)
+
+			self._root.mkdir(parents=True, exist_ok=True)
+			activeFile.write_text(json.dumps(actives, indent='\t', sort_keys=True))
+
+
+	def store(self, fingerprint: str, engine: Path):
+		"""
+		Keeps a copy of a freshly trained engine
+		:param fingerprint: the fingerprint of the dataset the engine was trained on
+		:param engine: the engine directory
+		:return:
+		"""
+		if self.size <= 0:
+			return
+
+		target = self.path(fingerprint)
+		temp = target.with_name(f'{fingerprint}.tmp')
+		try:
+			shutil.rmtree(temp, ignore_errors=True)
+			shutil.copytree(engine, temp)
+			shutil.rmtree(target, ignore_errors=True)
+			temp.rename(target)
+			os.utime(target)
+		except OSError as e:
+			self.logWarning(f'Could not cache NLU engine: {e}')
+			shutil.rmtree(temp, ignore_errors=True)
+			return
+
+		self.evict(keep=fingerprint)
+
+
+	def restore(self, fingerprint: str, destination: Path) -> bool:
+		"""
+		Copies a cached engine to where the NLU loads it from, replacing what's there only once the copy is complete
+		:param fingerprint: the fingerprint of the dataset
+		:param destination: the engine directory to replace
+		:return: False if no engine is cached for that fingerprint or it couldn't be copied
+		"""
+		source = self.path(fingerprint)
+		if not source.is_dir():
+			return False
+
+		temp = destination.with_name(f'{destination.name}.tmp')
+		try:
+			shutil.rmtree(temp, ignore_errors=True)
+			shutil.copytree(source, temp)
+			if destination.exists():
+				shutil.rmtree(destination)
+			temp.rename(destination)
+		except OSError as e:
+			self.logWarning(f'Could not restore cached NLU engine: {e}')
+			shutil.rmtree(temp, ignore_errors=True)
+			return False
+
+		try:
+			os.utime(source)  # Marks it as recently used
+		except OSError:
+			pass
+
+		return True
+
+
+	def evict(self, keep: str = ''):
+		"""
+		Deletes the least recently used engines until only the configured amount is left
+		:param keep: an engine never to evict, usually the one just stored
+		:return:
+		"""
+		if not self._root.is_dir():
+			return
+
+		engines = sorted((path for path in self._root.iterdir() if path.is_dir() and path.suffix != '.tmp'), key=lambda path: path.stat().st_mtime, reverse=True)
+		kept = 1 if keep else 0
+		for engine in engines:
+			if engine.name == keep:
+				continue
+
+			if kept < self.size:
+				kept += 1
+				continue
+
+			shutil.rmtree(engine, ignore_errors=True)
+			self.logDebug(f'Evicted NLU engine **{engine.name[:8]}** from cache')
+
+
+	def clear(self):
+		with self._lock:
+			shutil.rmtree(self._root, ignore_errors=True)
@@ -20,11 +20,13 @@
 import json
 import re
 import shutil
+import threading
 from pathlib import Path
 from subprocess import CompletedProcess
 
 from core.commons import constants
 from core.nlu.model.NluEngine import NluEngine
+from core.nlu.model.NluEngineCache import NluEngineCache
 from core.util.Stopwatch import Stopwatch
 from core.webui.model.UINotificationType import UINotificationType
 
@@ -32,17 +34,97 @@ from core.webui.model.UINotificationType import UINotificationType
 class SnipsNlu(NluEngine):
 	NAME = 'Snips NLU'
 	UTTERANCE_REGEX = re.compile('{(.+?:=>.+?)}')
+	SLOTS = ('SnipsNLUBlue', 'SnipsNLUGreen')  # The two processes taking turns serving queries
+	READY_TIMEOUT = 60  # Seconds a new process gets to load its engine
 
 
 	def __init__(self):
 		super().__init__()
 		self._cachePath = Path(self.Commons.rootDir(), f'var/cache/nlu/trainingData')
+		self._engineCache = NluEngineCache(Path(self.Commons.rootDir(), 'var/cache/nlu/engines'))
 		self._timer = None
+		self._slot = ''  # The process serving queries, empty if not started
+		self._swapLock = threading.Lock()
+		self._swapping = False
+		self._cancelSwap = threading.Event()
+
+
+	@property
+	def engineCache(self) -> NluEngineCache:
+		return self._engineCache
+
+
+	@property
+	def enginePath(self) -> Path:
+		return Path(self.Commons.rootDir(), f'trained/assistants/{self.LanguageManager.activeLanguage}/nlu_engine')
+
+
+	@property
+	def swapping(self) -> bool:
+		return self._swapping
 
 
 	def start(self):
+		if self._slot:
+			return
+
 		super().start()
+		self._slot = self.SLOTS[0]
+		self._runProcess(self._slot)
+
 
+	def stop(self):
+		super().stop()
+		self._cancelSwap.set()  # Don't wait on a swap to be done with its readiness probe
+		with self._swapLock:
+			self._cancelSwap.clear()
+			if self._slot:
+				self.SubprocessManager.terminateSubprocess(name=self._slot)
+				self._slot = ''
+
+
+	def reload(self):
+		if not self._slot:
+			self.start()
+			return
+
+		self.ThreadManager.newThread(name='NLUSwap', target=self._swapProcesses)
+
+
+	def _swapProcesses(self):
+		"""
+		Starts a second process on the new engine next to the one serving queries, and retires
+		the old one once the new one answers, so that intents are recognized all along
+		:return:
+		"""
+		with self._swapLock:
+			if not self._slot:
+				return
+
+			old = self._slot
+			new = self.SLOTS[1] if old == self.SLOTS[0] else self.SLOTS[0]
+
+			self.logInfo('Starting the new NLU engine next to the running one')
+			self._swapping = True
+			try:
+				self._runProcess(new)
+
+				if self.NluManager.probe(answers=2, timeout=self.READY_TIMEOUT, cancel=self._cancelSwap):
+					self.logInfo('New NLU engine is ready')
+				elif self._cancelSwap.is_set():
+					self.logInfo('NLU engine swap cancelled')
+					self.SubprocessManager.terminateSubprocess(name=new)
+					return
+				else:
+					self.logWarning(f'New NLU engine did not answer within {self.READY_TIMEOUT} seconds, switching anyway')
+
+				self._slot = new
+				self.SubprocessManager.terminateSubprocess(name=old)
+			finally:
+				self._swapping = False
+
+
+	def _runProcess(self, name: str):
 		cmd = f'snips-nlu -a {self.Commons.rootDir()}/assistant --mqtt {self.ConfigManager.getAliceConfigByName("mqttHost")}:{self.ConfigManager.getAliceConfigByName("mqttPort")}'
 
 		if self.ConfigManager.getAliceConfigByName('mqttUser'):
@@ -51,12 +133,11 @@ class SnipsNlu(NluEngine):
 		if self.ConfigManager.getAliceConfigByName('mqttTLSFile'):
 			cmd += f' --mqtt-tls-cafile {self.ConfigManager.getAliceConfigByName("mqttTLSFile")}'
 
-		self.SubprocessManager.runSubprocess(cmd=cmd, name='SnipsNLU', autoRestart=True)
+		self.SubprocessManager.runSubprocess(cmd=cmd, name=name, autoRestart=True)
 
 
-	def stop(self):
-		super().stop()
-		self.SubprocessManager.terminateSubprocess(name='SnipsNLU')
+	def clearEngineCache(self):
+		self._engineCache.clear()
 
 
 	def convertDialogTemplate(self, file: Path):
@@ -144,6 +225,20 @@ class SnipsNlu(NluEngine):
 				dataset['entities'].update(trainingData['entities'])
 				dataset['intents'].update(trainingData['intents'])
 
+			fingerprint = self._engineCache.fingerprint(dataset)
+			if self.enginePath.exists() and self._engineCache.active(self.getLanguage()) == fingerprint:
+				self.logInfo('NLU dataset unchanged, no training needed')
+				self.trainingDone(reload=False)
+				self.NluManager.training = False
+				return
+
+			if self._engineCache.restore(fingerprint, self.enginePath):
+				self.logInfo(f'Reusing the NLU engine trained earlier on the same dataset **{fingerprint[:8]}**')
+				self._engineCache.setActive(self.getLanguage(), fingerprint)
+				self.trainingDone()
+				self.NluManager.training = False
+				return
+
 			datasetFile = Path('/tmp/snipsNluDataset.json')
 
 			with datasetFile.open('w') as fp:
@@ -153,14 +248,14 @@ class SnipsNlu(NluEngine):
 
 			# Now that we have generated the dataset, let's train in the background if we are already booted, else do it directly
 			if self.ProjectAlice.isBooted:
-				self.ThreadManager.newThread(name='NLUTraining', target=self.nluTrainingThread, args=[datasetFile])
+				self.ThreadManager.newThread(name='NLUTraining', target=self.nluTrainingThread, args=[datasetFile, fingerprint])
 			else:
-				self.nluTrainingThread(datasetFile)
+				self.nluTrainingThread(datasetFile, fingerprint)
 		except:
 			self.NluManager.training = False
 
 
-	def nluTrainingThread(self, datasetFile: Path):
+	def nluTrainingThread(self, datasetFile: Path, fingerprint: str = ''):
 		try:
 			with Stopwatch() as stopWatch:
 				self.logInfo('Begin training...')
@@ -175,7 +270,7 @@ class SnipsNlu(NluEngine):
 				if training.returncode != 0:
 					self.logError(f'Error while training Snips NLU: {training.stderr.decode()}')
 
-				assistantPath = Path(self.Commons.rootDir(), f'trained/assistants/{self.LanguageManager.activeLanguage}/nlu_engine')
+				assistantPath = self.enginePath
 
 				if not tempTrainingData.exists():
 					self.trainingFailed()
@@ -186,30 +281,44 @@ class SnipsNlu(NluEngine):
 					self._timer.cancel()
 					return
 
+				if fingerprint:
+					self._engineCache.store(fingerprint, tempTrainingData)
+
 				if assistantPath.exists():
 					shutil.rmtree(assistantPath)
 
 				shutil.move(tempTrainingData, assistantPath)
+				self._engineCache.setActive(self.getLanguage(), fingerprint or None)
 
 			self._timer.cancel()
-			self.MqttManager.publish(constants.TOPIC_NLU_TRAINING_STATUS, payload={'status': 'done'})
-			self.WebUINotificationManager.newNotification(
-				typ=UINotificationType.INFO,
-				notification='nluTrainingDone',
-				key='nluTraining'
-			)
-
-			self.ThreadManager.getEvent('TrainAssistant').clear()
 			self.logInfo(f'Snips NLU trained in {stopWatch} seconds')
-
-			self.broadcast(method=constants.EVENT_NLU_TRAINED, exceptions=[constants.DUMMY], propagateToSkills=True)
-			self.NluManager.restartEngine()
+			self.trainingDone()
 		except:
 			self.trainingFailed()
 		finally:
 			self.NluManager.training = False
 
 
+	def trainingDone(self, reload: bool = True):
+		"""
+		Announces the new engine and has the NLU serve it
+		:param reload: False if the NLU already serves this engine
+		:return:
+		"""
+		self.MqttManager.publish(constants.TOPIC_NLU_TRAINING_STATUS, payload={'status': 'done'})
+		self.WebUINotificationManager.newNotification(
+			typ=UINotificationType.INFO,
+			notification='nluTrainingDone',
+			key='nluTraining'
+		)
+
+		self.ThreadManager.getEvent('TrainAssistant').clear()
+
+		self.broadcast(method=constants.EVENT_NLU_TRAINED, exceptions=[constants.DUMMY], propagateToSkills=True)
+		if reload:
+			self.NluManager.reloadEngine()
+
+
 	def trainingStatus(self, dots: str = ''):
 		count = dots.count('.')
 		if not dots or count > 7:
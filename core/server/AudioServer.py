@@ -17,29 +17,32 @@
 #
 #  Last modified: 2021.07.28 at 17:03:33 CEST
 
-import io
 import time
 import uuid
 import wave
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
 
 import sounddevice as sd
 # noinspection PyUnresolvedReferences,PyProtectedMember
 from scipy._lib._ccallback import CData
 from webrtcvad import Vad
 
-from core.ProjectAliceExceptions import PlayBytesStopped
 from core.base.model.Manager import Manager
 from core.commons import constants
 from core.dialog.model.DialogSession import DialogSession
-from core.util.model.AliceEvent import AliceEvent
+from core.server.model.AudioBus import AudioBus
+from core.server.model.AudioFrame import AudioFrame
+from core.server.model.AudioPlayer import AudioPlayer, PlaybackClip
+from core.server.model.AudioRingBuffer import AudioRingBuffer
 from core.voice.WakewordRecorder import WakewordRecorderState
 
 
 class AudioManager(Manager):
 	SAMPLERATE = 16000
 	FRAMES_PER_BUFFER = 320
+	CAPTURE_BUFFER_SIZE = 150  # frames, 3 seconds of audio
+	DROP_REPORT_INTERVAL = 60
 
 	LAST_USER_SPEECH = 'var/cache/lastUserpeech_{}_{}.wav'
 	SECOND_LAST_USER_SPEECH = 'var/cache/secondLastUserSpeech_{}_{}.wav'
@@ -48,10 +51,16 @@ class AudioManager(Manager):
 	def __init__(self):
 		super().__init__()
 
-		self._stopPlayingFlag: Optional[AliceEvent] = None
-		self._playing = False
+		self._player = AudioPlayer(onClipFinished=self.onClipFinished)
+		self._audioBus = AudioBus()
 		self._waves: Dict[str, wave.Wave_write] = dict()
 		self._audioInputStream = None
+		self._captureBuffer = AudioRingBuffer(frameSize=self.FRAMES_PER_BUFFER * 2, capacity=self.CAPTURE_BUFFER_SIZE)
+		self._inputOverflows = 0
+		self._frameSequence = 0
+		self._deviceUid = ''
+		self._audioFrameTopic = ''
+		self._frameFormat = AudioFrame.FORMAT_RAW
 
 		if not self.ConfigManager.getAliceConfigByName('disableCapture'):
 			self._vad = Vad(2)
@@ -86,9 +95,9 @@ class AudioManager(Manager):
 			self._audioOutput = self.ConfigManager.getAliceConfigByName('outputDevice')
 
 		self.setDefaults()
+		self.updateAudioFrameFormat()
 
-		self._stopPlayingFlag = self.ThreadManager.newEvent('stopPlaying')
-		self.MqttManager.mqttClient.subscribe(constants.TOPIC_AUDIO_FRAME.format(self.ConfigManager.getAliceConfigByName('uuid')))
+		self._player.start()
 
 
 	def onBooted(self):
@@ -105,10 +114,12 @@ class AudioManager(Manager):
 
 	def onStop(self):
 		super().onStop()
+		self._player.stop()
 		if self._audioInputStream:
 			self._audioInputStream.stop(ignore_errors=True)
 			self._audioInputStream.close(ignore_errors=True)
-		self.MqttManager.mqttClient.unsubscribe(constants.TOPIC_AUDIO_FRAME.format(self.DeviceManager.getMainDevice().uid))
+		if self._deviceUid:
+			self._audioBus.removeLocalDevice(self._deviceUid)
 
 
 	def onStartListening(self, session: DialogSession):
@@ -141,18 +152,41 @@ class AudioManager(Manager):
 		self._waves[deviceUid].writeframes(frame)
 
 
+	def captureAudio(self, inData: bytes, _frames: int, _time: CData, status: sd.CallbackFlags):
+		"""
+		Input stream callback, running on the audio thread. Only copies the samples to the capture buffer,
+		anything else could make it miss the next block
+		:return:
+		"""
+		if status.input_overflow:
+			self._inputOverflows += 1
+
+		self._captureBuffer.write(inData)
+
+
 	def publishAudio(self) -> None:
 		"""
-		captures the audio and broadcasts it via publishAudioFrames to the topic 'hermes/audioServer/{}/audioFrame'
-		furthermore it will publish VAD_UP and VAD_DOWN when detected
+		Consumes the captured audio and broadcasts it via publishAudioFrames to the topic 'hermes/audioServer/{}/audioFrame'
+		furthermore it will publish VAD_UP and VAD_DOWN when detected. Capture runs on its own, so that a slow
+		publish doesn't block it and costs dropped frames at worst, which are counted
 		:return:
 		"""
 		self.logInfo('Starting audio publisher')
+
+		self._deviceUid = self.DeviceManager.getMainDevice().uid
+		self._audioFrameTopic = constants.TOPIC_AUDIO_FRAME.format(self._deviceUid)
+		self._audioBus.addLocalDevice(self._deviceUid)
+		vadUpTopic = constants.TOPIC_VAD_UP.format(self._deviceUid)
+		vadDownTopic = constants.TOPIC_VAD_DOWN.format(self._deviceUid)
+		vadPayload = {'siteId': self._deviceUid}
+
+		self._captureBuffer.clear()
 		self._audioInputStream = sd.RawInputStream(
 			dtype='int16',
 			channels=1,
 			samplerate=self.SAMPLERATE,
 			blocksize=self.FRAMES_PER_BUFFER,
+			callback=self.captureAudio
 		)
 		self._audioInputStream.start()
 
@@ -161,23 +195,31 @@ class AudioManager(Manager):
 		speechFrames = 0
 		minSpeechFrames = round(silence / 3)
 
+		reportedDrops = 0
+		nextDropReport = time.monotonic() + self.DROP_REPORT_INTERVAL
+
 		while True:
 			if self.ProjectAlice.shuttingDown:
 				break
 
 			try:
-				frames = self._audioInputStream.read(frames=self.FRAMES_PER_BUFFER)[0]
+				if time.monotonic() >= nextDropReport:
+					nextDropReport = time.monotonic() + self.DROP_REPORT_INTERVAL
+					drops = self.droppedFrames
+					if drops > reportedDrops:
+						self.logWarning(f'Audio capture dropped **{drops - reportedDrops}** frames in the last {self.DROP_REPORT_INTERVAL} seconds ({self._captureBuffer.overruns} buffer overruns, {self._inputOverflows} input overflows in total)')
+						reportedDrops = drops
+
+				frames = self._captureBuffer.read(timeout=0.5)
+				if frames is None:
+					continue
 
 				if self._vad.is_speech(frames, self.SAMPLERATE):
 					if not speech and speechFrames < minSpeechFrames:
 						speechFrames += 1
 					elif speechFrames >= minSpeechFrames:
 						speech = True
-						self.MqttManager.publish(
-							topic=constants.TOPIC_VAD_UP.format(self.DeviceManager.getMainDevice().uid),
-							payload={
-								'siteId': self.DeviceManager.getMainDevice().uid
-							})
+						self.MqttManager.publish(topic=vadUpTopic, payload=vadPayload)
 						silence = self.SAMPLERATE / self.FRAMES_PER_BUFFER
 						speechFrames = 0
 				else:
@@ -186,11 +228,7 @@ class AudioManager(Manager):
 							silence -= 1
 						else:
 							speech = False
-							self.MqttManager.publish(
-								topic=constants.TOPIC_VAD_DOWN.format(self.DeviceManager.getMainDevice().uid),
-								payload={
-									'siteId': self.DeviceManager.getMainDevice().uid
-								})
+							self.MqttManager.publish(topic=vadDownTopic, payload=vadPayload)
 					else:
 						speechFrames = 0
 
@@ -199,27 +237,74 @@ class AudioManager(Manager):
 				self.logDebug(f'Error publishing frame: {e}')
 
 
+	@property
+	def droppedFrames(self) -> int:
+		"""
+		Captured frames lost so far, because the publisher fell behind or the audio device overflowed
+		:return:
+		"""
+		return self._captureBuffer.overruns + self._inputOverflows
+
+
 	def publishAudioFrames(self, frames: bytes) -> None:
 		"""
-		receives some audio frames, adds them to the buffer and publishes them to MQTT
+		receives some audio frames, hands them to the local consumers over the audio bus and mirrors them to MQTT
+		for remote listeners, as a raw pcm frame or a wav container depending on the negotiated frame format
 		:param frames:
 		:return:
 		"""
-		with io.BytesIO() as buffer:
-			with wave.open(buffer, 'wb') as wav:
-				wav.setnchannels(1)
-				wav.setsampwidth(2)
-				wav.setframerate(self.SAMPLERATE)
-				wav.writeframes(frames)
+		self._frameSequence = (self._frameSequence + 1) & 0xFFFFFFFF
+		frame = AudioFrame(pcm=frames, sampleRate=self.SAMPLERATE, sequence=self._frameSequence)
+
+		if self._frameFormat == AudioFrame.FORMAT_WAV:
+			payload = frame.toWav()
+		else:
+			payload = frame.toPayload()
 
-			audioFrames = buffer.getvalue()
-			self.MqttManager.publish(topic=constants.TOPIC_AUDIO_FRAME.format(self.DeviceManager.getMainDevice().uid), payload=bytearray(audioFrames))
+		self.dispatchAudioFrame(frame=frame, deviceUid=self._deviceUid or self.DeviceManager.getMainDevice().uid)
+		self.MqttManager.publish(topic=self._audioFrameTopic or constants.TOPIC_AUDIO_FRAME.format(self.DeviceManager.getMainDevice().uid), payload=payload)
+
+
+	def dispatchAudioFrame(self, frame: AudioFrame, deviceUid: str) -> None:
+		"""
+		Delivers a frame to the local consumers subscribed to that device
+		:param frame: the decoded frame
+		:param deviceUid: the device that captured the frame
+		:return:
+		"""
+		self._audioBus.publish(frame, deviceUid)
+
+
+	def subscribeAudioFrames(self, deviceUid: Optional[str], callback: Callable[[AudioFrame, str], None]) -> None:
+		"""
+		Audio frames are not broadcast as an event. Whoever needs them, be it a manager or a skill, subscribes here
+		:param deviceUid: the device to receive the frames of, None for every device
+		:param callback: called with the AudioFrame and the device uid, on the audio thread. It should only queue the frame
+		:return:
+		"""
+		self._audioBus.subscribe(deviceUid, callback)
+
+
+	def unsubscribeAudioFrames(self, callback: Callable[[AudioFrame, str], None], deviceUid: str = None) -> None:
+		"""
+		Stops delivering audio frames to the given callback
+		:param callback:
+		:param deviceUid: only for that device, for every device it was subscribed to if None
+		:return:
+		"""
+		self._audioBus.unsubscribe(callback, deviceUid)
+
+
+	@property
+	def audioBus(self) -> AudioBus:
+		return self._audioBus
 
 
 	def onPlayBytes(self, payload: bytearray, deviceUid: str, sessionId: str = None, requestId: str = None):
 		"""
 		Handles the playing of arbitrary bytes, be it sound, voice or even music.
-		Triggered via MQTT onPlayBytes topic.
+		Triggered via MQTT onPlayBytes topic. The sound is queued on the player and this returns right away,
+		playBytesFinished being published once it was played or stopped.
 		Ignoring any request when sound is disabled via config
 		:param payload:
 		:param deviceUid:
@@ -236,64 +321,43 @@ class AudioManager(Manager):
 			with Path('/tmp/onPlayBytes.wav').open('wb') as file:
 				file.write(payload)
 
-		self._playing = True
-		with io.BytesIO(payload) as buffer:
-			try:
-				with wave.open(buffer, 'rb') as wav:
-					channels = wav.getnchannels()
-					framerate = wav.getframerate()
+		try:
+			clip = PlaybackClip.fromWav(payload, deviceUid=deviceUid, requestId=requestId, sessionId=sessionId)
+		except Exception as e:
+			self.logError(f'Playing wav failed with error: {e}')
+			self.publishPlayBytesFinished(deviceUid=deviceUid, requestId=requestId, sessionId=sessionId)
+			return
 
+		self.logDebug(f'Queuing wav using **{self._audioOutput}** audio output from device **{self.DeviceManager.getDevice(uid=deviceUid).displayName}** (channels: {clip.channels}, rate: {clip.sampleRate})')
+		self._player.play(clip)
 
-					def streamCallback(outData: buffer, frames: int, _time: CData, _status: sd.CallbackFlags):
-						data = wav.readframes(frames)
-						if len(data) < len(outData):
-							outData[:len(data)] = data
-							outData[len(data):] = b'\x00' * (len(outData) - len(data))
-							raise sd.CallbackStop
-						else:
-							outData[:] = data
-
-
-					stream = sd.RawOutputStream(
-						dtype='int16',
-						channels=channels,
-						samplerate=framerate,
-						callback=streamCallback
-					)
-
-					self.logDebug(f'Playing wav stream using **{self._audioOutput}** audio output from device **{self.DeviceManager.getDevice(uid=deviceUid).displayName}** (channels: {channels}, rate: {framerate})')
-					stream.start()
-					while stream.active:
-						if self._stopPlayingFlag.is_set():
-							if not sessionId:
-								raise PlayBytesStopped
-
-							session = self.DialogManager.getSession(sessionId=sessionId)
-							if session.lastWasSoundPlayOnly:
-								raise PlayBytesStopped
-
-							self.MqttManager.publish(
-								topic=constants.TOPIC_TTS_FINISHED,
-								payload={
-									'id'       : requestId,
-									'sessionId': sessionId,
-									'siteId'   : deviceUid
-								}
-							)
-							self.DialogManager.onEndSession(session)
-
-						time.sleep(0.1)
-			except PlayBytesStopped:
-				self.logDebug('Playing bytes stopped')
-			except Exception as e:
-				self.logError(f'Playing wav failed with error: {e}')
-			finally:
-				self.logDebug('Playing bytes finished')
-				stream.stop()
-				stream.close()
-				self._stopPlayingFlag.clear()
-				self._playing = False
 
+	def onClipFinished(self, clip: PlaybackClip):
+		"""
+		Called by the player once a clip was played or cancelled
+		:param clip: PlaybackClip
+		:return:
+		"""
+		if clip.cancelled:
+			self.logDebug('Playing bytes stopped')
+			session = self.DialogManager.getSession(sessionId=clip.sessionId) if clip.sessionId else None
+			if session and not session.lastWasSoundPlayOnly:
+				self.MqttManager.publish(
+					topic=constants.TOPIC_TTS_FINISHED,
+					payload={
+						'id'       : clip.requestId,
+						'sessionId': clip.sessionId,
+						'siteId'   : clip.deviceUid
+					}
+				)
+				self.DialogManager.onEndSession(session)
+		else:
+			self.logDebug('Playing bytes finished')
+
+		self.publishPlayBytesFinished(deviceUid=clip.deviceUid, requestId=clip.requestId, sessionId=clip.sessionId)
+
+
+	def publishPlayBytesFinished(self, deviceUid: str, requestId: str, sessionId: str = None):
 		# Session id support is not Hermes protocol official
 		self.MqttManager.publish(
 			topic=constants.TOPIC_PLAY_BYTES_FINISHED.format(deviceUid),
@@ -305,15 +369,30 @@ class AudioManager(Manager):
 
 
 	def stopPlaying(self):
-		self._stopPlayingFlag.set()
+		self._player.cancel()
 
 
 	def updateAudioDevices(self):
 		self._audioInput = self.ConfigManager.getAliceConfigByName('inputDevice')
 		self._audioOutput = self.ConfigManager.getAliceConfigByName('outputDevice')
 		self.setDefaults()
+		self._player.closeStream()
+
+
+	def updateAudioFrameFormat(self):
+		"""
+		Negotiates the format of the published audio frames. Raw frames are understood by all our own consumers,
+		but the snips binaries listen to the Hermes topic themselves and only understand wav frames
+		:return:
+		"""
+		frameFormat = self.ConfigManager.getAliceConfigByName('audioFrameFormat')
+		if self.ConfigManager.getAliceConfigByName('asr') == 'snips' or self.ConfigManager.getAliceConfigByName('wakewordEngine') == 'snips':
+			frameFormat = AudioFrame.FORMAT_WAV
+
+		self._frameFormat = AudioFrame.FORMAT_WAV if frameFormat == AudioFrame.FORMAT_WAV else AudioFrame.FORMAT_RAW
+		self.logInfo(f'Publishing **{self._frameFormat}** audio frames')
 
 
 	@property
 	def isPlaying(self) -> bool:
-		return self._playing
+		return self._player.busy
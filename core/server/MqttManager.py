@@ -22,21 +22,27 @@ import paho.mqtt.client as mqtt
 import paho.mqtt.publish as publish
 import random
 import re
+import time
 import traceback
 import uuid
 from pathlib import Path
-from typing import List, Union
+from typing import Callable, Dict, List, Union
 
 from core.base.model.Intent import Intent
 from core.base.model.Manager import Manager
 from core.commons import constants
 from core.device.model.Device import Device
 from core.device.model.DeviceAbility import DeviceAbility
+from core.server.model.AudioFrame import AudioFrame
+from core.server.model.MqttEnvelope import MqttEnvelope
+from core.server.model.SoundCache import SoundCache
 
 
 class MqttManager(Manager):
 	DEFAULT_CLIENT_EXTENSION = '@mqtt'
 	TOPIC_AUDIO_FRAME = constants.TOPIC_AUDIO_FRAME.replace('{}', '+')
+	SOUND_CHUNK_TIMEOUT = 5
+	SOUND_STREAM_TIMEOUT = 30  # Seconds after which a stream still missing chunks is forgotten
 
 
 	def __init__(self):
@@ -53,42 +59,48 @@ class MqttManager(Manager):
 
 		self._INTENT_RANDOM_ANSWER = Intent('UserRandomAnswer')
 
+		self._soundCache = SoundCache()
+		self._soundStreams: Dict[str, Dict] = dict()  # request id: {'chunks': {chunk: bytes}, 'lastChunk': monotonic}
+
 
 	def onStart(self):
 		super().onStart()
 
-		self._mqttClient.on_message = self.onMqttMessage
+		self._mqttClient.on_message = self.enveloped(self.onMqttMessage)
 		self._mqttClient.on_connect = self.onConnect
 		self._mqttClient.on_log = self.onLog
 
-		self._mqttClient.message_callback_add(constants.TOPIC_HOTWORD_DETECTED, self.onHotwordDetected)
+		self._mqttClient.message_callback_add(constants.TOPIC_HOTWORD_DETECTED, self.enveloped(self.onHotwordDetected))
 		for username in self.UserManager.getAllUserNames():
-			self._mqttClient.message_callback_add(constants.TOPIC_WAKEWORD_DETECTED.replace('{user}', username), self.onHotwordDetected)
-
-		self._mqttClient.message_callback_add(constants.TOPIC_SESSION_STARTED, self.sessionStarted)
-		self._mqttClient.message_callback_add(constants.TOPIC_ASR_START_LISTENING, self.startListening)
-		self._mqttClient.message_callback_add(constants.TOPIC_ASR_STOP_LISTENING, self.stopListening)
-		self._mqttClient.message_callback_add(constants.TOPIC_ASR_TOGGLE_ON, self.asrToggleOn)
-		self._mqttClient.message_callback_add(constants.TOPIC_ASR_TOGGLE_OFF, self.asrToggleOff)
-		self._mqttClient.message_callback_add(constants.TOPIC_INTENT_PARSED, self.intentParsed)
-		self._mqttClient.message_callback_add(constants.TOPIC_TEXT_CAPTURED, self.captured)
-		self._mqttClient.message_callback_add(constants.TOPIC_TTS_SAY, self.intentSay)
-		self._mqttClient.message_callback_add(constants.TOPIC_TTS_FINISHED, self.sayFinished)
-		self._mqttClient.message_callback_add(constants.TOPIC_SESSION_ENDED, self.sessionEnded)
-		self._mqttClient.message_callback_add(constants.TOPIC_CONTINUE_SESSION, self.continueSession)
-		self._mqttClient.message_callback_add(constants.TOPIC_INTENT_NOT_RECOGNIZED, self.intentNotRecognized)
-		self._mqttClient.message_callback_add(constants.TOPIC_SESSION_QUEUED, self.sessionQueued)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_QUERY, self.nluQuery)
-		self._mqttClient.message_callback_add(constants.TOPIC_PARTIAL_TEXT_CAPTURED, self.nluPartialCapture)
-		self._mqttClient.message_callback_add(constants.TOPIC_HOTWORD_TOGGLE_ON, self.hotwordToggleOn)
-		self._mqttClient.message_callback_add(constants.TOPIC_HOTWORD_TOGGLE_OFF, self.hotwordToggleOff)
-		self._mqttClient.message_callback_add(constants.TOPIC_END_SESSION, self.eventEndSession)
-		self._mqttClient.message_callback_add(constants.TOPIC_START_SESSION, self.startSession)
-		self._mqttClient.message_callback_add(constants.TOPIC_DEVICE_HEARTBEAT, self.deviceHeartbeat)
-		self._mqttClient.message_callback_add(constants.TOPIC_TOGGLE_FEEDBACK_ON, self.toggleFeedback)
-		self._mqttClient.message_callback_add(constants.TOPIC_TOGGLE_FEEDBACK_OFF, self.toggleFeedback)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_INTENT_NOT_RECOGNIZED, self.nluIntentNotRecognized)
-		self._mqttClient.message_callback_add(constants.TOPIC_NLU_ERROR, self.nluError)
+			self._mqttClient.message_callback_add(constants.TOPIC_WAKEWORD_DETECTED.replace('{user}', username), self.enveloped(self.onHotwordDetected))
+
+		self._mqttClient.message_callback_add(constants.TOPIC_SESSION_STARTED, self.enveloped(self.sessionStarted))
+		self._mqttClient.message_callback_add(constants.TOPIC_ASR_START_LISTENING, self.enveloped(self.startListening))
+		self._mqttClient.message_callback_add(constants.TOPIC_ASR_STOP_LISTENING, self.enveloped(self.stopListening))
+		self._mqttClient.message_callback_add(constants.TOPIC_ASR_TOGGLE_ON, self.enveloped(self.asrToggleOn))
+		self._mqttClient.message_callback_add(constants.TOPIC_ASR_TOGGLE_OFF, self.enveloped(self.asrToggleOff))
+		self._mqttClient.message_callback_add(constants.TOPIC_INTENT_PARSED, self.enveloped(self.intentParsed))
+		self._mqttClient.message_callback_add(constants.TOPIC_TEXT_CAPTURED, self.enveloped(self.captured))
+		self._mqttClient.message_callback_add(constants.TOPIC_TTS_SAY, self.enveloped(self.intentSay))
+		self._mqttClient.message_callback_add(constants.TOPIC_TTS_FINISHED, self.enveloped(self.sayFinished))
+		self._mqttClient.message_callback_add(constants.TOPIC_SESSION_ENDED, self.enveloped(self.sessionEnded))
+		self._mqttClient.message_callback_add(constants.TOPIC_CONTINUE_SESSION, self.enveloped(self.continueSession))
+		self._mqttClient.message_callback_add(constants.TOPIC_INTENT_NOT_RECOGNIZED, self.enveloped(self.intentNotRecognized))
+		self._mqttClient.message_callback_add(constants.TOPIC_SESSION_QUEUED, self.enveloped(self.sessionQueued))
+		self._mqttClient.message_callback_add(constants.TOPIC_NLU_QUERY, self.enveloped(self.nluQuery))
+		self._mqttClient.message_callback_add(constants.TOPIC_PARTIAL_TEXT_CAPTURED, self.enveloped(self.nluPartialCapture))
+		self._mqttClient.message_callback_add(constants.TOPIC_HOTWORD_TOGGLE_ON, self.enveloped(self.hotwordToggleOn))
+		self._mqttClient.message_callback_add(constants.TOPIC_HOTWORD_TOGGLE_OFF, self.enveloped(self.hotwordToggleOff))
+		self._mqttClient.message_callback_add(constants.TOPIC_END_SESSION, self.enveloped(self.eventEndSession))
+		self._mqttClient.message_callback_add(constants.TOPIC_START_SESSION, self.enveloped(self.startSession))
+		self._mqttClient.message_callback_add(constants.TOPIC_DEVICE_HEARTBEAT, self.enveloped(self.deviceHeartbeat))
+		self._mqttClient.message_callback_add(constants.TOPIC_TOGGLE_FEEDBACK_ON, self.enveloped(self.toggleFeedback))
+		self._mqttClient.message_callback_add(constants.TOPIC_TOGGLE_FEEDBACK_OFF, self.enveloped(self.toggleFeedback))
+		self._mqttClient.message_callback_add(constants.TOPIC_NLU_INTENT_NOT_RECOGNIZED, self.enveloped(self.nluIntentNotRecognized))
+		self._mqttClient.message_callback_add(constants.TOPIC_NLU_ERROR, self.enveloped(self.nluError))
+		self._mqttClient.message_callback_add(constants.TOPIC_PLAY_BYTES_STREAMING.format(self.ConfigManager.getAliceConfigByName('uuid')), self.enveloped(self.topicPlayBytesStreaming))
+
+		self._soundCache.preload(Path(self.Commons.rootDir()) / 'system' / 'sounds')
 
 		self.connect()
 
@@ -97,11 +109,12 @@ class MqttManager(Manager):
 		super().onBooted()
 
 		for device in self.DeviceManager.getDevicesWithAbilities(abilities=[DeviceAbility.PLAY_SOUND, DeviceAbility.CAPTURE_SOUND], connectedOnly=False):
-			self._mqttClient.message_callback_add(constants.TOPIC_VAD_UP.format(device.uid), self.onVADUp)
-			self._mqttClient.message_callback_add(constants.TOPIC_VAD_DOWN.format(device.uid), self.onVADDown)
+			self._mqttClient.message_callback_add(constants.TOPIC_VAD_UP.format(device.uid), self.enveloped(self.onVADUp))
+			self._mqttClient.message_callback_add(constants.TOPIC_VAD_DOWN.format(device.uid), self.enveloped(self.onVADDown))
 
-			self._mqttClient.message_callback_add(constants.TOPIC_PLAY_BYTES.format(device.uid), self.topicPlayBytes)
-			self._mqttClient.message_callback_add(constants.TOPIC_PLAY_BYTES_FINISHED.format(device.uid), self.topicPlayBytesFinished)
+			self._mqttClient.message_callback_add(constants.TOPIC_PLAY_BYTES.format(device.uid), self.enveloped(self.topicPlayBytes))
+			self._mqttClient.message_callback_add(constants.TOPIC_PLAY_BYTES_STREAMING.format(device.uid), self.enveloped(self.topicPlayBytesStreaming))
+			self._mqttClient.message_callback_add(constants.TOPIC_PLAY_BYTES_FINISHED.format(device.uid), self.enveloped(self.topicPlayBytesFinished))
 
 
 	def onStop(self):
@@ -109,6 +122,20 @@ class MqttManager(Manager):
 		self.disconnect()
 
 
+	@staticmethod
+	def enveloped(callback: Callable) -> Callable:
+		"""
+		Wraps a paho message callback so that it's given a MqttEnvelope instead of the raw message,
+		letting every manager, session and skill handling that message share a single payload parsing
+		:param callback: the message callback
+		:return: the wrapped callback
+		"""
+		def wrapper(client, userdata, message: mqtt.MQTTMessage):
+			return callback(client, userdata, MqttEnvelope.wrap(message))
+
+		return wrapper
+
+
 	def onLog(self, _client, _userdata, level, buf):
 		if level != 16:
 			self.logError(buf)
@@ -152,6 +179,7 @@ class MqttManager(Manager):
 
 		subscribedEvents.append((constants.TOPIC_PLAY_BYTES.format(self.ConfigManager.getAliceConfigByName('uuid')), 0))
 		subscribedEvents.append((constants.TOPIC_PLAY_BYTES_FINISHED.format(self.ConfigManager.getAliceConfigByName('uuid')), 0))
+		subscribedEvents.append((constants.TOPIC_PLAY_BYTES_STREAMING.format(self.ConfigManager.getAliceConfigByName('uuid')), 0))
 
 		for device in self.DeviceManager.getDevicesWithAbilities(abilities=[DeviceAbility.PLAY_SOUND, DeviceAbility.CAPTURE_SOUND], connectedOnly=False):
 			subscribedEvents.append((constants.TOPIC_VAD_UP.format(device.id), 0))
@@ -201,14 +229,18 @@ class MqttManager(Manager):
 
 	def onMqttMessage(self, _client, _userdata, message: mqtt.MQTTMessage):
 		try:
-			if self._audioFrameRegex.match(message.topic):
-				self.broadcast(
-					method=constants.EVENT_AUDIO_FRAME,
-					exceptions=[self.name],
-					propagateToSkills=True,
-					message=message,
-					deviceUid=message.topic.replace('hermes/audioServer/', '').replace('/audioFrame', '')
-				)
+			audioFrameMatch = self._audioFrameRegex.match(message.topic)
+			if audioFrameMatch:
+				deviceUid = audioFrameMatch.group(1)
+				if self.AudioServer.audioBus.isLocal(deviceUid):
+					return  # Our own frames were already delivered over the audio bus, this is the mirrored copy
+
+				frame = AudioFrame.fromPayload(message.payload)
+				if frame is None:  # A frame without samples is still a valid one, but it has no length
+					self.logError(f'Unsupported audio frame received from device **{deviceUid}**')
+					return
+
+				self.AudioServer.dispatchAudioFrame(frame=frame, deviceUid=deviceUid)
 				return
 
 			if message.topic == constants.TOPIC_INTENT_PARSED:
@@ -354,6 +386,9 @@ class MqttManager(Manager):
 
 
 	def nluQuery(self, _client, _data, msg: mqtt.MQTTMessage):
+		if self.NluManager.isProbe(msg):
+			return
+
 		sessionId = self.Commons.parseSessionId(msg)
 		deviceUid = self.Commons.parseDeviceUid(msg)
 
@@ -402,6 +437,9 @@ class MqttManager(Manager):
 
 
 	def intentParsed(self, client, data, msg: mqtt.MQTTMessage):
+		if not self.NluManager.acceptResponse(msg):
+			return
+
 		sessionId = self.Commons.parseSessionId(msg)
 		session = self.DialogManager.getSession(sessionId=sessionId)
 
@@ -428,7 +466,7 @@ class MqttManager(Manager):
 				else:
 					payload = session.payload
 
-				message = mqtt.MQTTMessage(topic=str.encode(str(intent)))
+				message = MqttEnvelope(topic=str.encode(str(intent)))
 				message.payload = json.dumps(payload)
 				self.onMqttMessage(_client=client, _userdata=data, message=message)
 			else:
@@ -539,6 +577,9 @@ class MqttManager(Manager):
 
 
 	def nluIntentNotRecognized(self, _client, _data, msg: mqtt.MQTTMessage):
+		if not self.NluManager.acceptResponse(msg):
+			return
+
 		session = self.DialogManager.getSession(self.Commons.parseSessionId(msg))
 
 		if session:
@@ -547,6 +588,9 @@ class MqttManager(Manager):
 
 
 	def nluError(self, _client, _data, msg: mqtt.MQTTMessage):
+		if not self.NluManager.acceptResponse(msg):
+			return
+
 		session = self.DialogManager.getSession(self.Commons.parseSessionId(msg))
 
 		if session:
@@ -600,6 +644,43 @@ class MqttManager(Manager):
 		self.broadcast(method=constants.EVENT_PLAY_BYTES, exceptions=self.name, propagateToSkills=True, payload=msg.payload, deviceUid=deviceUid, sessionId=sessionId)
 
 
+	def topicPlayBytesStreaming(self, _client, _data, msg: mqtt.MQTTMessage):
+		"""
+		Collects the chunks of a streamed sound and plays it once the last one is in.
+		Topic is hermes/audioServer/<SITE_ID>/playBytesStreaming/<REQUEST_ID>/<CHUNK>/<IS_LAST_CHUNK>
+		:param _client:
+		:param _data:
+		:param msg:
+		:return:
+		"""
+		try:
+			*_, deviceUid, _, requestId, chunk, isLastChunk = msg.topic.split('/')
+			chunk = int(chunk)
+		except ValueError:
+			self.logWarning(f'Malformed sound stream topic: {msg.topic}')
+			return
+
+		now = time.monotonic()
+		for staleId in [key for key, stream in self._soundStreams.items() if now - stream['lastChunk'] > self.SOUND_STREAM_TIMEOUT]:
+			self.logWarning(f'Sound stream **{staleId}** never received its last chunk, dropping it')
+			del self._soundStreams[staleId]
+
+		stream = self._soundStreams.setdefault(requestId, {'chunks': dict(), 'lastChunk': now})
+		stream['chunks'][chunk] = msg.payload
+		stream['lastChunk'] = now
+		if isLastChunk != '1':
+			return
+
+		chunks = self._soundStreams.pop(requestId)['chunks']
+		if len(chunks) != chunk + 1:
+			self.logWarning(f'Sound stream **{requestId}** is missing chunks, dropping it')
+			return
+
+		payload = b''.join(chunks[index] for index in range(chunk + 1))
+		# Like for playBytes, the request id is the session id when the sound belongs to one
+		self.broadcast(method=constants.EVENT_PLAY_BYTES, exceptions=self.name, propagateToSkills=True, payload=payload, deviceUid=deviceUid, sessionId=requestId)
+
+
 	def topicPlayBytesFinished(self, _client, _data, msg: mqtt.MQTTMessage):
 		deviceUid = self.Commons.parseDeviceUid(msg)
 		sessionId = self.Commons.parseSessionId(msg)
@@ -879,11 +960,37 @@ class MqttManager(Manager):
 		else:
 			soundFile = Path(location / soundFilename).with_suffix(suffix)
 
-			if not soundFile.exists():
+			payload = self._soundCache.get(soundFile)
+			if payload is None:
 				self.logError(f"Sound file {soundFile} doesn't exist")
 				return
 
-			self._mqttClient.publish(constants.TOPIC_PLAY_BYTES.format(deviceUid).replace('#', sessionId), payload=bytearray(soundFile.read_bytes()))
+			chunkSize = int(self.ConfigManager.getAliceConfigByName('soundChunkSize') or 0) * 1024
+			if 0 < chunkSize < len(payload):
+				self.ThreadManager.newThread(name=f'soundStream-{sessionId}', target=self.streamSound, args=[payload, deviceUid, sessionId, chunkSize])
+			else:
+				self._mqttClient.publish(constants.TOPIC_PLAY_BYTES.format(deviceUid).replace('#', sessionId), payload=payload)
+
+
+	def streamSound(self, payload: bytes, deviceUid: str, sessionId: str, chunkSize: int):
+		"""
+		Streams a sound in chunks over the Hermes playBytesStreaming topic. Each chunk waits for the previous one
+		to be sent, so that a long sound doesn't hold back other messages on the broker connection
+		:param payload: the sound bytes
+		:param deviceUid: the device to play the sound on
+		:param sessionId: used as request id
+		:param chunkSize: in bytes
+		:return:
+		"""
+		topic = constants.TOPIC_PLAY_BYTES_STREAMING.format(deviceUid)
+		chunks = range(0, len(payload), chunkSize)
+		try:
+			for index, offset in enumerate(chunks):
+				isLastChunk = int(index == len(chunks) - 1)
+				info = self._mqttClient.publish(topic.replace('#', f'{sessionId}/{index}/{isLastChunk}'), payload=payload[offset:offset + chunkSize])
+				info.wait_for_publish(timeout=self.SOUND_CHUNK_TIMEOUT)
+		except Exception as e:
+			self.logError(f'Failed streaming sound to device {deviceUid}: {e}')
 
 
 	def publish(self, topic: str, payload: (dict, str) = None, stringPayload: str = None, qos: int = 0, retain: bool = False):
@@ -893,7 +1000,7 @@ class MqttManager(Manager):
 		if stringPayload:
 			payload = stringPayload
 
-		if payload and not isinstance(payload, str) and not isinstance(payload, bytearray) and not isinstance(payload, int) and not isinstance(payload, float):
+		if payload and not isinstance(payload, (str, bytes, bytearray, int, float)):
 			self.logWarning(f'Trying to send an invalid payload: {payload}')
 			return
 
@@ -0,0 +1,123 @@
+#  Copyright (c) 2021
+#
+#  This file, AudioBus.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import threading
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+from core.server.model.AudioFrame import AudioFrame
+
+
+class AudioBus(ProjectAliceObject):
+	"""
+	In process delivery of audio frames to the local consumers, such as the asr recorder and the wakeword
+	engines. Frames captured by this device are published here directly by the audio server, frames from
+	remote satellites are published when they come in over mqtt. Subscribers are called on the publishing
+	thread, they are expected to only queue the frame
+	"""
+
+	def __init__(self):
+		super().__init__()
+		self._lock = threading.Lock()
+		# Fan out lists, replaced on change so publishing never locks
+		self._allDevices: Tuple[Callable[[AudioFrame, str], None], ...] = tuple()
+		self._byDevice: Dict[str, Tuple[Callable[[AudioFrame, str], None], ...]] = dict()
+		self._localDevices: Set[str] = set()
+
+
+	@property
+	def subscribers(self) -> int:
+		return len(self._allDevices) + sum(len(callbacks) for callbacks in self._byDevice.values())
+
+
+	def subscribe(self, deviceUid: Optional[str], callback: Callable[[AudioFrame, str], None]):
+		"""
+		Registers a frame consumer for a device. A callback can be subscribed to several devices
+		:param deviceUid: only receive the frames of that device, all devices if None
+		:param callback: called with the AudioFrame and the uid of the device that captured it
+		:return:
+		"""
+		with self._lock:
+			if deviceUid is None:
+				if callback not in self._allDevices:
+					self._allDevices += (callback,)
+				return
+
+			callbacks = self._byDevice.get(deviceUid, tuple())
+			if callback not in callbacks:
+				byDevice = dict(self._byDevice)
+				byDevice[deviceUid] = callbacks + (callback,)
+				self._byDevice = byDevice
+
+
+	def unsubscribe(self, callback: Callable[[AudioFrame, str], None], deviceUid: str = None):
+		"""
+		Removes a frame consumer
+		:param callback:
+		:param deviceUid: only stop receiving the frames of that device, every subscription of the callback is dropped if None
+		:return:
+		"""
+		with self._lock:
+			if deviceUid is None:
+				self._allDevices = tuple(subscriber for subscriber in self._allDevices if subscriber != callback)
+
+			byDevice = dict()
+			for uid, callbacks in self._byDevice.items():
+				if deviceUid is None or uid == deviceUid:
+					callbacks = tuple(subscriber for subscriber in callbacks if subscriber != callback)
+
+				if callbacks:
+					byDevice[uid] = callbacks
+
+			self._byDevice = byDevice
+
+
+	def addLocalDevice(self, deviceUid: str):
+		"""
+		Declares a device whose frames are published on the bus by this process. Its frames coming
+		back from the broker are the mirrored copies and are to be ignored
+		:param deviceUid:
+		:return:
+		"""
+		self._localDevices = self._localDevices | {deviceUid}
+
+
+	def removeLocalDevice(self, deviceUid: str):
+		self._localDevices = self._localDevices - {deviceUid}
+
+
+	def isLocal(self, deviceUid: str) -> bool:
+		return deviceUid in self._localDevices
+
+
+	def publish(self, frame: AudioFrame, deviceUid: str):
+		"""
+		Hands the frame to the subscribers of that device and of all devices. A failing subscriber does not
+		prevent the others from receiving it
+		:param frame: AudioFrame
+		:param deviceUid: the device that captured the frame
+		:return:
+		"""
+		for callbacks in (self._allDevices, self._byDevice.get(deviceUid, tuple())):
+			for callback in callbacks:
+				try:
+					callback(frame, deviceUid)
+				except Exception as e:
+					self.logError(f'Audio frame subscriber failed: {e}')
@@ -0,0 +1,124 @@
+#  Copyright (c) 2021
+#
+#  This file, AudioFrame.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+from __future__ import annotations
+
+import io
+import struct
+import wave
+from typing import Optional, Union
+
+
+class AudioFrame(object):
+	"""
+	A chunk of captured audio as it travels on the audio frame topic.
+	Alice's own audio server sends raw pcm prefixed with a small fixed header, legacy
+	satellites still send every frame wrapped in its own wav container. Both are accepted.
+	"""
+
+	FORMAT_RAW = 'raw'
+	FORMAT_WAV = 'wav'
+
+	MAGIC = b'PAFR'
+	WAV_MAGIC = b'RIFF'
+
+	# magic, sample rate, channels, sample width, sequence number
+	HEADER = struct.Struct('<4sIBBI')
+
+	__slots__ = ['pcm', 'sampleRate', 'channels', 'sampleWidth', 'sequence', 'legacy']
+
+
+	def __init__(self, pcm: Union[bytes, bytearray], sampleRate: int = 16000, channels: int = 1, sampleWidth: int = 2, sequence: int = 0, legacy: bool = False):
+		self.pcm = pcm
+		self.sampleRate = sampleRate
+		self.channels = channels
+		self.sampleWidth = sampleWidth
+		self.sequence = sequence
+		self.legacy = legacy
+
+
+	def __len__(self) -> int:
+		return len(self.pcm) // (self.sampleWidth * self.channels)
+
+
+	@classmethod
+	def encode(cls, pcm: Union[bytes, bytearray], sampleRate: int = 16000, channels: int = 1, sampleWidth: int = 2, sequence: int = 0) -> bytes:
+		"""
+		Builds a raw frame payload, header followed by the untouched pcm samples
+		:param pcm:
+		:param sampleRate:
+		:param channels:
+		:param sampleWidth:
+		:param sequence: Wraps at 2^32
+		:return:
+		"""
+		return cls.HEADER.pack(cls.MAGIC, sampleRate, channels, sampleWidth, sequence & 0xFFFFFFFF) + pcm
+
+
+	@classmethod
+	def fromPayload(cls, payload: Union[bytes, bytearray]) -> Optional[AudioFrame]:
+		"""
+		Decodes an audio frame payload, be it a raw frame or a legacy wav container
+		:param payload:
+		:return: None if the payload is neither of both
+		"""
+		if not payload:
+			return None
+
+		magic = payload[:4]
+		if magic == cls.MAGIC:
+			if len(payload) < cls.HEADER.size:
+				return None
+
+			_, sampleRate, channels, sampleWidth, sequence = cls.HEADER.unpack_from(payload)
+			return cls(pcm=payload[cls.HEADER.size:], sampleRate=sampleRate, channels=channels, sampleWidth=sampleWidth, sequence=sequence)
+
+		if magic == cls.WAV_MAGIC:
+			try:
+				with io.BytesIO(payload) as buffer, wave.open(buffer, 'rb') as wav:
+					return cls(
+						pcm=wav.readframes(wav.getnframes()),
+						sampleRate=wav.getframerate(),
+						channels=wav.getnchannels(),
+						sampleWidth=wav.getsampwidth(),
+						legacy=True
+					)
+			except (wave.Error, EOFError):
+				return None
+
+		return None
+
+
+	def toPayload(self) -> bytes:
+		return self.encode(pcm=self.pcm, sampleRate=self.sampleRate, channels=self.channels, sampleWidth=self.sampleWidth, sequence=self.sequence)
+
+
+	def toWav(self) -> bytes:
+		"""
+		Wraps the frame in a wav container, for listeners that only understand the legacy format
+		:return:
+		"""
+		with io.BytesIO() as buffer:
+			with wave.open(buffer, 'wb') as wav:
+				wav.setnchannels(self.channels)
+				wav.setsampwidth(self.sampleWidth)
+				wav.setframerate(self.sampleRate)
+				wav.writeframes(self.pcm)
+
+			return buffer.getvalue()
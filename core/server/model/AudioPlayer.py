@@ -0,0 +1,239 @@
+#  Copyright (c) 2021
+#
+#  This file, AudioPlayer.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+from __future__ import annotations
+
+import io
+import queue
+import threading
+import time
+import wave
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Optional, Tuple
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+
+
+@dataclass(eq=False)
+class PlaybackClip(object):
+	pcm: bytes
+	channels: int
+	sampleRate: int
+	sampleWidth: int
+	deviceUid: str
+	requestId: str
+	sessionId: Optional[str] = None
+	offset: int = 0
+	cancelled: bool = False
+	doneAt: float = field(default=0, repr=False)
+
+
+	@classmethod
+	def fromWav(cls, payload: bytes, **kwargs) -> PlaybackClip:
+		with io.BytesIO(payload) as buffer, wave.open(buffer, 'rb') as wav:
+			return cls(
+				pcm=wav.readframes(wav.getnframes()),
+				channels=wav.getnchannels(),
+				sampleRate=wav.getframerate(),
+				sampleWidth=wav.getsampwidth(),
+				**kwargs
+			)
+
+
+	@property
+	def format(self) -> Tuple[int, int, int]:
+		return self.channels, self.sampleRate, self.sampleWidth
+
+
+class AudioPlayer(ProjectAliceObject):
+	"""
+	Plays queued clips through one persistent output stream. Clips of the same format follow each other
+	without a gap, the stream only being reopened when the format changes. Finished or cancelled clips are
+	handed to a notifier thread, that calls back once the audio really left the speaker
+	"""
+
+	DTYPES = {1: 'uint8', 2: 'int16', 3: 'int24', 4: 'int32'}
+
+
+	def __init__(self, onClipFinished: Callable[[PlaybackClip], None]):
+		super().__init__()
+		self._onClipFinished = onClipFinished
+		self._clips: Deque[PlaybackClip] = deque()
+		self._current: Optional[PlaybackClip] = None
+		self._lock = threading.Lock()
+
+		self._stream: Optional[Any] = None  # sounddevice.RawOutputStream
+		self._format: Optional[Tuple[int, int, int]] = None
+		self._latency = 0.0
+
+		self._finished: queue.Queue = queue.Queue()
+		self._notifier: Optional[threading.Thread] = None
+
+
+	@property
+	def busy(self) -> bool:
+		return self._current is not None or bool(self._clips)
+
+
+	def start(self):
+		if self._notifier and self._notifier.is_alive():
+			return
+
+		self._notifier = threading.Thread(name='audioPlayerNotifier', target=self._notify, daemon=True)
+		self._notifier.start()
+
+
+	def stop(self):
+		self.cancel()
+		self.closeStream()
+		self._finished.put(None)
+
+
+	def play(self, clip: PlaybackClip):
+		"""
+		Queues a clip, played as soon as the ones before it are done
+		:param clip: PlaybackClip
+		:return: None
+		"""
+		with self._lock:
+			self._clips.append(clip)
+
+		self._startNext()
+
+
+	def cancel(self):
+		"""
+		Stops the playing clip and drops the queued ones, for barge in
+		:return: None
+		"""
+		with self._lock:
+			clips = ([self._current] if self._current else list()) + list(self._clips)
+			self._current = None
+			self._clips.clear()
+
+		for clip in clips:
+			clip.cancelled = True
+			clip.doneAt = time.monotonic()
+			self._finished.put(clip)
+
+
+	def closeStream(self):
+		"""
+		Closes the output stream, the next clip opening a new one, on the current default output device
+		:return: None
+		"""
+		with self._lock:
+			stream = self._stream
+			self._stream = None
+			self._format = None
+
+		if stream:
+			stream.abort(ignore_errors=True)
+			stream.close(ignore_errors=True)
+
+
+	def _startNext(self):
+		"""
+		Opens the output stream if the next clip can't play on the current one
+		:return: None
+		"""
+		with self._lock:
+			if self._current or not self._clips or (self._stream and self._clips[0].format == self._format):
+				return
+			clipFormat = self._clips[0].format
+
+		self.closeStream()
+
+		stream = None
+		try:
+			# Only loaded when audio is really played, the clip handling doesn't need the audio backend
+			import sounddevice as sd
+
+			channels, sampleRate, sampleWidth = clipFormat
+			stream = sd.RawOutputStream(
+				dtype=self.DTYPES.get(sampleWidth, 'int16'),
+				channels=channels,
+				samplerate=sampleRate,
+				callback=self._fill
+			)
+
+			with self._lock:
+				self._stream = stream
+				self._format = clipFormat
+				self._latency = stream.latency
+
+			stream.start()
+		except Exception as e:
+			# Without an output stream nothing can be played, the queued clips are ended so that their requests get an answer
+			self.logError(f'Failed opening audio output stream: {e}')
+			if stream:
+				self.closeStream()
+			self.cancel()
+
+
+	# noinspection PyUnusedLocal
+	def _fill(self, outData: bytes, frames: int, _time, _status):
+		"""
+		Output stream callback. Copies the queued audio, moving to the next clip in the same block when one ends
+		:return:
+		"""
+		size = len(outData)
+		written = 0
+
+		with self._lock:
+			while written < size:
+				clip = self._current
+				if not clip:
+					if not self._clips or self._clips[0].format != self._format:
+						break
+					clip = self._current = self._clips.popleft()
+
+				chunk = clip.pcm[clip.offset:clip.offset + size - written]
+				outData[written:written + len(chunk)] = chunk
+				written += len(chunk)
+				clip.offset += len(chunk)
+
+				if clip.offset >= len(clip.pcm):
+					self._current = None
+					clip.doneAt = time.monotonic() + self._latency
+					self._finished.put(clip)
+
+		if written < size:
+			outData[written:] = b'\x00' * (size - written)
+
+
+	def _notify(self):
+		while True:
+			clip = self._finished.get()
+			if clip is None:
+				return
+
+			delay = clip.doneAt - time.monotonic()
+			if delay > 0:
+				time.sleep(delay)
+
+			try:
+				self._onClipFinished(clip)
+			except Exception as e:
+				self.logError(f'Error handling the end of a played clip: {e}')
+
+			# A clip of another format may be waiting for the stream to be reopened
+			self._startNext()
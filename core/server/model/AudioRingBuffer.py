@@ -0,0 +1,105 @@
+#  Copyright (c) 2021
+#
+#  This file, AudioRingBuffer.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import threading
+from typing import Optional
+
+
+class AudioRingBuffer(object):
+	"""
+	Preallocated ring of fixed size audio frames between one producer, the capture callback, and one consumer.
+	Each side only moves its own counter, so no lock is taken on the capture path. When the consumer falls
+	behind and the ring is full, incoming frames are dropped and counted as overruns
+	"""
+
+	def __init__(self, frameSize: int, capacity: int):
+		self._frameSize = frameSize
+		self._capacity = capacity
+		self._buffer = bytearray(frameSize * capacity)
+		self._view = memoryview(self._buffer)
+		self._written = 0
+		self._read = 0
+		self._overruns = 0
+		self._dataReady = threading.Event()
+
+
+	@property
+	def frameSize(self) -> int:
+		return self._frameSize
+
+
+	@property
+	def capacity(self) -> int:
+		return self._capacity
+
+
+	@property
+	def available(self) -> int:
+		return self._written - self._read
+
+
+	@property
+	def overruns(self) -> int:
+		return self._overruns
+
+
+	def write(self, frame) -> bool:
+		"""
+		Copies a frame in the ring. Producer side only
+		:param frame: bytes like object of frameSize bytes
+		:return: False if the frame was dropped because the ring is full
+		"""
+		if self._written - self._read >= self._capacity:
+			self._overruns += 1
+			return False
+
+		start = (self._written % self._capacity) * self._frameSize
+		self._view[start:start + self._frameSize] = frame
+		self._written += 1
+		self._dataReady.set()
+		return True
+
+
+	def read(self, timeout: float = None) -> Optional[bytes]:
+		"""
+		Returns the oldest frame, waiting for one if the ring is empty. Consumer side only
+		:param timeout: seconds to wait for a frame, None waits forever
+		:return: the frame or None on timeout
+		"""
+		while self._written == self._read:
+			self._dataReady.clear()
+			if self._written != self._read:
+				break
+
+			if not self._dataReady.wait(timeout):
+				return None
+
+		start = (self._read % self._capacity) * self._frameSize
+		frame = bytes(self._view[start:start + self._frameSize])
+		self._read += 1
+		return frame
+
+
+	def clear(self):
+		"""
+		Drops all pending frames. Consumer side only
+		:return: None
+		"""
+		self._read = self._written
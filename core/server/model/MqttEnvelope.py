@@ -0,0 +1,146 @@
+#  Copyright (c) 2021
+#
+#  This file, MqttEnvelope.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from typing import Any, Callable, Dict, Union
+
+from paho.mqtt.client import MQTTMessage
+
+import core.commons.model.Slot as slotModel
+
+
+class MqttEnvelope(MQTTMessage):
+	"""
+	An incoming mqtt message whose payload is parsed only once. The payload, slots, session id and
+	custom data are parsed on first access and kept for every manager, session and skill the message
+	is passed to. Being a MQTTMessage, it can be handed to any code expecting the raw message.
+	"""
+
+	__slots__ = ('_parsed',)
+
+
+	def __init__(self, mid: int = 0, topic: bytes = b''):
+		super().__init__(mid=mid, topic=topic)
+		self._parsed: Dict[str, Any] = dict()
+
+
+	@classmethod
+	def wrap(cls, message: MQTTMessage) -> MqttEnvelope:
+		"""
+		Returns the envelope for the given message, the message itself if it already is one
+		:param message: MQTTMessage
+		:return: MqttEnvelope
+		"""
+		if isinstance(message, MqttEnvelope):
+			return message
+
+		envelope = cls()
+		for attribute in MQTTMessage.__slots__:
+			if hasattr(message, attribute):  # properties only exist for mqtt v5 messages
+				setattr(envelope, attribute, getattr(message, attribute))
+
+		return envelope
+
+
+	def _memoize(self, key: str, parser: Callable) -> Any:
+		try:
+			return self._parsed[key]
+		except KeyError:
+			value = parser()
+			self._parsed[key] = value
+			return value
+
+
+	@property
+	def data(self) -> Union[dict, Any]:
+		return self._memoize('data', lambda: self.parsePayload(self))
+
+
+	@property
+	def slots(self) -> dict:
+		return self._memoize('slots', lambda: self.parseSlots(self.data))
+
+
+	@property
+	def slotsAsObjects(self) -> dict:
+		return self._memoize('slotsAsObjects', lambda: self.parseSlotsToObjects(self.data))
+
+
+	@property
+	def sessionId(self) -> Union[str, bool]:
+		return self._memoize('sessionId', lambda: self.parseSessionId(self.data))
+
+
+	@property
+	def customData(self) -> dict:
+		return self._memoize('customData', lambda: self.parseCustomData(self.data))
+
+
+	@staticmethod
+	def parsePayload(message: MQTTMessage) -> dict:
+		try:
+			payload = json.loads(message.payload)
+			if isinstance(payload, bool):
+				message.payload = payload
+				raise TypeError
+		except (ValueError, TypeError):
+			var = message.topic.split('/')[-1]
+			payload = {var: message.payload}
+
+		return payload
+
+
+	@staticmethod
+	def parseSlots(data: Any) -> dict:
+		if not isinstance(data, dict):
+			return dict()
+
+		return {slot['slotName']: slot['rawValue'] for slot in data.get('slots', dict())}
+
+
+	@staticmethod
+	def parseSlotsToObjects(data: Any) -> dict:
+		if not isinstance(data, dict):
+			return dict()
+
+		slots = defaultdict(list)
+		for slotData in data.get('slots', dict()):
+			slot = slotModel.Slot(**slotData)
+			slots[slot.slotName].append(slot)
+		return slots
+
+
+	@staticmethod
+	def parseSessionId(data: Any) -> Union[str, bool]:
+		if not isinstance(data, dict):
+			return False
+
+		return data.get('sessionId', False)
+
+
+	@staticmethod
+	def parseCustomData(data: Any) -> dict:
+		try:
+			return json.loads(data['customData'])
+		except (ValueError, TypeError, KeyError):
+			return dict()
@@ -0,0 +1,80 @@
+#  Copyright (c) 2021
+#
+#  This file, PcmReblocker.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+
+from typing import Generator
+
+import numpy as np
+
+
+class PcmReblocker(object):
+	"""
+	Cuts a stream of pcm samples, arriving in chunks of any size, into blocks of the fixed length an engine
+	expects. Whole blocks are handed out as views of the incoming samples, only the samples straddling two
+	chunks are copied. A yielded block is only valid until the next iteration
+	"""
+
+	def __init__(self, blockSize: int, dtype=np.int16):
+		self._blockSize = blockSize
+		self._block = np.zeros(blockSize, dtype=dtype)
+		self._pending = 0
+
+
+	@property
+	def blockSize(self) -> int:
+		return self._blockSize
+
+
+	@property
+	def pending(self) -> int:
+		return self._pending
+
+
+	def feed(self, samples: np.ndarray) -> Generator[np.ndarray, None, None]:
+		"""
+		Adds samples and yields every block that could be completed
+		:param samples: one dimensional array of samples
+		:return:
+		"""
+		position = 0
+		if self._pending:
+			needed = min(self._blockSize - self._pending, samples.size)
+			self._block[self._pending:self._pending + needed] = samples[:needed]
+			self._pending += needed
+			position = needed
+
+			if self._pending < self._blockSize:
+				return
+
+			self._pending = 0
+			yield self._block
+
+		while samples.size - position >= self._blockSize:
+			yield samples[position:position + self._blockSize]
+			position += self._blockSize
+
+		remaining = samples.size - position
+		if remaining:
+			self._block[:remaining] = samples[position:]
+			self._pending = remaining
+
+
+	def clear(self):
+		self._pending = 0
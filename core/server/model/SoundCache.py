@@ -0,0 +1,111 @@
+#  Copyright (c) 2021
+#
+#  This file, SoundCache.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+class SoundCache(object):
+	"""
+	In memory cache of the sound files played over mqtt, so that chimes and feedback sounds played on every
+	interaction are not read from disk each time. Entries are checked against the file modification time and
+	size on access and the least recently used ones are dropped beyond the size budget
+	"""
+
+	MAX_SIZE = 8 * 1024 * 1024
+	MAX_FILE_SIZE = 1024 * 1024  # Bigger files are read on each use, they'd evict everything else
+
+
+	def __init__(self, maxSize: int = MAX_SIZE, maxFileSize: int = MAX_FILE_SIZE):
+		self._maxSize = maxSize
+		self._maxFileSize = maxFileSize
+		self._entries: Dict[Path, Tuple[int, int, bytes]] = OrderedDict()  # file: (mtime, size, data), least recently used first
+		self._size = 0
+		self._lock = threading.Lock()
+
+
+	@property
+	def size(self) -> int:
+		return self._size
+
+
+	def get(self, file: Path) -> Optional[bytes]:
+		"""
+		Returns the content of the given sound file, from memory if it didn't change since it was cached
+		:param file: Path
+		:return: the file bytes, None if the file doesn't exist
+		"""
+		try:
+			stat = file.stat()
+		except OSError:
+			with self._lock:
+				self._drop(file)
+			return None
+
+		with self._lock:
+			entry = self._entries.get(file)
+			if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+				self._entries.move_to_end(file)
+				return entry[2]
+
+		try:
+			data = file.read_bytes()
+		except OSError:
+			return None
+
+		with self._lock:
+			self._drop(file)
+			if len(data) <= self._maxFileSize:
+				self._entries[file] = (stat.st_mtime_ns, stat.st_size, data)
+				self._size += len(data)
+				self._evict()
+
+		return data
+
+
+	def preload(self, directory: Path, pattern: str = '*.wav'):
+		"""
+		Loads all the matching sound files of the given directory and its subdirectories
+		:param directory: Path
+		:param pattern: glob pattern
+		:return: None
+		"""
+		for file in sorted(directory.rglob(pattern)):
+			self.get(file)
+
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+			self._size = 0
+
+
+	def _drop(self, file: Path):
+		entry = self._entries.pop(file, None)
+		if entry:
+			self._size -= len(entry[2])
+
+
+	def _evict(self):
+		while self._size > self._maxSize and self._entries:
+			_, entry = self._entries.popitem(last=False)
+			self._size -= len(entry[2])
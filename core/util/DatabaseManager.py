@@ -17,32 +17,80 @@
 #
 #  Last modified: 2021.04.13 at 12:56:47 CEST
 
+import queue
 import sqlite3
+import threading
 import time
+from contextlib import suppress
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from core.ProjectAliceExceptions import DbConnectionError, InvalidQuery
 from core.base.model.Manager import Manager
 from core.commons import constants
 from core.commons.CommonsManager import CommonsManager
+from core.util.model.ThreadTimer import ThreadTimer
 
 
 # noinspection SqlResolve
 class DatabaseManager(Manager):
 	TABLE_TAG = ':__table__'
 
+	POOL_SIZE = 4
+	CACHE_SIZE = -4000 # Negative means KiB, so about 4MB per connection
+	BATCH_SIZE = 50
+	BATCH_FLUSH_INTERVAL = 5
+
 
 	def __init__(self):
 		super().__init__()
 		self._tables = list()
+		self._pool = queue.LifoQueue(maxsize=self.POOL_SIZE)
+
+		self._queuedInserts: Dict[Tuple[str, str, str], List[dict]] = dict()
+		self._queueLock = threading.Lock()
+		self._flushTimer: Optional[ThreadTimer] = None
 
 
 	def onStart(self):
 		super().onStart()
+		self.enableWriteAheadLog()
 		self.fetchTables()
 
 
+	def onStop(self):
+		super().onStop()
+		self.flushQueuedInserts()
+		self.closeConnections()
+
+
+	def enableWriteAheadLog(self):
+		"""
+		WAL journaling is persistent in the database file, so that readers never wait on writers
+		and a commit costs one sequential write instead of rewriting the rollback journal
+		:return:
+		"""
+		database = self.getConnection()
+		try:
+			mode = database.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+			if mode.lower() != 'wal':
+				self.logWarning(f'Could not enable WAL journaling, database is using **{mode}**')
+		except sqlite3.Error as e:
+			self.logWarning(f'Could not enable WAL journaling: {e}')
+		finally:
+			self.releaseConnection(database)
+
+
+	def closeConnections(self):
+		while True:
+			try:
+				self._pool.get_nowait().close()
+			except queue.Empty:
+				break
+			except sqlite3.Error:
+				continue
+
+
 	def fetchTables(self):
 		database = self.getConnection()
 		cursor = database.cursor()
@@ -50,26 +98,44 @@ class DatabaseManager(Manager):
 			cursor.execute("SELECT name FROM main.sqlite_master WHERE type = 'table' and name NOT LIKE 'sqlite_%'")
 			self._tables = cursor.fetchall()
 			cursor.close()
-			database.close()
+			self.releaseConnection(database)
 		except sqlite3.Error as e:
 			self.logError(f'Something went wrong fetching database tables: {e}')
 			try:
 				cursor.close()
-				database.close()
+				self.releaseConnection(database)
 			except:
 				pass  # what else is there to do?
 			return False
 
 
 	def clearDB(self):
+		self.closeConnections()
 		Path(self.Commons.rootDir(), 'system/database/data.db').unlink()
 
+		for suffix in ('-wal', '-shm'):
+			with suppress(FileNotFoundError):
+				Path(self.Commons.rootDir(), f'system/database/data.db{suffix}').unlink()
+
 
 	def getConnection(self) -> sqlite3.Connection:
+		"""
+		Returns an idle pooled connection or opens a new one. A connection is only ever used by one
+		thread at a time, hand it back with releaseConnection once done
+		:return:
+		"""
+		if self.ConfigManager.getAliceConfigByName('databaseProfiling'):
+			self.logDebug(f'DB lock acquired by {CommonsManager.getFunctionCaller(depth=5)}->{CommonsManager.getFunctionCaller(depth=4)}->{CommonsManager.getFunctionCaller(depth=3)}')
+
 		try:
-			if self.ConfigManager.getAliceConfigByName('databaseProfiling'):
-				self.logDebug(f'DB lock acquired by {CommonsManager.getFunctionCaller(depth=5)}->{CommonsManager.getFunctionCaller(depth=4)}->{CommonsManager.getFunctionCaller(depth=3)}')
-			con = sqlite3.connect(constants.DATABASE_FILE, timeout=10)
+			return self._pool.get_nowait()
+		except queue.Empty:
+			pass
+
+		try:
+			con = sqlite3.connect(constants.DATABASE_FILE, timeout=10, check_same_thread=False)
+			con.execute('PRAGMA synchronous=NORMAL')
+			con.execute(f'PRAGMA cache_size={self.CACHE_SIZE}')
 		except sqlite3.Error as e:
 			self.logError(f'Failed to connect to DB ({constants.DATABASE_FILE}): {e}')
 			raise DbConnectionError()
@@ -77,6 +143,24 @@ class DatabaseManager(Manager):
 		return con
 
 
+	def releaseConnection(self, con: sqlite3.Connection):
+		"""
+		Gives a connection back to the pool, or closes it if the pool is full
+		:param con:
+		:return:
+		"""
+		try:
+			if con.in_transaction:
+				con.rollback()
+
+			self._pool.put_nowait(con)
+		except (queue.Full, sqlite3.Error):
+			try:
+				con.close()
+			except sqlite3.Error:
+				pass  # Already closed
+
+
 	def initDB(self, schema: dict, callerName: str) -> bool:
 		database = self.getConnection()
 		cursor = database.cursor()
@@ -185,7 +269,7 @@ class DatabaseManager(Manager):
 			ret = False
 		finally:
 			cursor.close()
-			database.close()
+			self.releaseConnection(database)
 		return ret
 
 
@@ -203,7 +287,7 @@ class DatabaseManager(Manager):
 		finally:
 			try:
 				cursor.close()
-				database.close()
+				self.releaseConnection(database)
 			except:
 				pass  # Well, what's to do here....
 
@@ -235,15 +319,15 @@ class DatabaseManager(Manager):
 			callerName = self.Commons.getFunctionCaller()
 
 		if not query:
-			cols = ', '.join(values)
-			data = ', :'.join(values)
-			query = f'INSERT INTO :__table__ ({cols}) VALUES (:{data})'
+			query = self.buildInsertQuery(values)
 
 		query = self.basicChecks(tableName, query, callerName, values)
 
 		if not query:
 			raise InvalidQuery
 
+		self.flushQueuedInserts(tableName=tableName, callerName=callerName)
+
 		database = self.getConnection()
 		cursor = database.cursor()
 		exception = None
@@ -272,10 +356,8 @@ class DatabaseManager(Manager):
 			cursor.close()
 		except Exception as e:
 			self.logError(f'FATAL ERROR: {e}')
-		try:
-			database.close()
-		except Exception as e:
-			self.logError(f'FATAL ERROR: {e}')
+
+		self.releaseConnection(database)
 
 		if insertId is not None and not exception:
 			return insertId
@@ -285,6 +367,133 @@ class DatabaseManager(Manager):
 			raise exception
 
 
+	def insertMany(self, tableName: str, values: List[dict], query: str = None, callerName: str = None) -> int:
+		"""
+		Inserts many rows in a single transaction, with a single commit
+		:param tableName:
+		:param values: list of dict, one per row
+		:param query:
+		:param callerName:
+		:return: the number of inserted rows
+		"""
+		if not values:
+			raise Exception('Cannot DB insert without values...')
+
+		if not callerName:
+			callerName = self.Commons.getFunctionCaller()
+
+		if not query:
+			query = self.buildInsertQuery(values[0])
+
+		if not self.executeBatch(tableName=tableName, callerName=callerName, statements=[(query, values)]):
+			raise Exception('Failed inserting into database')
+
+		return len(values)
+
+
+	def executeBatch(self, tableName: str, callerName: str, statements: List[Tuple[str, Union[dict, List[dict]]]]) -> bool:
+		"""
+		Executes a batch of statements on the same table in a single transaction. Statements
+		given a list of values are executed once per entry
+		:param tableName:
+		:param callerName:
+		:param statements: list of (query, values) tuples
+		:return: False if anything failed, in which case nothing was committed
+		"""
+		queries = list()
+		for query, values in statements:
+			query = self.basicChecks(tableName, query, callerName, values)
+			if not query:
+				raise InvalidQuery
+
+			queries.append((query, values))
+
+		self.flushQueuedInserts(tableName=tableName, callerName=callerName)
+
+		database = self.getConnection()
+		ret = True
+
+		try:
+			startTime = time.time()
+			for query, values in queries:
+				if isinstance(values, list):
+					database.executemany(query, values)
+				else:
+					database.execute(query, values or dict())
+			database.commit()
+
+			if self.ConfigManager.getAliceConfigByName('databaseProfiling'):
+				self.logDebug(f'It took {time.time() - startTime} seconds to execute a batch of {len(queries)} statements in {tableName} DB ')
+		except sqlite3.Error as e:
+			self.logWarning(f'Error executing batch for component **{callerName}** in table **{tableName}**: {e}')
+			database.rollback()
+			ret = False
+		finally:
+			self.releaseConnection(database)
+
+		return ret
+
+
+	def queueInsert(self, tableName: str, values: dict, callerName: str, query: str = None):
+		"""
+		Queues a row to be inserted with the next batch instead of committing it on its own.
+		Meant for high volume data, such as telemetry, where nobody waits on the insert id.
+		Queued rows are written every few seconds, as soon as enough are waiting and before
+		anything else touches the table
+		:param tableName:
+		:param values:
+		:param callerName:
+		:param query:
+		:return:
+		"""
+		if not values:
+			raise Exception('Cannot DB insert without values...')
+
+		if not query:
+			query = self.buildInsertQuery(values)
+
+		with self._queueLock:
+			rows = self._queuedInserts.setdefault((tableName, callerName, query), list())
+			rows.append(values)
+			full = len(rows) >= self.BATCH_SIZE
+
+			if not full and not self._flushTimer:
+				self._flushTimer = self.ThreadManager.newTimer(interval=self.BATCH_FLUSH_INTERVAL, func=self.flushQueuedInserts)
+
+		if full:
+			self.flushQueuedInserts(tableName=tableName, callerName=callerName)
+
+
+	def flushQueuedInserts(self, tableName: str = None, callerName: str = None):
+		"""
+		Writes the queued rows, either all of them or only the ones of the given table
+		:param tableName:
+		:param callerName:
+		:return:
+		"""
+		if not self._queuedInserts:
+			return
+
+		with self._queueLock:
+			batches = [key for key in self._queuedInserts if not tableName or key[:2] == (tableName, callerName)]
+			batches = [(key, self._queuedInserts.pop(key)) for key in batches]
+
+			if not self._queuedInserts and self._flushTimer:
+				self._flushTimer.cancel()
+				self._flushTimer = None
+
+		for (table, caller, query), rows in batches:
+			if not self.executeBatch(tableName=table, callerName=caller, statements=[(query, rows)]):
+				self.logWarning(f'Dropped {len(rows)} queued row in table **{table}**', plural='row')
+
+
+	@staticmethod
+	def buildInsertQuery(values: dict) -> str:
+		cols = ', '.join(values)
+		data = ', :'.join(values)
+		return f'INSERT INTO :__table__ ({cols}) VALUES (:{data})'
+
+
 	def update(self, tableName: str, callerName: str, values: dict = None, query: str = None, row: tuple = None) -> bool:
 		if not query and not values:
 			self.logWarning('Cannot update database with neither query or values set')
@@ -298,6 +507,8 @@ class DatabaseManager(Manager):
 		if not query:
 			raise InvalidQuery
 
+		self.flushQueuedInserts(tableName=tableName, callerName=callerName)
+
 		database = self.getConnection()
 		cursor = database.cursor()
 		ret = True
@@ -318,7 +529,7 @@ class DatabaseManager(Manager):
 		finally:
 			try:
 				cursor.close()
-				database.close()
+				self.releaseConnection(database)
 			except:
 				pass  # what else is there to do??
 
@@ -342,6 +553,8 @@ class DatabaseManager(Manager):
 		if not query:
 			return rows
 
+		self.flushQueuedInserts(tableName=tableName, callerName=callerName)
+
 		database = self.getConnection()
 		cursor = database.cursor()
 
@@ -358,7 +571,7 @@ class DatabaseManager(Manager):
 		finally:
 			try:
 				cursor.close()
-				database.close()
+				self.releaseConnection(database)
 			except:
 				pass  # Well, what's to do here....
 
@@ -383,6 +596,8 @@ class DatabaseManager(Manager):
 		if not query:
 			return
 
+		self.flushQueuedInserts(tableName=tableName, callerName=callerName)
+
 		database = self.getConnection()
 		try:
 			startTime = time.time()
@@ -396,10 +611,7 @@ class DatabaseManager(Manager):
 			self.logWarning(f'Error deleting from table **{tableName}** for component **{callerName}**: {e}')
 			database.rollback()
 
-		try:
-			database.close()
-		except:
-			pass  # Well, what's to do here....
+		self.releaseConnection(database)
 
 
 	# noinspection SqlResolve
@@ -416,6 +628,8 @@ class DatabaseManager(Manager):
 		if not query:
 			return
 
+		self.flushQueuedInserts(tableName=tableName, callerName=callerName)
+
 		database = self.getConnection()
 		try:
 			startTime = time.time()
@@ -429,7 +643,7 @@ class DatabaseManager(Manager):
 			self.logWarning(f'Error pruning table **{tableName}** for component **{callerName}**: {e}')
 			database.rollback()
 		finally:
-			database.close()
+			self.releaseConnection(database)
 
 
 	def basicChecks(self, tableName: str, query: str, callerName: str, values: dict = None) -> Optional[str]:
@@ -158,7 +158,7 @@ class TelemetryManager(Manager):
 		if not self.currentValue(ttype, value, service, deviceId, timestamp, locationId):
 			return False
 
-		self.databaseInsert(
+		self.databaseQueueInsert(
 			tableName='telemetry',
 			query='INSERT INTO :__table__ (type, value, service, deviceId, timestamp, locationId) VALUES (:type, :value, :service, :deviceId, :timestamp, :locationId)',
 			values={'type': ttype.value, 'value': value, 'service': service, 'deviceId': deviceId, 'timestamp': round(timestamp), 'locationId': locationId}
@@ -25,14 +25,20 @@ from core.util.Decorators import IfSetting
 from core.util.model.AliceEvent import AliceEvent
 from core.util.model.MemoryProfiler import MemoryProfiler
 from core.util.model.ThreadTimer import ThreadTimer
+from core.util.model.TimerScheduler import TimerScheduler
 
 
 class ThreadManager(Manager):
 
+	TIMER_WORKERS = 8
+	SKILL_TIMER_WORKERS = 4
+
+
 	def __init__(self):
 		super().__init__()
 
-		self._timers = list()
+		self._timers = set()
+		self._scheduler = TimerScheduler(dispatch=self.onTimerEnd, workers=self.TIMER_WORKERS, skillWorkers=self.SKILL_TIMER_WORKERS)
 		self._threads = dict()
 		self._events = dict()
 		self._memProfiler = MemoryProfiler()
@@ -40,12 +46,13 @@ class ThreadManager(Manager):
 
 	def onStop(self):
 		super().onStop()
-		for timer in self._timers:
-			if timer.timer.isAlive():
-				timer.timer.cancel()
+		for timer in self._timers.copy():
+			timer.cancel()
+		self._scheduler.stop()
 
 		for thread in self._threads.values():
-			if thread.isAlive():
+			# A restart stops the managers from a thread of ours
+			if thread.is_alive() and thread is not threading.current_thread():
 				thread.join(timeout=1)
 
 		for event in self._events.values():
@@ -69,8 +76,8 @@ class ThreadManager(Manager):
 		deadThreads = 0
 		timers = self._timers.copy()
 		for threadTimer in timers:
-			if not threadTimer.timer.isAlive():
-				self._timers.remove(threadTimer)
+			if not threadTimer.is_alive():
+				self._timers.discard(threadTimer)
 				deadTimers += 1
 
 		threads = self._threads.copy()
@@ -86,15 +93,23 @@ class ThreadManager(Manager):
 			self.logInfo(f'Cleaned {deadThreads} dead thread', 'thread')
 
 
-	def newTimer(self, interval: float, func: Callable, autoStart: bool = True, args: list = None, kwargs: dict = None) -> threading.Timer:
+	def newTimer(self, interval: float, func: Callable, autoStart: bool = True, args: list = None, kwargs: dict = None) -> ThreadTimer:
+		"""
+		Schedules a callback on the timer scheduler, no thread is created per timer.
+		Callbacks run on a small worker pool and should be short, long work belongs in doLaterInThread.
+		Skill callbacks run on a pool of their own
+		:param interval: seconds
+		:param func:
+		:param autoStart: if False, the returned timer needs to be started
+		:param args:
+		:param kwargs:
+		:return: a handle that can be cancelled like a threading.Timer
+		"""
 		args = args or list()
 		kwargs = kwargs or dict()
 
-		threadTimer = ThreadTimer(callback=func, args=args, kwargs=kwargs)
-		timer = threading.Timer(interval=interval, function=self.onTimerEnd, args=[threadTimer])
-		timer.daemon = True
-		threadTimer.timer = timer
-		self._timers.append(threadTimer)
+		timer = ThreadTimer(callback=func, args=args, kwargs=kwargs, interval=interval, scheduler=self._scheduler, skill=self.isSkillCallback(func))
+		self._timers.add(timer)
 
 		if autoStart:
 			timer.start()
@@ -102,27 +117,48 @@ class ThreadManager(Manager):
 		return timer
 
 
+	@staticmethod
+	def isSkillCallback(func: Callable) -> bool:
+		return (getattr(func, '__module__', None) or '').startswith('skills.')
+
+
 	def doLater(self, interval: float, func: Callable, args: list = None, kwargs: dict = None):
 		self.newTimer(interval=interval, func=func, args=args, kwargs=kwargs)
 
 
+	def doLaterInThread(self, interval: float, name: str, func: Callable, args: list = None, kwargs: dict = None) -> ThreadTimer:
+		"""
+		Same as doLater, for long callbacks. They are started on their own thread rather than holding one of the timer workers
+		:param interval: seconds
+		:param name: the thread name
+		:param func:
+		:param args:
+		:param kwargs:
+		:return:
+		"""
+		return self.newTimer(interval=interval, func=self.newThread, kwargs={'name': name, 'target': func, 'args': args, 'kwargs': kwargs})
+
+
 	def onTimerEnd(self, timer: ThreadTimer):
 		if not timer or not timer.callback:
 			return
 
-		timer.callback(*timer.args, **timer.kwargs)
-		self.removeTimer(timer)
+		try:
+			if not timer.cancelled:
+				timer.callback(*timer.args, **timer.kwargs)
+		except Exception as e:
+			self.logError(f'Error in timer callback **{getattr(timer.callback, "__name__", timer.callback)}**: {e}')
+		finally:
+			timer.finish()
+			self._timers.discard(timer)
 
 
 	def removeTimer(self, timer: ThreadTimer):
 		if not timer or not timer.callback:
 			return
 
-		if timer.timer.is_alive():
-			timer.timer.cancel()
-
-		if timer in self._timers:
-			self._timers.remove(timer)
+		timer.cancel()
+		self._timers.discard(timer)
 
 
 	def newThread(self, name: str, target: Callable, autostart: bool = True, args: list = None, kwargs: dict = None) -> threading.Thread:
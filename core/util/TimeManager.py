@@ -43,4 +43,4 @@ class TimeManager(Manager):
 		minute = datetime.now().minute
 		second = datetime.now().second
 		missingSeconds = 60 * (minutes - minute % minutes) - second
-		self.ThreadManager.doLater(interval=missingSeconds, func=self.timerSignal, args=[minutes, signal, True])
+		self.ThreadManager.doLaterInThread(interval=missingSeconds, name=f'{signal}Signal', func=self.timerSignal, args=[minutes, signal, True])
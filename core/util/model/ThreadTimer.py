@@ -17,14 +17,74 @@
 #
 #  Last modified: 2021.04.13 at 12:56:48 CEST
 
+from __future__ import annotations
+
+import threading
 from dataclasses import dataclass, field
-from threading import Timer
-from typing import Callable, Optional
+from typing import Callable, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+	from core.util.model.TimerScheduler import TimerScheduler
 
 
-@dataclass
+@dataclass(eq=False)
 class ThreadTimer(object):
+	"""
+	A callback waiting on the timer scheduler. It is used like a threading.Timer,
+	it can be started once, cancelled, checked for being alive and joined
+	"""
 	callback: Callable
 	args: list = field(default_factory=list)
 	kwargs: dict = field(default_factory=dict)
-	timer: Optional[Timer] = None
+	interval: float = 0
+	scheduler: TimerScheduler = field(default=None, repr=False)
+	deadline: float = 0
+	started: bool = False
+	cancelled: bool = False
+	finished: bool = False
+	queued: bool = False  # Still waiting in the scheduler heap
+	skill: bool = False  # Skill callbacks run on their own workers
+	done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+
+	def start(self):
+		if self.started:
+			raise RuntimeError('Timers can only be started once')
+
+		self.started = True
+		self.scheduler.schedule(self)
+
+
+	def cancel(self):
+		if self.cancelled or self.finished:
+			return
+
+		self.cancelled = True
+		self.done.set()
+		if self.started:
+			self.scheduler.cancel(self)
+
+
+	def finish(self):
+		self.finished = True
+		self.done.set()
+
+
+	def is_alive(self) -> bool:
+		return self.started and not self.cancelled and not self.finished
+
+
+	def isAlive(self) -> bool:
+		return self.is_alive()
+
+
+	def join(self, timeout: Optional[float] = None):
+		"""
+		Waits for the callback to have run or the timer to be cancelled
+		:param timeout: seconds
+		:return:
+		"""
+		if not self.started:
+			raise RuntimeError('Cannot join a timer before it is started')
+
+		self.done.wait(timeout=timeout)
@@ -0,0 +1,150 @@
+#  Copyright (c) 2021
+#
+#  This file, TimerScheduler.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from core.util.model.ThreadTimer import ThreadTimer
+
+
+class TimerScheduler(object):
+	"""
+	Runs every timer off a single scheduling thread, timers being kept in a heap ordered by deadline.
+	Due callbacks are handed to a bounded pool of workers, so that a slow callback doesn't hold the others.
+	Skill callbacks get their own pool, skills can't starve the core timers such as the session timeouts
+	"""
+
+	COMPACT_THRESHOLD = 64
+
+
+	def __init__(self, dispatch: Callable[[ThreadTimer], None], workers: int = 8, skillWorkers: int = 4):
+		self._dispatch = dispatch
+		self._workers = workers
+		self._skillWorkers = skillWorkers
+
+		self._heap: List[Tuple[float, int, ThreadTimer]] = list()
+		self._sequence = itertools.count()
+		self._cancelled = 0
+
+		self._condition = threading.Condition()
+		self._thread: Optional[threading.Thread] = None
+		self._executor: Optional[ThreadPoolExecutor] = None
+		self._skillExecutor: Optional[ThreadPoolExecutor] = None
+		self._running = False
+
+
+	def schedule(self, timer: ThreadTimer):
+		with self._condition:
+			timer.deadline = time.monotonic() + timer.interval
+			timer.queued = True
+			heapq.heappush(self._heap, (timer.deadline, next(self._sequence), timer))
+
+			if not self._running:
+				self._start()
+			elif self._heap[0][2] is timer:
+				self._condition.notify()
+
+
+	def cancel(self, timer: ThreadTimer):
+		"""
+		Cancelled timers stay in the heap until they are due, unless they become the majority
+		:param timer:
+		:return:
+		"""
+		with self._condition:
+			if not timer.queued:
+				return  # Already handed to a worker, there's nothing left in the heap to account for
+
+			self._cancelled += 1
+			if self._cancelled < self.COMPACT_THRESHOLD or self._cancelled < len(self._heap) // 2:
+				return
+
+			for entry in self._heap:
+				if entry[2].cancelled:
+					entry[2].queued = False
+
+			self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+			heapq.heapify(self._heap)
+			self._cancelled = 0
+
+
+	def stop(self):
+		with self._condition:
+			self._running = False
+			for entry in self._heap:
+				entry[2].queued = False
+			self._heap.clear()
+			self._cancelled = 0
+			self._condition.notify()
+
+		if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+			self._thread.join(timeout=1)
+
+		for executor in (self._executor, self._skillExecutor):
+			if executor:
+				executor.shutdown(wait=False)
+
+		self._thread = None
+		self._executor = None
+		self._skillExecutor = None
+
+
+	@property
+	def pending(self) -> int:
+		return len(self._heap) - self._cancelled
+
+
+	def _start(self):
+		self._running = True
+		self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='timerWorker')
+		self._skillExecutor = ThreadPoolExecutor(max_workers=self._skillWorkers, thread_name_prefix='skillTimerWorker')
+		self._thread = threading.Thread(name='timerScheduler', target=self._run, daemon=True)
+		self._thread.start()
+
+
+	def _run(self):
+		with self._condition:
+			while self._running:
+				if not self._heap:
+					self._condition.wait()
+					continue
+
+				deadline, _, timer = self._heap[0]
+				if timer.cancelled:
+					heapq.heappop(self._heap)
+					timer.queued = False
+					self._cancelled = max(0, self._cancelled - 1)
+					continue
+
+				delay = deadline - time.monotonic()
+				if delay > 0:
+					self._condition.wait(timeout=delay)
+					continue
+
+				heapq.heappop(self._heap)
+				timer.queued = False
+				executor = self._skillExecutor if timer.skill else self._executor
+				executor.submit(self._dispatch, timer)
@@ -17,8 +17,12 @@
 #
 #  Last modified: 2021.07.31 at 15:54:28 CEST
 
+import threading
+import time
+from collections import OrderedDict
 from importlib import import_module, reload
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from core.base.model.Manager import Manager
 from core.commons import constants
@@ -26,25 +30,62 @@ from core.dialog.model.DialogSession import DialogSession
 from core.user.model.User import User
 from core.voice.model.TTSEnum import TTSEnum
 from core.voice.model.Tts import Tts
+from core.voice.model.TtsCache import TtsCache
+from core.voice.model.TtsWorker import TtsWorkerPool
 
 
 class TTSManager(Manager):
 
+	PREWARM_DELAY = 120
+
+
 	def __init__(self):
 		super().__init__()
 
 		self._fallback = None
 		self._tts = None
 		self._cacheRoot = Path(self.Commons.rootDir(), 'var/cache')
+		self._cache = TtsCache(self._cacheRoot)
+		self._instances: Dict[Tuple, Dict] = OrderedDict()  # (tts, language, type, voice): {'tts': instance, 'lastUse': monotonic}, least recently used first
+		self._instancesLock = threading.Lock()
+		self._creationLocks: Dict[Tuple, threading.Lock] = dict()  # One per voice profile, a profile's instance is only created once
+		self._synthesisPools: Dict[str, Optional[TtsWorkerPool]] = dict()  # synthesizer: pool, None if the synthesizer can't be used
+		self._synthesisPoolsLock = threading.Lock()
 
 
 	def onStart(self):
 		super().onStart()
+		self._cache.onStart()
 		self._loadTTS(self.ConfigManager.getAliceConfigByName('tts').lower())
 
 
+	def onBooted(self):
+		super().onBooted()
+		if self.ConfigManager.getAliceConfigByName('ttsCachePrewarm'):
+			self.ThreadManager.doLaterInThread(interval=self.PREWARM_DELAY, name='ttsPrewarm', func=self.prewarmCache)
+
+
+	def onStop(self):
+		super().onStop()
+		self._cache.onStop()
+		self.clearInstances()
+		self.closeSynthesisPools()
+
+
 	def _loadTTS(self, userTTS: str = None, user: User = None, forceTts=None):
 		self._fallback = None
+		self._tts = None
+		self._tts = self._createTts(userTTS=userTTS, user=user, forceTts=forceTts)
+
+
+	def _createTts(self, userTTS: str = None, user: User = None, forceTts=None) -> Optional[Tts]:
+		"""
+		Instantiates and starts the Tts matching the given settings, falling back according to the user settings
+		:param userTTS: the Tts the user asked for, the configured one if none
+		:param user: the user whose language, type and voice are used, if any
+		:param forceTts: the Tts to use, no matter the settings
+		:return: the started Tts, None if even the fallback failed
+		"""
 		if forceTts:
 			systemTTS = forceTts
 		else:
@@ -57,8 +98,6 @@ class TTSManager(Manager):
 		stayOffline = self.ConfigManager.getAliceConfigByName('stayCompletelyOffline')
 		online = self.InternetManager.online
 
-		self._tts = None
-
 		if systemTTS == TTSEnum.PICO.value:
 			package = 'core.voice.model.PicoTts'
 		elif systemTTS == TTSEnum.MYCROFT.value:
@@ -74,40 +113,160 @@ class TTSManager(Manager):
 
 		module = import_module(package)
 		tts = getattr(module, package.rsplit('.', 1)[-1])
-		self._tts = tts(user)
+		instance = tts(user)
 
-		if not self._tts.checkDependencies():
-			if not self._tts.installDependencies():
-				self._tts = None
+		if not instance.checkDependencies():
+			if not instance.installDependencies():
+				instance = None
 			else:
 				module = reload(module)
 				tts = getattr(module, package.rsplit('.', 1)[-1])
-				self._tts = tts(user)
+				instance = tts(user)
 
-		if self._tts is None:
+		if instance is None:
 			self.logWarning("Couldn't install Tts, falling back to PicoTts")
 			from core.voice.model.PicoTts import PicoTts
 
-			self._tts = PicoTts(user)
+			instance = PicoTts(user)
 
-		if self._tts.online and (not online or keepTTSOffline or stayOffline):
-			self._tts = None
+		if instance.online and (not online or keepTTSOffline or stayOffline):
+			instance = None
 
-		if self._tts is None:
+		if instance is None:
 			if not forceTts:
 				fallback = self.ConfigManager.getAliceConfigByName('ttsFallback')
 				self.logWarning(f'Tts did not satisfy the user settings, falling back to **{fallback}**')
-				self._loadTTS(userTTS=userTTS, user=user, forceTts=fallback)
-				return
+				return self._createTts(userTTS=userTTS, user=user, forceTts=fallback)
 			else:
 				self.logFatal('Fallback Tts failed, going down')
-				return
+				return None
 
 		try:
-			self._tts.onStart()
+			instance.onStart()
 		except Exception as e:
 			self.logFatal(f"Tts failed starting: {e}")
 
+		return instance
+
+
+	@staticmethod
+	def voiceProfile(user: User) -> Tuple[str, str, str, str]:
+		"""
+		What makes a user's voice, the key the started Tts instances are kept under.
+		Empty values stand for the configured ones
+		:param user:
+		:return: (tts, language, type, voice)
+		"""
+		return (user.tts or '').lower(), user.ttsLanguage or '', user.ttsType or '', user.ttsVoice or ''
+
+
+	def userTts(self, user: User) -> Optional[Tts]:
+		"""
+		Returns the started Tts speaking with the user's voice, creating it on first use only.
+		Instances are kept in a bounded pool, least recently used and idle ones are dropped
+		:param user:
+		:return:
+		"""
+		key = self.voiceProfile(user)
+
+		with self._instancesLock:
+			self._evictInstances(time.monotonic())
+			tts = self._useInstance(key)
+			if tts:
+				return tts
+
+			creationLock = self._creationLocks.setdefault(key, threading.Lock())
+
+		# Starting a Tts takes time, users of other voices aren't held meanwhile
+		with creationLock:
+			with self._instancesLock:
+				tts = self._useInstance(key)
+				if tts:
+					return tts
+
+			tts = self._createTts(userTTS=user.tts, user=user)
+			if not tts:
+				return None
+
+			with self._instancesLock:
+				self._instances[key] = {'tts': tts, 'lastUse': time.monotonic()}
+				self._evictInstances(time.monotonic(), size=max(1, int(self.ConfigManager.getAliceConfigByName('ttsInstances'))))
+				return tts
+
+
+	def _useInstance(self, key: Tuple) -> Optional[Tts]:
+		"""
+		Returns the pooled instance for the voice profile, if any, marking it as the most recently used. Must be called holding the instances lock
+		:param key: voice profile
+		:return:
+		"""
+		entry = self._instances.get(key)
+		if not entry:
+			return None
+
+		entry['lastUse'] = time.monotonic()
+		self._instances.move_to_end(key)
+		return entry['tts']
+
+
+	def _evictInstances(self, now: float, size: int = None):
+		"""
+		Drops the instances unused for too long and, if a size is given, the least recently used ones above it.
+		Instances still speaking are kept. Must be called holding the instances lock
+		:param now: monotonic time
+		:param size: how many instances to keep at most
+		:return:
+		"""
+		idleTimeout = int(self.ConfigManager.getAliceConfigByName('ttsInstanceIdleTimeout')) * 60
+		excess = len(self._instances) - size if size else 0
+
+		for key, entry in list(self._instances.items()):
+			if entry['tts'].speaking:
+				continue
+
+			if excess > 0:
+				excess -= 1
+			elif now - entry['lastUse'] <= idleTimeout:
+				continue
+
+			del self._instances[key]
+
+
+	def clearInstances(self):
+		with self._instancesLock:
+			self._instances.clear()
+
+
+	def synthesisPool(self, name: str, command: List[str]) -> Optional[TtsWorkerPool]:
+		"""
+		The resident workers an offline Tts sends its synthesis requests to, started on first use and kept running
+		:param name: the synthesizer, its pool is shared by all the Tts instances using it
+		:param command: what starts a worker
+		:return: None if the workers can't load the synthesizer
+		"""
+		with self._synthesisPoolsLock:
+			if name in self._synthesisPools:
+				return self._synthesisPools[name]
+
+			pool = TtsWorkerPool(command=command, size=int(self.ConfigManager.getAliceConfigByName('ttsWorkers')))
+			if not pool.start():
+				self.logWarning(f'Synthesis workers for **{name}** are not available, synthesizing one process per speech')
+				pool.close()
+				pool = None
+
+			self._synthesisPools[name] = pool
+			return pool
+
+
+	def closeSynthesisPools(self):
+		with self._synthesisPoolsLock:
+			pools = self._synthesisPools
+			self._synthesisPools = dict()
+
+		for pool in pools.values():
+			if pool:
+				pool.close()
+
 
 	@property
 	def tts(self) -> Tts:
@@ -116,9 +275,10 @@ class TTSManager(Manager):
 
 	@property
 	def speaking(self) -> bool:
-		if not self._tts:
-			return False
-		return self._tts.speaking
+		if self._tts and self._tts.speaking:
+			return True
+		with self._instancesLock:
+			return any(entry['tts'].speaking for entry in self._instances.values())
 
 
 	@property
@@ -126,16 +286,68 @@ class TTSManager(Manager):
 		return self._cacheRoot
 
 
+	@property
+	def cache(self) -> TtsCache:
+		return self._cache
+
+
+	def trimCache(self):
+		self._cache.evict()
+
+
+	def prewarmCache(self):
+		"""
+		Synthesizes the static talks, the ones without any placeholder, of the system and every skill
+		so that they are ready to be played. Only runs with an offline tts, only when Alice is idle
+		and stops as soon as the cache budget is reached
+		:return:
+		"""
+		tts = self._tts
+		if not tts or tts.online:
+			return
+
+		generated = 0
+		for text in self.staticTalks():
+			if not self.isActive or tts is not self._tts or self._cache.size >= self._cache.budget:
+				break
+
+			while self._tts.speaking or self.DialogManager.sessions:
+				if not self.isActive:
+					return
+				time.sleep(1)
+
+			text = tts.cleanText(text)
+			file = tts.cacheFile(text)
+			if not text or file.exists():
+				continue
+
+			if tts.synthesize(text=text, file=file):
+				generated += 1
+
+		if generated:
+			self.logInfo(f'Prewarmed TTS cache with {generated} talk', plural='talk')
+
+
+	def staticTalks(self) -> Iterator[str]:
+		language = self.LanguageManager.activeLanguage
+		for talks in self.TalkManager.langData.values():
+			for talk in talks.get(language, dict()).values():
+				texts = talk if isinstance(talk, list) else [text for variant in talk.values() for text in variant]
+				yield from (text for text in texts if isinstance(text, str) and '{' not in text)
+
+
 	def onInternetConnected(self):
 		if self.ConfigManager.getAliceConfigByName('stayCompletelyOffline') or self.ConfigManager.getAliceConfigByName('keepTTSOffline'):
 			return
 
+		self.clearInstances()
 		if not self._tts.online:
 			self.logInfo('Connected to internet, switching TTS')
 			self._loadTTS(self.ConfigManager.getAliceConfigByName('tts').lower())
 
 
 	def onInternetLost(self):
+		self.clearInstances()
 		if self._tts.online:
 			self.logInfo('Internet lost, switching to offline TTS')
 			self._loadTTS(self.ConfigManager.getAliceConfigByName('ttsFallback').lower())
@@ -150,9 +362,10 @@ class TTSManager(Manager):
 			self.MqttManager.endSession(sessionId=session.sessionId)
 			return
 
+		tts = self._tts
 		if session and session.user != constants.UNKNOWN_USER:
 			user: User = self.UserManager.getUser(session.user)
 			if user and user.tts:
-				self._loadTTS(user.tts, user)
+				tts = self.userTts(user) or tts
 
-		self._tts.onSay(session)
+		tts.onSay(session)
@@ -19,10 +19,9 @@
 
 from importlib import import_module, reload
 
-from paho.mqtt.client import MQTTMessage
-
 from core.base.model.Manager import Manager
 from core.dialog.model.DialogSession import DialogSession
+from core.server.model.AudioFrame import AudioFrame
 from core.voice.model.WakewordEngine import WakewordEngine
 
 
@@ -37,10 +36,12 @@ class WakewordManager(Manager):
 		super().onStart()
 		if not self.ConfigManager.getAliceConfigByName('disableCapture'):
 			self._startWakewordEngine()
+			self.AudioServer.subscribeAudioFrames(deviceUid=None, callback=self.feedAudioFrame)
 
 
 	def onStop(self):
 		super().onStop()
+		self.AudioServer.unsubscribeAudioFrames(callback=self.feedAudioFrame)
 		if self._engine:
 			self._engine.onStop()
 
@@ -50,9 +51,9 @@ class WakewordManager(Manager):
 			self._engine.onBooted()
 
 
-	def onAudioFrame(self, message: MQTTMessage, deviceUid: str):
+	def feedAudioFrame(self, frame: AudioFrame, deviceUid: str):
 		if self._engine:
-			self._engine.onAudioFrame(message=message, deviceUid=deviceUid)
+			self._engine.feedAudioFrame(frame=frame, deviceUid=deviceUid)
 
 
 	def onHotwordToggleOn(self, deviceUid: str, session: DialogSession):
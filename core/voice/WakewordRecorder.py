@@ -20,8 +20,9 @@
 import shutil
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
+import numpy as np
 from pydub import AudioSegment
 
 from core.base.model.Manager import Manager
@@ -118,8 +119,7 @@ class WakewordRecorder(Manager):
 		if self._gainFix > 0:
 			sound.append(self._gainFix)
 
-		startTrim = self.detectLeadingSilence(sound)
-		endTrim = self.detectLeadingSilence(sound.reverse())
+		startTrim, endTrim = self.detectSilenceEdges(sound, self._userTuning)
 		duration = len(sound)
 		trimmed = sound[startTrim: duration - endTrim]
 
@@ -153,12 +153,37 @@ class WakewordRecorder(Manager):
 
 
 	def detectLeadingSilence(self, sound: AudioSegment) -> int:
-		average = sound.dBFS
-		pos = 0
-		while sound[pos: pos + 10].dBFS < (average + self._userTuning) and pos < len(sound):
-			pos += 10
-
-		return pos
+		return self.detectSilenceEdges(sound, self._userTuning)[0]
+
+
+	@staticmethod
+	def detectSilenceEdges(sound: AudioSegment, tuning: float = 0, windowMs: int = 10) -> Tuple[int, int]:
+		"""
+		Finds the silence to trim at both ends of a sample. A window is silent when its loudness is under the
+		sample's average loudness plus the tuning, in dB. The loudness of every window is computed in one pass
+		:param sound: the sample
+		:param tuning: dB added to the average loudness, the higher the more gets trimmed
+		:param windowMs: window length in milliseconds
+		:return: milliseconds of silence at the start and at the end
+		"""
+		samples = np.asarray(sound.get_array_of_samples(), dtype=np.float64)
+		duration = len(sound)
+		if not samples.size:
+			return 0, 0
+
+		squares = np.square(samples)
+		windowSize = max(1, int(sound.frame_rate * windowMs / 1000)) * sound.channels
+		starts = np.arange(0, squares.size, windowSize)
+		power = np.add.reduceat(squares, starts) / np.diff(np.append(starts, squares.size))
+
+		# Comparing mean squares against the average one scaled by the tuning is comparing dBFS, without the logs
+		threshold = squares.mean() * 10 ** (tuning / 10)
+		loud = np.flatnonzero(power >= threshold)
+		if not loud.size:
+			return duration, 0
+
+		end = min(duration, (int(loud[-1]) + 1) * windowMs)
+		return int(loud[0]) * windowMs, duration - end
 
 
 	def tryCaptureFix(self):
@@ -18,6 +18,7 @@
 #  Last modified: 2021.04.13 at 12:56:48 CEST
 
 import re
+from pathlib import Path
 
 from core.dialog.model.DialogSession import DialogSession
 from core.user.model.User import User
@@ -301,38 +302,34 @@ class AmazonTts(Tts):
 		return text
 
 
-	def onSay(self, session: DialogSession):
-		super().onSay(session)
-
-		if not self._text:
-			return
-
+	def _generate(self, text: str, file: Path) -> bool:
 		neural = self.ConfigManager.getAliceConfigByName('ttsNeural') and self._neuralVoice
 
-		tmpFile = self.TEMP_ROOT / self._cacheFile.with_suffix('.mp3')
-		if not self._cacheFile.exists():
-			self.logDebug(f'Downloading file **{self._cacheFile.stem}**')
-			response = self._client.synthesize_speech(
-				Engine='neural' if neural else 'standard',
-				LanguageCode=self._lang,
-				OutputFormat='mp3',
-				SampleRate=str(self.AudioServer.SAMPLERATE),
-				Text=self._checkText(session) if neural else self._text,
-				TextType='text' if neural else 'ssml',
-				VoiceId=self._voice.title()
-			)
+		tmpFile = self.TEMP_ROOT / file.with_suffix('.mp3')
+		self.logDebug(f'Downloading file **{file.stem}**')
+		response = self._client.synthesize_speech(
+			Engine='neural' if neural else 'standard',
+			LanguageCode=self._lang,
+			OutputFormat='mp3',
+			SampleRate=str(self.AudioServer.SAMPLERATE),
+			Text=text,
+			TextType='text' if neural else 'ssml',
+			VoiceId=self._voice.title()
+		)
 
-			if not response:
-				self.logError(f'[{self.TTS.value}] Failed downloading speech file')
-				return
+		if not response:
+			self.logError(f'[{self.TTS.value}] Failed downloading speech file')
+			return False
 
-			tmpFile.write_bytes(response['AudioStream'].read())
+		tmpFile.write_bytes(response['AudioStream'].read())
 
-			self._mp3ToWave(src=tmpFile, dest=self._cacheFile)
-			tmpFile.unlink()
+		self._mp3ToWave(src=tmpFile, dest=file)
+		tmpFile.unlink()
 
-			self.logDebug(f'Downloaded speech file **{self._cacheFile.stem}**')
-		else:
-			self.logDebug(f'Using existing cached file **{self._cacheFile.stem}**')
+		self.logDebug(f'Downloaded speech file **{file.stem}**')
+		return True
 
-		self._speak(self._cacheFile, session)
+
+	def onSay(self, session: DialogSession):
+		super().onSay(session)
+		self._sayText(session)
@@ -223,36 +223,32 @@ class GoogleTts(Tts):
 		)
 
 
-	def onSay(self, session: DialogSession):
-		super().onSay(session)
-
-		if not self._text:
-			return
+	def _generate(self, text: str, file: Path) -> bool:
+		tmpFile = self.TEMP_ROOT / file.with_suffix('.mp3')
+		self.logDebug(f'Downloading file **{file.stem}**')
+		imput = texttospeech.types.module.SynthesisInput(ssml=text)
+		audio = texttospeech.types.module.AudioConfig(
+			audio_encoding=texttospeech.enums.AudioEncoding.MP3,
+			sample_rate_hertz=self.AudioServer.SAMPLERATE
+		)
+		voice = texttospeech.types.module.VoiceSelectionParams(
+			language_code=self._lang,
+			name=self._voice
+		)
 
-		tmpFile = self.TEMP_ROOT / self._cacheFile.with_suffix('.mp3')
-		if not self._cacheFile.exists():
-			self.logDebug(f'Downloading file **{self._cacheFile.stem}**')
-			imput = texttospeech.types.module.SynthesisInput(ssml=self._text)
-			audio = texttospeech.types.module.AudioConfig(
-				audio_encoding=texttospeech.enums.AudioEncoding.MP3,
-				sample_rate_hertz=self.AudioServer.SAMPLERATE
-			)
-			voice = texttospeech.types.module.VoiceSelectionParams(
-				language_code=self._lang,
-				name=self._voice
-			)
+		response = self._client.synthesize_speech(imput, voice, audio)
+		if not response:
+			self.logError(f'[{self.TTS.value}] Failed downloading speech file')
+			return False
 
-			response = self._client.synthesize_speech(imput, voice, audio)
-			if not response:
-				self.logError(f'[{self.TTS.value}] Failed downloading speech file')
-				return
+		tmpFile.write_bytes(response.audio_content)
 
-			tmpFile.write_bytes(response.audio_content)
+		self._mp3ToWave(src=tmpFile, dest=file)
+		tmpFile.unlink()
+		self.logDebug(f'Downloaded speech file **{file.stem}**')
+		return True
 
-			self._mp3ToWave(src=tmpFile, dest=self._cacheFile)
-			tmpFile.unlink()
-			self.logDebug(f'Downloaded speech file **{self._cacheFile.stem}**')
-		else:
-			self.logDebug(f'Using existing cached file **{self._cacheFile.stem}**')
 
-		self._speak(self._cacheFile, session)
+	def onSay(self, session: DialogSession):
+		super().onSay(session)
+		self._sayText(session)
@@ -17,7 +17,6 @@
 #
 #  Last modified: 2021.04.13 at 12:56:48 CEST
 
-import getpass
 from pathlib import Path
 
 from core.base.SuperManager import SuperManager
@@ -126,41 +125,19 @@ class MycroftTts(Tts):
 			return True
 
 
-	def onSay(self, session: DialogSession):
-		super().onSay(session)
+	def _generate(self, text: str, file: Path) -> bool:
+		voice = self._voice
+		if not Path(self._mimicDirectory, 'voices', self._voice + '.flitevox').exists():
+			htsvoice = Path(self._mimicDirectory, 'voices', self._voice + '.htsvoice')
+			voice = str(htsvoice) if htsvoice.exists() else 'slt'
 
-		if not self._text:
-			return
-
-		if not self._cacheFile.exists():
-			if not Path(self._mimicDirectory, 'voices', self._voice + '.flitevox').exists():
-				htsvoice = Path(self._mimicDirectory, 'voices', self._voice + '.htsvoice')
-				if htsvoice.exists():
-					SuperManager.getInstance().commonsManager.runRootSystemCommand([
-						'-u', getpass.getuser(),
-						self._mimicDirectory,
-						'-t', self._text,
-						'-o', self._cacheFile,
-						'-voice', htsvoice
-					])
-				else:
-					SuperManager.getInstance().commonsManager.runRootSystemCommand([
-						'-u', getpass.getuser(),
-						self._mimicDirectory,
-						'-t', self._text,
-						'-o', self._cacheFile,
-						'-voice', 'slt'
-					])
-			else:
-				SuperManager.getInstance().commonsManager.runRootSystemCommand([
-					'-u', getpass.getuser(),
-					self._mimicDirectory,
-					'-t', self._text,
-					'-o', self._cacheFile,
-					'-voice', self._voice
-				])
-			self.logDebug(f'Generated speech file **{self._cacheFile.stem}**')
-		else:
-			self.logDebug(f'Using existing cached file **{self._cacheFile.stem}**')
+		if not self._runSynthesis([str(self._mimicDirectory), '-t', text, '-o', str(file), '-voice', voice]):
+			return False
 
-		self._speak(file=self._cacheFile, session=session)
+		self.logDebug(f'Generated speech file **{file.stem}**')
+		return True
+
+
+	def onSay(self, session: DialogSession):
+		super().onSay(session)
+		self._sayText(session)
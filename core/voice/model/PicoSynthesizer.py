@@ -0,0 +1,204 @@
+#  Copyright (c) 2021
+#
+#  This file, PicoSynthesizer.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+"""
+Resident Pico synthesis worker. Run as a script by the TtsWorker, it loads libttspico and the voices once
+and then synthesizes the requests it reads from stdin, one json line each, answering one json line each.
+It must not import anything from Alice, it runs in its own interpreter
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import sys
+import wave
+from typing import Callable, Dict, Iterable
+
+
+LINGWARE = '/usr/share/pico/lang'
+VOICES = {
+	'en-US': ('en-US_ta.bin', 'en-US_lh0_sg.bin'),
+	'en-GB': ('en-GB_ta.bin', 'en-GB_kh0_sg.bin'),
+	'de-DE': ('de-DE_ta.bin', 'de-DE_gl0_sg.bin'),
+	'es-ES': ('es-ES_ta.bin', 'es-ES_zl0_sg.bin'),
+	'fr-FR': ('fr-FR_ta.bin', 'fr-FR_nk0_sg.bin'),
+	'it-IT': ('it-IT_ta.bin', 'it-IT_cm0_sg.bin')
+}
+
+PICO_OK = 0
+PICO_STEP_BUSY = 201
+PICO_RESET_SOFT = 0x10
+
+
+class PicoEngine(object):
+	"""
+	One Pico system with a single voice loaded, the same sizes and calls pico2wave uses
+	"""
+
+	MEMORY_SIZE = 2500000
+	BUFFER_SIZE = 128
+	MAX_TEXT = 32767
+	SAMPLE_RATE = 16000
+	VOICE_NAME = b'PicoVoice'
+
+
+	def __init__(self, library, lang: str):
+		if lang not in VOICES:
+			raise ValueError(f'Unsupported language {lang}')
+
+		self._library = library
+		self._memory = ctypes.create_string_buffer(self.MEMORY_SIZE)
+		self._system = ctypes.c_void_p()
+		self._check(self._library.pico_initialize(self._memory, self.MEMORY_SIZE, ctypes.byref(self._system)))
+		self._check(self._library.pico_createVoiceDefinition(self._system, self.VOICE_NAME))
+
+		for fileName in VOICES[lang]:
+			resource = ctypes.c_void_p()
+			self._check(self._library.pico_loadResource(self._system, os.path.join(LINGWARE, fileName).encode(), ctypes.byref(resource)))
+			name = ctypes.create_string_buffer(200)
+			self._check(self._library.pico_getResourceName(self._system, resource, name))
+			self._check(self._library.pico_addResourceToVoiceDefinition(self._system, self.VOICE_NAME, name.value))
+
+		self._engine = ctypes.c_void_p()
+		self._check(self._library.pico_newEngine(self._system, self.VOICE_NAME, ctypes.byref(self._engine)))
+
+
+	def synthesize(self, text: str, file: str):
+		"""
+		Writes the speech for the text to a 16kHz mono wave file
+		:param text:
+		:param file:
+		:return:
+		"""
+		data = text.encode() + b'\0'
+		buffer = ctypes.create_string_buffer(self.BUFFER_SIZE)
+		sent = ctypes.c_short()
+		received = ctypes.c_short()
+		dataType = ctypes.c_short()
+
+		try:
+			with wave.open(file, 'wb') as output:
+				output.setnchannels(1)
+				output.setsampwidth(2)
+				output.setframerate(self.SAMPLE_RATE)
+
+				while data:
+					chunk = data[:self.MAX_TEXT]
+					self._check(self._library.pico_putTextUtf8(self._engine, chunk, len(chunk), ctypes.byref(sent)))
+					data = data[sent.value:]
+
+					while True:
+						status = self._library.pico_getData(self._engine, buffer, self.BUFFER_SIZE, ctypes.byref(received), ctypes.byref(dataType))
+						if status < PICO_OK:
+							self._check(status)
+
+						if received.value:
+							output.writeframes(buffer.raw[:received.value])
+
+						if status != PICO_STEP_BUSY:
+							break
+		except Exception:
+			self._library.pico_resetEngine(self._engine, PICO_RESET_SOFT)
+			if os.path.exists(file):
+				os.remove(file)
+			raise
+
+
+	def _check(self, status: int):
+		if status == PICO_OK:
+			return
+
+		message = ctypes.create_string_buffer(200)
+		self._library.pico_getSystemStatusMessage(self._system, status, message)
+		raise RuntimeError(f'Pico error {status}: {message.value.decode(errors="replace")}')
+
+
+def loadLibrary():
+	name = ctypes.util.find_library('ttspico')
+	if not name:
+		raise OSError('libttspico not found')
+
+	library = ctypes.CDLL(name)
+	pointer = ctypes.c_void_p
+	reference = ctypes.POINTER(ctypes.c_void_p)
+	short = ctypes.POINTER(ctypes.c_short)
+	signatures = {
+		'pico_initialize'                  : [pointer, ctypes.c_uint32, reference],
+		'pico_getSystemStatusMessage'      : [pointer, ctypes.c_int, ctypes.c_char_p],
+		'pico_loadResource'                : [pointer, ctypes.c_char_p, reference],
+		'pico_getResourceName'             : [pointer, pointer, ctypes.c_char_p],
+		'pico_createVoiceDefinition'       : [pointer, ctypes.c_char_p],
+		'pico_addResourceToVoiceDefinition': [pointer, ctypes.c_char_p, ctypes.c_char_p],
+		'pico_newEngine'                   : [pointer, ctypes.c_char_p, reference],
+		'pico_putTextUtf8'                 : [pointer, ctypes.c_char_p, ctypes.c_short, short],
+		'pico_getData'                     : [pointer, pointer, ctypes.c_short, short, short],
+		'pico_resetEngine'                 : [pointer, ctypes.c_int]
+	}
+	for function, argtypes in signatures.items():
+		getattr(library, function).argtypes = argtypes
+		getattr(library, function).restype = ctypes.c_int
+
+	return library
+
+
+def serve(requests: Iterable[str], reply: Callable[[dict], None], engineFactory: Callable[[str], PicoEngine]):
+	"""
+	Answers each request, voices are loaded on their first request and kept
+	:param requests: json lines holding lang, text and file
+	:param reply: where the answers go
+	:param engineFactory: loads the voice for a language
+	:return:
+	"""
+	engines: Dict[str, PicoEngine] = dict()
+	for line in requests:
+		if not line.strip():
+			continue
+
+		try:
+			request = json.loads(line)
+			engine = engines.get(request['lang'])
+			if not engine:
+				engine = engineFactory(request['lang'])
+				engines[request['lang']] = engine
+
+			engine.synthesize(request['text'], request['file'])
+			reply({'ok': True})
+		except Exception as e:
+			reply({'ok': False, 'error': str(e)})
+
+
+def main():
+	def reply(message: dict):
+		sys.stdout.write(f'{json.dumps(message)}\n')
+		sys.stdout.flush()
+
+	try:
+		library = loadLibrary()
+	except OSError as e:
+		reply({'ready': False, 'error': str(e)})
+		return
+
+	reply({'ready': True})
+	serve(sys.stdin, reply, lambda lang: PicoEngine(library, lang))
+
+
+if __name__ == '__main__':
+	main()
@@ -17,7 +17,9 @@
 #
 #  Last modified: 2021.04.13 at 12:56:48 CEST
 
-from core.base.SuperManager import SuperManager
+import sys
+from pathlib import Path
+
 from core.dialog.model.DialogSession import DialogSession
 from core.user.model.User import User
 from core.voice.model.TTSEnum import TTSEnum
@@ -26,6 +28,7 @@ from core.voice.model.Tts import Tts
 
 class PicoTts(Tts):
 	TTS = TTSEnum.PICO
+	SYNTHESIZER = [sys.executable, str(Path(__file__).with_name('PicoSynthesizer.py'))]
 
 
 	def __init__(self, user: User = None):
@@ -78,20 +81,25 @@ class PicoTts(Tts):
 		}
 
 
-	def onSay(self, session: DialogSession):
-		super().onSay(session)
+	def onStart(self):
+		super().onStart()
+		self.TTSManager.synthesisPool(name=self.TTS.value, command=self.SYNTHESIZER)
+
 
-		if not self._text:
-			return
+	def _generate(self, text: str, file: Path) -> bool:
+		pool = self.TTSManager.synthesisPool(name=self.TTS.value, command=self.SYNTHESIZER)
+		if pool:
+			succeeded, error = pool.run({'lang': self._lang, 'text': text, 'file': str(file)})
+			if not succeeded:
+				self.logError(f'Something went wrong generating speech file: {error}')
+				return False
+		elif not self._runSynthesis(['pico2wave', '-l', self._lang, '-w', str(file), text], asRoot=True):
+			return False
 
-		if not self._cacheFile.exists():
-			result = SuperManager.getInstance().commonsManager.runRootSystemCommand(['pico2wave', '-l', self._lang, '-w', self._cacheFile, f'"{self._text}"'])
-			if result.returncode:
-				self.logError(f'Something went wrong generating speech file: {result.stderr}')
-				return
-			else:
-				self.logDebug(f'Generated speech file **{self._cacheFile.stem}**')
-		else:
-			self.logDebug(f'Using existing cached file **{self._cacheFile.stem}**')
+		self.logDebug(f'Generated speech file **{file.stem}**')
+		return True
 
-		self._speak(file=self._cacheFile, session=session)
+
+	def onSay(self, session: DialogSession):
+		super().onSay(session)
+		self._sayText(session)
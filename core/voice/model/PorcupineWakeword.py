@@ -17,17 +17,16 @@
 #
 #  Last modified: 2021.04.13 at 12:56:48 CEST
 
-import io
 import queue
-import struct
-import wave
-from typing import Generator
+from typing import Dict, Optional, Set
 
+import numpy as np
 import pyaudio
-from paho.mqtt.client import MQTTMessage
 
 from core.commons import constants
 from core.dialog.model.DialogSession import DialogSession
+from core.server.model.AudioFrame import AudioFrame
+from core.server.model.PcmReblocker import PcmReblocker
 from core.voice.model.WakewordEngine import WakewordEngine
 
 
@@ -46,15 +45,21 @@ class PorcupineWakeword(WakewordEngine):
 		}
 	}
 
+	KEYWORDS = ['porcupine', 'bumblebee', 'terminator', 'blueberry']
+
 
 	def __init__(self):
 		super().__init__()
 		self._working = self.ThreadManager.newEvent('ListenForWakeword')
 		self._buffer = queue.Queue()
 		self._hotwordThread = None
+		self._mainDeviceUid = ''
+		self._satelliteHandlers = dict()
+		self._reblockers: Dict[str, PcmReblocker] = dict()
+		self._muted: Set[str] = set()
 
 		try:
-			self._handler = pvporcupine.create(keywords=['porcupine', 'bumblebee', 'terminator', 'blueberry'])
+			self._handler = pvporcupine.create(keywords=self.KEYWORDS)
 			with self.Commons.shutUpAlsaFFS():
 				self._audio = pyaudio.PyAudio()
 		except:
@@ -64,87 +69,124 @@ class PorcupineWakeword(WakewordEngine):
 	def onBooted(self):
 		super().onBooted()
 		if self._enabled:
+			self._mainDeviceUid = self.DeviceManager.getMainDevice().uid
+			self._muted = set()
 			self._working.set()
 			self._hotwordThread = self.ThreadManager.newThread(name='HotwordThread', target=self.worker)
 
 
 	def onStop(self):
-		super().onStop()
-		if self._enabled:
-			self._working.clear()
-			self._buffer = queue.Queue()
+		super().onStop()  # Disables the engine, no point checking it here
+
+		# The worker frees the handles once it gets there, one might be processing audio right now
+		self._working.clear()
+		self._buffer.put((None, None))
+		self._buffer = queue.Queue()
 
 
 	def onHotwordToggleOff(self, deviceUid: str, session: DialogSession):
 		if self._enabled:
-			self._working.clear()
-			self._buffer = queue.Queue()
+			self._muted.add(deviceUid)
+			self._buffer.put((deviceUid, None))
 
 
 	def onHotwordToggleOn(self, deviceUid: str, session: DialogSession):
 		if self._enabled:
-			self._working.set()
-			self._buffer = queue.Queue()
-			self._hotwordThread = self.ThreadManager.newThread(name='HotwordThread', target=self.worker)
+			self._buffer.put((deviceUid, None))
+			self._muted.discard(deviceUid)
 
 
-	def onAudioFrame(self, message: MQTTMessage, deviceUid: str):
-		if not self.enabled or not self._working.is_set():
+	def feedAudioFrame(self, frame: AudioFrame, deviceUid: str):
+		if not self.enabled or not self._working.is_set() or deviceUid in self._muted:
 			return
 
-		with io.BytesIO(message.payload) as buffer:
-			try:
-				with wave.open(buffer, 'rb') as wav:
-					frame = wav.readframes(self.AudioServer.FRAMES_PER_BUFFER)
-					while frame:
-						self._buffer.put(frame)
-						frame = wav.readframes(self.AudioServer.FRAMES_PER_BUFFER)
+		if deviceUid != self._mainDeviceUid and not self.ConfigManager.getAliceConfigByName('monoWakewordEngine'):
+			return
 
-			except Exception as e:
-				self.logError(f'Error recording audio frame: {e}')
+		self._buffer.put((deviceUid, frame.pcm))
 
 
 	def worker(self):
+		"""
+		One thread services every device. Each device has its own porcupine handle, as handles keep the state
+		of the audio they were fed, and its own reblocker, as porcupine only takes frames of its own length.
+		Handles and reblockers are only ever touched from this thread, other threads queue a None pcm to have
+		a device cleared
+		:return:
+		"""
+		buffer = self._buffer
 		while True:
-			stream = self.audioStream()
-			for data in stream:
-				if not self._working.is_set():
-					break
+			deviceUid, pcm = buffer.get()
+			if deviceUid is None:
+				break
+
+			if pcm is None:
+				self._clearDevice(deviceUid)
+				continue
+
+			if deviceUid in self._muted:
+				continue
+
+			handler = self._getHandler(deviceUid)
+			if not handler:
+				continue
+
+			reblocker = self._reblockers.get(deviceUid)
+			if not reblocker:
+				reblocker = PcmReblocker(blockSize=handler.frame_length)
+				self._reblockers[deviceUid] = reblocker
 
-				pcm = struct.unpack_from('h' * self._handler.frame_length, data)
-				result = self._handler.process(pcm)
+			for block in reblocker.feed(np.frombuffer(pcm, dtype=np.int16)):
+				# Porcupine copies the samples into a ctypes array one by one, plain ints convert faster than numpy scalars
+				result = handler.process(block.tolist())
 				if result is not None and result > -1:
-					self.logDebug('Detected wakeword')
-					self.MqttManager.publish(
-						topic=constants.TOPIC_HOTWORD_DETECTED.format('default'),
-						payload={
-							'siteId'            : self.DeviceManager.getMainDevice().uid,
-							'modelId'           : f'porcupine_{result}',
-							'modelVersion'      : self._handler.version,
-							'modelType'         : 'universal',
-							'currentSensitivity': self.ConfigManager.getAliceConfigByName('wakewordSensitivity')
-						}
-					)
-					return
-
-
-	def audioStream(self) -> Generator:
-		while self._working.is_set():
-			chunk = self._buffer.get()
-			if not chunk:
-				return
-
-			data = [chunk]
-			size = len(chunk)
-
-			while self._working and size < 1024:
-				try:
-					chunk = self._buffer.get(block=True)
-					if not chunk or not self._working:
-						return
-					size += len(chunk)
-					data.append(chunk)
-				except queue.Empty:
+					self.onWakewordDetected(deviceUid=deviceUid, keywordIndex=result, handler=handler)
 					break
 
-			yield b''.join(data)
+		for handler in self._satelliteHandlers.values():
+			handler.delete()
+		self._satelliteHandlers = dict()
+		self._reblockers = dict()
+
+
+	def onWakewordDetected(self, deviceUid: str, keywordIndex: int, handler):
+		self.logDebug(f'Detected wakeword on device **{deviceUid}**')
+		# The device is listened to again once the hotword is toggled back on for it
+		self._muted.add(deviceUid)
+		self._clearDevice(deviceUid)
+
+		self.MqttManager.publish(
+			topic=constants.TOPIC_HOTWORD_DETECTED.format('default'),
+			payload={
+				'siteId'            : deviceUid,
+				'modelId'           : f'porcupine_{keywordIndex}',
+				'modelVersion'      : handler.version,
+				'modelType'         : 'universal',
+				'currentSensitivity': self.ConfigManager.getAliceConfigByName('wakewordSensitivity')
+			}
+		)
+
+
+	def _getHandler(self, deviceUid: str):
+		if deviceUid == self._mainDeviceUid:
+			return self._handler
+
+		handler = self._satelliteHandlers.get(deviceUid)
+		if handler:
+			return handler
+
+		try:
+			handler = pvporcupine.create(keywords=self.KEYWORDS)
+		except Exception as e:
+			self.logError(f'Failed creating a porcupine handle for device **{deviceUid}**: {e}')
+			return None
+
+		self._satelliteHandlers[deviceUid] = handler
+		return handler
+
+
+	def _clearDevice(self, deviceUid: str):
+		# Worker thread only, the reblockers aren't shared
+		reblocker = self._reblockers.get(deviceUid)
+		if reblocker:
+			reblocker.clear()
@@ -21,12 +21,10 @@ import getpass
 import hashlib
 import re
 import tempfile
+import time
 from pathlib import Path
 from re import Match
-from typing import Optional
-
-from pydub import AudioSegment
-from pydub.exceptions import CouldntDecodeError
+from typing import List, Optional
 
 from core.base.model.ProjectAliceObject import ProjectAliceObject
 from core.commons import constants
@@ -38,6 +36,9 @@ class Tts(ProjectAliceObject):
 	TEMP_ROOT = Path(tempfile.gettempdir(), '/tempTTS')
 	TTS = None
 	SPELL_OUT = re.compile(r'<say-as interpret-as=\"(?:spell-out|characters|verbatim)\">(.+)</say-as>')
+	SENTENCE_END = re.compile(r'(?<=[.!?;:])\s+')
+	MIN_SEGMENT_LENGTH = 40  # Characters, shorter sentences are spoken along with the next one
+	REMOTE_SEGMENT_LEAD = 0.05  # Seconds before the end of a segment the next one is sent to a device that is not the main unit
 
 
 	def __init__(self, user: User = None, *args, **kwargs):
@@ -56,6 +57,7 @@ class Tts(ProjectAliceObject):
 		self._neuralVoice = False
 
 		self._cacheFile: Path = Path()
+		self._cacheDirectories = set()  # Directories already made sure to exist
 		self._text = ''
 		self._speaking = False
 
@@ -191,17 +193,114 @@ class Tts(ProjectAliceObject):
 			deviceUid=session.deviceUid
 		)
 
-		try:
-			duration = round(len(AudioSegment.from_file(file)) / 1000, 2)
-		except CouldntDecodeError:
+		duration = self.TTSManager.cache.duration(file)
+		if duration is None:
 			self.logError('Error decoding TTS file')
-			file.unlink()
+			self.TTSManager.cache.remove(file)
 			self.onSay(session)
 		else:
 			self.DialogManager.increaseSessionTimeout(session=session, interval=duration + 0.2)
 			self.ThreadManager.doLater(interval=duration + 0.1, func=self._sayFinished, args=[session])
 
 
+	def _sayText(self, session: DialogSession):
+		"""
+		Speaks the text prepared by onSay. Long texts are spoken sentence by sentence, each sentence being cached on its
+		own, so that the first one plays while the next ones are still being synthesized
+		:param session:
+		:return:
+		"""
+		if not self._text:
+			return
+
+		segments = self.splitText(self._text)
+		if len(segments) < 2:
+			if self.synthesize(text=self._text, file=self._cacheFile):
+				self._speak(file=self._cacheFile, session=session)
+			return
+
+		self._speaking = True
+		session.lastWasSoundPlayOnly = False
+		self.ThreadManager.newThread(name=f'ttsSegments_{session.sessionId}', target=self._speakSegments, args=[segments, session])
+
+
+	def splitText(self, text: str) -> List[str]:
+		"""
+		Cuts a text into sentences worth being synthesized separately. Ssml is only cut if it holds nothing but text
+		:param text: cleaned text
+		:return:
+		"""
+		ssml = text.startswith('<speak>') and text.endswith('</speak>')
+		if ssml:
+			text = text[7:-8]
+			if '<' in text:
+				return [f'<speak>{text}</speak>']
+
+		segments = list()
+		current = ''
+		for sentence in self.SENTENCE_END.split(text):
+			current = f'{current} {sentence}' if current else sentence
+			if len(current) >= self.MIN_SEGMENT_LENGTH:
+				segments.append(current)
+				current = ''
+
+		if current:
+			if segments:
+				segments[-1] = f'{segments[-1]} {current}'
+			else:
+				segments.append(current)
+
+		return [f'<speak>{segment}</speak>' for segment in segments] if ssml else segments
+
+
+	def _speakSegments(self, segments: List[str], session: DialogSession):
+		"""
+		Synthesizes and plays the segments in order. The next segment is synthesized while the current one plays.
+		The main unit queues what it is sent, other devices get each segment right before the previous one ends
+		:param segments:
+		:param session:
+		:return:
+		"""
+		queued = session.deviceUid == self.DeviceManager.getMainDevice().uid
+		playEnd = time.monotonic()
+		played = False
+
+		for text in segments:
+			if played and not self.DialogManager.getSession(session.sessionId):
+				break  # The session ended while we were speaking
+
+			file = self.cacheFile(text)
+			duration = self.TTSManager.cache.duration(file) if self.synthesize(text=text, file=file) else None
+			if duration is None:
+				self.logError('Error generating or decoding TTS file')
+				self.TTSManager.cache.remove(file)
+				break
+
+			if not queued:
+				wait = playEnd - time.monotonic() - self.REMOTE_SEGMENT_LEAD
+				if wait > 0:
+					time.sleep(wait)
+
+			self.MqttManager.playSound(
+				soundFilename=file.stem,
+				location=file.parent,
+				sessionId=session.sessionId,
+				deviceUid=session.deviceUid
+			)
+
+			now = time.monotonic()
+			playEnd = max(now, playEnd) + duration
+			self.DialogManager.increaseSessionTimeout(session=session, interval=playEnd - now + 0.2)
+			played = True
+
+		if not played:
+			self._sayFinished(session)  # Nothing could be said, the dialog must not be left waiting on it
+			return
+
+		# Once for the whole text, whatever the number of segments played
+		self.ThreadManager.doLater(interval=max(0.0, playEnd - time.monotonic()) + 0.1, func=self._sayFinished, args=[session])
+
+
 	def _sayFinished(self, session: DialogSession):
 		self._speaking = False
 		self.MqttManager.publish(
@@ -215,7 +314,10 @@ class Tts(ProjectAliceObject):
 
 
 	def _checkText(self, session: DialogSession) -> str:
-		text = session.payload['text']
+		return self.cleanText(session.payload['text'])
+
+
+	def cleanText(self, text: str) -> str:
 		if not self._supportsSSML:
 			# We need to remove all ssml tags but transform some first
 			text = re.sub(self.SPELL_OUT, self._replaceSpellOuts, text)
@@ -240,5 +342,59 @@ class Tts(ProjectAliceObject):
 		"""
 		self._text = self._checkText(session)
 		if self._text:
-			self._cacheFile = self.cacheDirectory() / (self._hash(text=self._text) + '.wav')
-			self.cacheDirectory().mkdir(parents=True, exist_ok=True)
+			self._cacheFile = self.cacheFile(self._text)
+
+
+	def cacheFile(self, text: str) -> Path:
+		return self.cacheDirectory() / (self._hash(text=text) + '.wav')
+
+
+	def synthesize(self, text: str, file: Path) -> bool:
+		"""
+		Makes sure the speech file for the given cleaned text exists, generating and indexing it if needed
+		:param text:
+		:param file:
+		:return: False if the speech could not be generated
+		"""
+		if file.exists():
+			self.logDebug(f'Using existing cached file **{file.stem}**')
+			return True
+
+		if file.parent not in self._cacheDirectories:
+			file.parent.mkdir(parents=True, exist_ok=True)
+			self._cacheDirectories.add(file.parent)
+
+		if not self._generate(text=text, file=file) or not file.exists():
+			return False
+
+		self.TTSManager.cache.add(file)
+		return True
+
+
+	def _runSynthesis(self, command: List[str], asRoot: bool = False) -> bool:
+		"""
+		Runs a synthesis command
+		:param command: the command and its arguments
+		:param asRoot: whether the command needs root
+		:return: False if the command failed
+		"""
+		if asRoot:
+			result = self.Commons.runRootSystemCommand(command)
+		else:
+			result = self.Commons.runSystemCommand(command)
+
+		if result.returncode:
+			self.logError(f'Something went wrong generating speech file: {result.stderr}')
+			return False
+
+		return True
+
+
+	def _generate(self, text: str, file: Path) -> bool:
+		"""
+		Generates the speech file. Tts providers must redefine this method
+		:param text:
+		:param file:
+		:return: False if the speech could not be generated
+		"""
+		return False
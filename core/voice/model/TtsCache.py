@@ -0,0 +1,254 @@
+#  Copyright (c) 2021
+#
+#  This file, TtsCache.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import json
+import threading
+import time
+import wave
+from collections import OrderedDict
+from contextlib import suppress
+from pathlib import Path
+from typing import Dict, Optional
+
+from pydub import AudioSegment
+from pydub.exceptions import CouldntDecodeError
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+from core.voice.model.TTSEnum import TTSEnum
+
+
+class TtsCache(ProjectAliceObject):
+	"""
+	Index of the generated speech files. It knows the duration, the size and the last access of
+	every cached file, so that a cache hit doesn't need to decode anything, and evicts the least
+	recently used files once the cache grows over its size budget
+	"""
+
+	INDEX_FILE = 'ttsIndex.json'
+	SAVE_DELAY = 30
+
+
+	def __init__(self, root: Path):
+		super().__init__()
+		self._root = root
+		self._index: Dict[str, Dict] = OrderedDict()  # Relative file path: entry, least recently used first
+		self._size = 0
+		self._lock = threading.Lock()
+		self._dirty = False
+
+
+	@property
+	def size(self) -> int:
+		return self._size
+
+
+	@property
+	def budget(self) -> int:
+		return int(self.ConfigManager.getAliceConfigByName('ttsCacheSize')) * 1024 * 1024
+
+
+	def onStart(self):
+		self._root.mkdir(parents=True, exist_ok=True)
+		self.load()
+		self.evict()
+
+
+	def onStop(self):
+		self.save()
+
+
+	def load(self):
+		"""
+		Loads the index and reconciles it with the disk. Files the index doesn't know,
+		left by an older version, are indexed on first use
+		:return:
+		"""
+		index = OrderedDict()
+		indexFile = self._root / self.INDEX_FILE
+		try:
+			if indexFile.exists():
+				entries = json.loads(indexFile.read_text())
+				index = OrderedDict((key, entry) for key, entry in sorted(entries.items(), key=lambda item: item[1]['lastAccess']))
+		except (ValueError, KeyError, TypeError):
+			self.logWarning('TTS cache index is corrupted, rebuilding it')
+
+		# The cache root is shared, only look into the tts directories
+		for tts in TTSEnum:
+			for file in (self._root / tts.value).glob('**/*.wav'):
+				key = str(file.relative_to(self._root))
+				if key not in index:
+					index[key] = {'duration': None, 'size': file.stat().st_size, 'lastAccess': 0}
+					index.move_to_end(key, last=False)
+
+		for key in [key for key in index if not (self._root / key).exists()]:
+			index.pop(key)
+
+		with self._lock:
+			self._index = index
+			self._size = sum(entry['size'] for entry in index.values())
+			self._markDirty()
+
+		self.logInfo(f'TTS cache holds {len(index)} file, {round(self._size / 1024 / 1024, 1)}MB', plural='file')
+
+
+	def save(self):
+		with self._lock:
+			if not self._dirty:
+				return
+
+			data = json.dumps(self._index)
+			self._dirty = False
+
+		try:
+			(self._root / self.INDEX_FILE).write_text(data)
+		except OSError as e:
+			self.logWarning(f'Failed saving TTS cache index: {e}')
+
+
+	def contains(self, file: Path) -> bool:
+		return self._key(file) in self._index
+
+
+	def duration(self, file: Path) -> Optional[float]:
+		"""
+		Returns the duration of a cached speech file, in seconds, and marks it as used.
+		Files not yet indexed get indexed, which is the only time they are read
+		:param file:
+		:return: None if the file cannot be decoded
+		"""
+		key = self._key(file)
+		with self._lock:
+			entry = self._index.get(key)
+			if entry and entry['duration'] is not None:
+				entry['lastAccess'] = time.time()
+				self._index.move_to_end(key)
+				self._markDirty()
+				return entry['duration']
+
+		return self.add(file)
+
+
+	def add(self, file: Path) -> Optional[float]:
+		"""
+		Indexes a freshly generated speech file and evicts older ones if over budget
+		:param file:
+		:return: the duration of the file, None if it cannot be decoded
+		"""
+		duration = self._readDuration(file)
+		if duration is None:
+			return None
+
+		key = self._key(file)
+		size = file.stat().st_size
+		with self._lock:
+			previous = self._index.pop(key, None)
+			if previous:
+				self._size -= previous['size']
+
+			self._index[key] = {'duration': duration, 'size': size, 'lastAccess': time.time()}
+			self._size += size
+			self._markDirty()
+
+		if self._size > self.budget:
+			self.evict(keep=key)
+
+		return duration
+
+
+	def remove(self, file: Path):
+		with self._lock:
+			entry = self._index.pop(self._key(file), None)
+			if entry:
+				self._size -= entry['size']
+				self._markDirty()
+
+		with suppress(FileNotFoundError):
+			file.unlink()
+
+
+	def evict(self, keep: str = ''):
+		"""
+		Deletes the least recently used files until the cache fits its budget
+		:param keep: a file never to evict, usually the one about to be played
+		:return:
+		"""
+		budget = self.budget
+		evicted = list()
+		with self._lock:
+			for key in list(self._index):
+				if self._size <= budget:
+					break
+
+				if key == keep:
+					continue
+
+				self._size -= self._index.pop(key)['size']
+				evicted.append(key)
+
+			if evicted:
+				self._markDirty()
+
+		for key in evicted:
+			with suppress(FileNotFoundError):
+				(self._root / key).unlink()
+
+		if evicted:
+			self.logDebug(f'Evicted {len(evicted)} file from TTS cache', plural='file')
+
+
+	def clear(self):
+		with self._lock:
+			keys = list(self._index)
+			self._index.clear()
+			self._size = 0
+			self._markDirty()
+
+		for key in keys:
+			with suppress(FileNotFoundError):
+				(self._root / key).unlink()
+
+
+	def _markDirty(self):
+		# Lock held. Access times are not worth a disk write each, they are saved in a while
+		if not self._dirty:
+			self._dirty = True
+			self.ThreadManager.doLater(interval=self.SAVE_DELAY, func=self.save)
+
+
+	def _key(self, file: Path) -> str:
+		try:
+			return str(file.relative_to(self._root))
+		except ValueError:
+			return str(file)
+
+
+	def _readDuration(self, file: Path) -> Optional[float]:
+		try:
+			with wave.open(str(file), 'rb') as wav:
+				return round(wav.getnframes() / wav.getframerate(), 2)
+		except (wave.Error, EOFError, ZeroDivisionError):
+			pass  # Not a plain wav, let ffmpeg have a look at it
+		except OSError:
+			return None
+
+		try:
+			return round(len(AudioSegment.from_file(file)) / 1000, 2)
+		except (CouldntDecodeError, OSError):
+			return None
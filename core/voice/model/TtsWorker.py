@@ -0,0 +1,218 @@
+#  Copyright (c) 2021
+#
+#  This file, TtsWorker.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import json
+import os
+import queue
+import select
+import signal
+import subprocess
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+
+
+class TtsWorker(ProjectAliceObject):
+	"""
+	A resident synthesis process that keeps its voices loaded between requests. Requests and answers are json
+	lines over its stdin and stdout, the first line it prints tells whether it could load its synthesizer.
+	A worker runs one request at a time and is restarted on the next request if it died or hung
+	"""
+
+	def __init__(self, command: List[str], timeout: float = 30):
+		"""
+		:param command: what starts the process
+		:param timeout: seconds the start or a synthesis may take before the worker is considered hung
+		"""
+		super().__init__()
+		self._command = command
+		self._timeout = timeout
+		self._process: Optional[subprocess.Popen] = None
+		self._buffer = b''
+		self._lock = threading.Lock()
+		self._restarts = 0
+
+
+	@property
+	def alive(self) -> bool:
+		return self._process is not None and self._process.poll() is None
+
+
+	@property
+	def restarts(self) -> int:
+		return self._restarts
+
+
+	def start(self) -> bool:
+		"""
+		Spawns the process if it isn't running
+		:return: False if the process could not load its synthesizer
+		"""
+		with self._lock:
+			return self.alive or self._spawn()
+
+
+	def run(self, request: dict) -> Tuple[bool, str]:
+		"""
+		Sends a request to the process and waits for its answer
+		:param request:
+		:return: whether the request succeeded, and the error if not
+		"""
+		with self._lock:
+			for _ in range(2):
+				if not self.alive and not self._spawn():
+					return False, 'Synthesis worker could not be started'
+
+				try:
+					self._process.stdin.write(f'{json.dumps(request)}\n'.encode())
+					self._process.stdin.flush()
+				except OSError:
+					# The process died since the last request, one more try with a new one
+					self._terminate()
+					continue
+
+				answer = self._readAnswer()
+				if answer is None:
+					return False, 'Synthesis worker died or timed out'
+
+				return bool(answer.get('ok')), answer.get('error', '')
+
+			return False, 'Synthesis worker could not be started'
+
+
+	def close(self):
+		with self._lock:
+			self._terminate()
+
+
+	def _spawn(self) -> bool:
+		if self._process is not None:
+			self._restarts += 1
+			self.logWarning('Restarting synthesis worker')
+
+		self._buffer = b''
+		try:
+			self._process = subprocess.Popen(
+				self._command,
+				stdin=subprocess.PIPE,
+				stdout=subprocess.PIPE,
+				stderr=subprocess.DEVNULL,
+				start_new_session=True
+			)
+		except OSError as e:
+			self.logWarning(f'Synthesis worker could not be started: {e}')
+			self._process = None
+			return False
+
+		answer = self._readAnswer()
+		if not answer or not answer.get('ready'):
+			self.logWarning(f'Synthesis worker is not available: {answer.get("error", "") if answer else "no answer"}')
+			self._terminate()
+			return False
+
+		return True
+
+
+	def _readAnswer(self) -> Optional[dict]:
+		"""
+		Waits for the next line the process prints
+		:return: the decoded line, None if the process died or hung, in which case it is gone
+		"""
+		deadline = time.monotonic() + self._timeout
+		fd = self._process.stdout.fileno()
+
+		while b'\n' not in self._buffer:
+			remaining = deadline - time.monotonic()
+			if remaining <= 0:
+				self._terminate()
+				return None
+
+			ready, _, _ = select.select([fd], [], [], remaining)
+			if not ready:
+				continue
+
+			data = os.read(fd, 4096)
+			if not data:
+				self._terminate()
+				return None
+
+			self._buffer += data
+
+		line, self._buffer = self._buffer.split(b'\n', 1)
+		try:
+			return json.loads(line)
+		except ValueError:
+			return {'ok': False, 'error': line.decode(errors='replace')}
+
+
+	def _terminate(self):
+		process = self._process
+		if process is None or process.poll() is not None:
+			return
+
+		try:
+			process.stdin.close()
+			process.wait(timeout=1)
+		except (OSError, subprocess.TimeoutExpired):
+			try:
+				os.killpg(process.pid, signal.SIGKILL)  # The whole session, so that a hung synthesizer goes too
+			except OSError:
+				process.kill()
+			process.wait()
+
+
+class TtsWorkerPool(object):
+	"""
+	A fixed number of synthesis workers sharing the requests, which bounds how many synthesize at the same time
+	"""
+
+	def __init__(self, command: List[str], size: int, timeout: float = 30):
+		self._workers = [TtsWorker(command=command, timeout=timeout) for _ in range(max(1, size))]
+		self._idle = queue.Queue()
+		for worker in self._workers:
+			self._idle.put(worker)
+
+
+	@property
+	def size(self) -> int:
+		return len(self._workers)
+
+
+	def start(self) -> bool:
+		"""
+		Spawns the workers ahead of the first request
+		:return: False if the synthesizer can't be used
+		"""
+		return all([worker.start() for worker in self._workers])
+
+
+	def run(self, request: dict) -> Tuple[bool, str]:
+		worker = self._idle.get()
+		try:
+			return worker.run(request)
+		finally:
+			self._idle.put(worker)
+
+
+	def close(self):
+		for worker in self._workers:
+			worker.close()
@@ -19,6 +19,7 @@
 
 from core.base.model.ProjectAliceObject import ProjectAliceObject
 from core.commons import constants
+from core.server.model.AudioFrame import AudioFrame
 
 
 class WakewordEngine(ProjectAliceObject):
@@ -40,6 +41,10 @@ class WakewordEngine(ProjectAliceObject):
 		self._enabled = False
 
 
+	def feedAudioFrame(self, frame: AudioFrame, deviceUid: str):
+		pass  # Engines listening to the audio themselves, such as snips, have nothing to do with it
+
+
 	@property
 	def enabled(self) -> bool:
 		return self._enabled
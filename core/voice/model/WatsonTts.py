@@ -17,6 +17,8 @@
 #
 #  Last modified: 2021.04.13 at 12:56:48 CEST
 
+from pathlib import Path
+
 from core.dialog.model.DialogSession import DialogSession
 from core.user.model.User import User
 from core.voice.model.TTSEnum import TTSEnum
@@ -139,33 +141,29 @@ class WatsonTts(Tts):
 		self._client.set_service_url(self.ConfigManager.getAliceConfigByName('ibmCloudAPIURL'))
 
 
+	def _generate(self, text: str, file: Path) -> bool:
+		tmpFile = self.TEMP_ROOT / file.with_suffix('.mp3')
+		try:
+			self.logDebug(f'Downloading file **{file.stem}**')
+			response = self._client.synthesize(
+				text=text,
+				accept='audio/mp3',
+				voice=self._voice
+			)
+			data = response.result.content
+		except:
+			self.logError(f'[{self.TTS.value}] Failed downloading speech file')
+			return False
+
+		tmpFile.write_bytes(data)
+
+		self._mp3ToWave(src=tmpFile, dest=file)
+		tmpFile.unlink()
+
+		self.logDebug(f'Downloaded speech file **{file.stem}**')
+		return True
+
+
 	def onSay(self, session: DialogSession):
 		super().onSay(session)
-
-		if not self._text:
-			return
-
-		tmpFile = self.TEMP_ROOT / self._cacheFile.with_suffix('.mp3')
-		if not self._cacheFile.exists():
-			try:
-				self.logDebug(f'Downloading file **{self._cacheFile.stem}**')
-				response = self._client.synthesize(
-					text=self._text,
-					accept='audio/mp3',
-					voice=self._voice
-				)
-				data = response.result.content
-			except:
-				self.logError(f'[{self.TTS.value}] Failed downloading speech file')
-				return
-
-			tmpFile.write_bytes(data)
-
-			self._mp3ToWave(src=tmpFile, dest=self._cacheFile)
-			tmpFile.unlink()
-
-			self.logDebug(f'Downloaded speech file **{self._cacheFile.stem}**')
-		else:
-			self.logDebug(f'Using existing cached file **{self._cacheFile.stem}**')
-
-		self._speak(self._cacheFile, session)
+		self._sayText(session)
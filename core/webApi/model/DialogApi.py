@@ -21,11 +21,11 @@ import json
 
 from flask import Response, jsonify, request
 from flask_classful import route
-from paho.mqtt.client import MQTTMessage
 
 from core.commons import constants
 from core.device.model.DeviceAbility import DeviceAbility
 from core.dialog.model.DialogSession import DialogSession
+from core.server.model.MqttEnvelope import MqttEnvelope
 from core.util.Decorators import ApiAuthenticated
 from core.webApi.model.Api import Api
 
@@ -123,7 +123,7 @@ class DialogApi(Api):
 
 
 	def publishText(self, session: DialogSession) -> Response:
-		message = MQTTMessage()
+		message = MqttEnvelope()
 		message.payload = json.dumps({'sessionId': session.sessionId, 'siteId': session.deviceUid, 'text': session.input})
 		session.extend(message=message)
 
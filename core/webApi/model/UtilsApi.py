@@ -39,7 +39,7 @@ class UtilsApi(Api):
 	@ApiAuthenticated
 	def restart(self) -> Response:
 		try:
-			self.ThreadManager.doLater(interval=2, func=self.ProjectAlice.doRestart)
+			self.ThreadManager.doLaterInThread(interval=2, name='restart', func=self.ProjectAlice.doRestart)
 			return jsonify(success=True)
 		except Exception as e:
 			self.logError(f'Failed restarting Alice: {e}')
@@ -50,7 +50,7 @@ class UtilsApi(Api):
 	@ApiAuthenticated
 	def reboot(self) -> Response:
 		try:
-			self.ThreadManager.doLater(interval=2, func=self.Commons.runRootSystemCommand, args=[['shutdown', '-r', 'now']])
+			self.ThreadManager.doLaterInThread(interval=2, name='reboot', func=self.Commons.runRootSystemCommand, args=[['shutdown', '-r', 'now']])
 			return jsonify(success=True)
 		except Exception as e:
 			self.logError(f'Failed rebooting device: {e}')
@@ -172,7 +172,7 @@ class UtilsApi(Api):
 	def wipeAll(self) -> Response:
 		try:
 			self.ProjectAlice.wipeAll()
-			self.ThreadManager.doLater(interval=2, func=self.ProjectAlice.doRestart)
+			self.ThreadManager.doLaterInThread(interval=2, name='restart', func=self.ProjectAlice.doRestart)
 			return jsonify(success=True)
 		except Exception as e:
 			self.logError(f'Failed wiping system: {e}')
@@ -18,6 +18,17 @@
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
 import unittest
+from unittest.mock import MagicMock, patch
+
+from core.asr.model.Asr import Asr
+
+
+def newDialogSession(deviceUid: str = 'device') -> MagicMock:
+	session = MagicMock()
+	session.deviceUid = deviceUid
+	session.user = 'unittest'
+	return session
+
 
 
 class TestAsr(unittest.TestCase):
@@ -42,6 +53,67 @@ class TestAsr(unittest.TestCase):
 		pass # Nothing to test
 
 
+	@patch('core.base.SuperManager.SuperManager')
+	def test_new_session(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = False
+
+		asr = Asr()
+		asrSession = asr.newSession(newDialogSession())
+
+		self.assertIs(asrSession, asr.getSession('device'))
+		self.assertTrue(asrSession.recorder.isRecording)
+		mock_instance.asrManager.addRecorder.assert_called_once_with('device', asrSession.recorder)
+
+		# The session might wait for a free worker, that doesn't count towards its timeout
+		mock_instance.threadManager.newTimer.assert_not_called()
+		self.assertIsNone(asrSession.timeoutTimer)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_begin_decoding(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.side_effect = lambda name: 12 if name == 'asrTimeout' else False
+
+		asr = Asr()
+		asrSession = asr.newSession(newDialogSession())
+		asr.beginDecoding(asrSession)
+
+		mock_instance.threadManager.newTimer.assert_called_once_with(interval=12, func=asr.timeout, args=[asrSession])
+		self.assertIs(mock_instance.threadManager.newTimer.return_value, asrSession.timeoutTimer)
+
+
+	def test_get_session(self):
+		pass # Nothing to test
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_close_session(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = False
+
+		asr = Asr()
+		first = asr.newSession(newDialogSession())
+		asr.beginDecoding(first)
+		first.decoder = 'decoder'
+
+		# The device started listening again before the first session was done decoding
+		second = asr.newSession(newDialogSession())
+		asr.closeSession(first)
+
+		self.assertFalse(first.recorder.isRecording)
+		first.timeoutTimer.cancel.assert_called_once()
+		self.assertIsNone(first.decoder)
+		self.assertEqual('decoder', asr.acquireDecoder())
+		self.assertIs(second, asr.getSession('device'))
+
+		asr.closeSession(second)
+		self.assertIsNone(asr.getSession('device'))
+
+
 	def test_decode_stream(self):
 		pass # Nothing to test
 
@@ -54,6 +126,43 @@ class TestAsr(unittest.TestCase):
 		pass # Nothing to test
 
 
+	@patch('core.base.SuperManager.SuperManager')
+	def test_acquire_decoder(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+
+		asr = Asr()
+		created = iter(range(100))
+		asr.newDecoder = MagicMock(side_effect=lambda: next(created))
+
+		asr.releaseDecoder(next(created))
+		self.assertEqual(0, asr.acquireDecoder())
+		asr.newDecoder.assert_not_called()
+
+		# Every worker busy, the pool is exhausted and new decoders are made
+		decoders = [asr.acquireDecoder() for _ in range(Asr.MAX_SESSIONS)]
+		self.assertEqual(Asr.MAX_SESSIONS, asr.newDecoder.call_count)
+
+		for decoder in decoders:
+			asr.releaseDecoder(decoder)
+
+		self.assertEqual(decoders[-1], asr.acquireDecoder())
+		self.assertEqual(Asr.MAX_SESSIONS, asr.newDecoder.call_count)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_release_decoder(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+
+		asr = Asr()
+		for decoder in range(Asr.MAX_SESSIONS + 2):
+			asr.releaseDecoder(decoder)
+
+		# Decoders beyond what MAX_SESSIONS workers can use are let go
+		self.assertEqual(Asr.MAX_SESSIONS, asr._decoders.qsize())
+
+
 	def test_check_language(self):
 		pass # Nothing to test
 
@@ -62,5 +171,13 @@ class TestAsr(unittest.TestCase):
 		pass # Nothing to test
 
 
+	def test_new_endpointer(self):
+		pass  # To be implemented or nothing to test()
+
+
+	def test_new_streaming_decoder(self):
+		pass  # To be implemented or nothing to test()
+
+
 	def test_partial_text_captured(self):
 		pass # Nothing to test
@@ -0,0 +1,76 @@
+#  Copyright (c) 2021
+#
+#  This file, test_Endpointer.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+
+import unittest
+from unittest import mock
+
+from core.asr.model.Endpointer import Endpointer, VadEndpointer
+
+
+FRAME = b'\x00' * 640  # 20ms at 16kHz
+
+
+class TestEndpointer(unittest.TestCase):
+
+	def test_base_never_ends(self):
+		self.assertFalse(Endpointer().process(FRAME))
+
+
+	@mock.patch('core.asr.model.Endpointer.Vad')
+	def test_hangover(self, mock_vad):
+		speech = [False] * 10 + [True] * 5 + [False] * 10
+		mock_vad.return_value.is_speech.side_effect = speech
+		endpointer = VadEndpointer(hangover=200)
+
+		results = [endpointer.process(FRAME) for _ in speech]
+		self.assertEqual(results.index(True), 24)
+		self.assertTrue(endpointer.speaking)
+
+
+	@mock.patch('core.asr.model.Endpointer.Vad')
+	def test_silence_alone_never_ends(self, mock_vad):
+		mock_vad.return_value.is_speech.return_value = False
+		endpointer = VadEndpointer(hangover=100)
+
+		self.assertFalse(any(endpointer.process(FRAME) for _ in range(50)))
+
+
+	@mock.patch('core.asr.model.Endpointer.Vad')
+	def test_max_utterance(self, mock_vad):
+		mock_vad.return_value.is_speech.return_value = True
+		endpointer = VadEndpointer(maxUtterance=200)
+
+		results = [endpointer.process(FRAME) for _ in range(15)]
+		self.assertEqual(results.index(True), 9)
+
+
+	@mock.patch('core.asr.model.Endpointer.Vad')
+	def test_reblocks_chunks(self, mock_vad):
+		mock_vad.return_value.is_speech.return_value = False
+		endpointer = VadEndpointer()
+
+		endpointer.process(b'\x00' * 1000)
+		endpointer.process(b'\x00' * 280)
+		self.assertEqual(mock_vad.return_value.is_speech.call_count, 2)
+		self.assertTrue(all(len(call[0][0]) == 640 for call in mock_vad.return_value.is_speech.call_args_list))
+		endpointer.reset()
+		endpointer.process(b'\x00' * 639)
+		self.assertEqual(mock_vad.return_value.is_speech.call_count, 2)
@@ -17,7 +17,48 @@
 #
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
+import importlib
+import sys
 import unittest
+from unittest.mock import MagicMock, patch
+
+from core.asr.model.AsrSession import AsrSession
+from core.server.model.AudioFrame import AudioFrame
+
+
+def newAsr(decoder: MagicMock):
+	"""
+	pocketsphinx may not be installed to test. PocketSphinxAsr is imported against a mock
+	and forgotten right away, so that no other test gets to see it
+	"""
+	pocketsphinx = sys.modules.get('pocketsphinx')
+	sys.modules['pocketsphinx'] = MagicMock()
+	try:
+		asr = importlib.import_module('core.asr.model.PocketSphinxAsr').PocketSphinxAsr()
+	finally:
+		sys.modules.pop('core.asr.model.PocketSphinxAsr', None)
+		if pocketsphinx:
+			sys.modules['pocketsphinx'] = pocketsphinx
+		else:
+			sys.modules.pop('pocketsphinx', None)
+
+	asr.newDecoder = MagicMock(return_value=decoder)
+	return asr
+
+
+def newDecoder(inSpeech: list) -> MagicMock:
+	decoder = MagicMock()
+	decoder.get_in_speech.side_effect = inSpeech
+	decoder.hyp.return_value = MagicMock(hypstr=' hello alice ', prob=-100)
+	return decoder
+
+
+def newAsrSession(endpointer: MagicMock = None) -> AsrSession:
+	session = MagicMock()
+	session.deviceUid = 'device'
+	session.user = 'unittest'
+	return AsrSession(session, endpointer=endpointer)
+
 
 class TestPocketSphinxAsr(unittest.TestCase):
 
@@ -37,5 +78,67 @@ class TestPocketSphinxAsr(unittest.TestCase):
 		pass # Nothing to test
 
 
-	def test_decode_stream(self):
-		pass # Nothing to test
+	@patch('core.base.SuperManager.SuperManager')
+	def test_decode_stream(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = False
+
+		# Pocketsphinx detects the end of speech itself
+		decoder = newDecoder(inSpeech=[True, False])
+		asrSession = newAsrSession()
+		asrSession.recorder.startRecording()
+		asrSession.recorder.feedAudioFrame(AudioFrame(pcm=b'hello'), 'device')
+		asrSession.recorder.feedAudioFrame(AudioFrame(pcm=b'alice'), 'device')
+
+		result = newAsr(decoder).decodeStream(asrSession)
+		self.assertEqual('hello alice', result.text)
+		decoder.start_utt.assert_called_once()
+		decoder.end_utt.assert_called_once()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_decode_stream_ended_by_endpointer(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = False
+
+		endpointer = MagicMock()
+		endpointer.process.side_effect = lambda pcm: pcm == b'silence'
+
+		# The endpointer stops the recording while pocketsphinx still thinks the user talks
+		decoder = newDecoder(inSpeech=[True, True, True])
+		asrSession = newAsrSession(endpointer=endpointer)
+		asrSession.recorder.startRecording()
+		asrSession.recorder.feedAudioFrame(AudioFrame(pcm=b'hello'), 'device')
+		asrSession.recorder.feedAudioFrame(AudioFrame(pcm=b'silence'), 'device')
+		self.assertTrue(asrSession.endOfSpeech)
+
+		result = newAsr(decoder).decodeStream(asrSession)
+		self.assertEqual('hello alice', result.text)
+
+		# The utterance is closed, the decoder can start the next one once back in the pool
+		decoder.end_utt.assert_called_once()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_decode_stream_timeout(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = False
+
+		decoder = newDecoder(inSpeech=[True, True])
+		asr = newAsr(decoder)
+		asr.logWarning = MagicMock()
+		asrSession = newAsrSession()
+		asrSession.decoder = decoder
+		asrSession.recorder.startRecording()
+		asrSession.recorder.feedAudioFrame(AudioFrame(pcm=b'hello'), 'device')
+
+		# The timeout already closed the utterance, closing it again fails
+		asr.timeout(asrSession)
+		decoder.end_utt.side_effect = RuntimeError('Not in an utterance')
+
+		result = asr.decodeStream(asrSession)
+		self.assertEqual('hello alice', result.text)
+		self.assertEqual(2, decoder.end_utt.call_count)
@@ -18,6 +18,17 @@
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
 import unittest
+from unittest.mock import MagicMock, patch
+
+from core.asr.model.Recorder import Recorder
+from core.server.model.AudioFrame import AudioFrame
+
+
+def newRecorder(endpointer=None) -> Recorder:
+	timeoutFlag = MagicMock()
+	timeoutFlag.is_set.return_value = False
+	return Recorder(timeoutFlag=timeoutFlag, user='unittest', deviceUid='device', endpointer=endpointer)
+
 
 class TestRecorder(unittest.TestCase):
 
@@ -29,17 +40,93 @@ class TestRecorder(unittest.TestCase):
 		pass # Nothing to test
 
 
-	def test_start_recording(self):
-		pass # Nothing to test
+	def test_end_of_speech(self):
+		pass  # To be implemented or nothing to test()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_start_recording(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = False
+
+		endpointer = MagicMock()
+		endpointer.process.side_effect = lambda pcm: pcm == b'end'
+
+		recorder = newRecorder(endpointer)
+		recorder.startRecording()
+		endpointer.reset.assert_called_once()
+
+		recorder.feedAudioFrame(AudioFrame(pcm=b'hello'), 'device')
+		recorder.feedAudioFrame(AudioFrame(pcm=b'end'), 'device')
+		self.assertFalse(recorder.isRecording)
+		self.assertTrue(recorder.endOfSpeech)
+
+		# The decoding worker enters the recorder only after the user stopped talking
+		with recorder:
+			self.assertFalse(recorder.isRecording)
+			self.assertTrue(recorder.endOfSpeech)
+			self.assertEqual(b'helloend', b''.join(recorder))
+
+		endpointer.reset.assert_called_once()
 
 
 	def test_stop_recording(self):
 		pass # Nothing to test
 
 
-	def test_on_audio_frame(self):
-		pass # Nothing to test
+	@patch('core.base.SuperManager.SuperManager')
+	def test_feed_audio_frame(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = False
 
+		recorder = newRecorder()
+		recorder.startRecording()
+		stream = iter(recorder)
 
-	def test_audio_stream(self):
-		pass # Nothing to test
+		# A frame without samples doesn't end the recording
+		recorder.feedAudioFrame(AudioFrame(pcm=b''), 'device')
+		recorder.feedAudioFrame(AudioFrame(pcm=b'hello'), 'device')
+		self.assertEqual(b'hello', next(stream))
+		self.assertTrue(recorder.isRecording)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_iter(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = False
+
+		endpointer = MagicMock()
+		endpointer.process.side_effect = lambda pcm: pcm == b'end'
+
+		recorder = newRecorder(endpointer)
+		recorder.startRecording()
+		stream = iter(recorder)
+
+		recorder.feedAudioFrame(AudioFrame(pcm=b'one'), 'device')
+		self.assertEqual(b'one', next(stream))
+
+		# The endpointer fires while the decoding lags behind, queued chunks are still handed over
+		recorder.feedAudioFrame(AudioFrame(pcm=b'two'), 'device')
+		recorder.feedAudioFrame(AudioFrame(pcm=b'end'), 'device')
+		recorder.feedAudioFrame(AudioFrame(pcm=b'after'), 'device')
+		self.assertFalse(recorder.isRecording)
+		self.assertEqual([b'twoend'], list(stream))
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_audio_stream(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = False
+
+		recorder = newRecorder()
+		recorder.startRecording()
+		recorder.feedAudioFrame(AudioFrame(pcm=b'one'), 'device')
+		recorder.feedAudioFrame(AudioFrame(pcm=b'two'), 'device')
+		recorder.stopRecording()
+		recorder.feedAudioFrame(AudioFrame(pcm=b'after'), 'device')
+
+		self.assertEqual([b'onetwo'], list(recorder.audioStream()))
@@ -0,0 +1,75 @@
+#  Copyright (c) 2021
+#
+#  This file, test_StreamingDecoder.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+
+import unittest
+from unittest import mock
+
+from core.asr.model.StreamingDecoder import StreamingDecoder
+
+
+class TestStreamingDecoder(unittest.TestCase):
+
+	def test_coalesced_feeds(self):
+		feed = mock.MagicMock()
+		intermediate = mock.MagicMock(return_value='hello')
+		decoder = StreamingDecoder(feed=feed, intermediate=intermediate, finish=mock.MagicMock(), partialInterval=200)
+
+		results = [decoder.feed(b'\x00' * 640) for _ in range(10)]
+
+		# 10 frames of 20ms, fed by 100ms and decoded once 200ms were fed
+		self.assertEqual(feed.call_count, 2)
+		self.assertEqual(feed.call_args[0][0].size, 1600)
+		intermediate.assert_called_once()
+		self.assertEqual(results[-1], 'hello')
+		self.assertEqual(results[:-1], [None] * 9)
+
+
+	def test_stable(self):
+		intermediate = mock.MagicMock(side_effect=['hello', 'hello world', 'hello world', 'hello world'])
+		decoder = StreamingDecoder(feed=mock.MagicMock(), intermediate=intermediate, finish=mock.MagicMock(), stableDecodes=2)
+
+		self.assertEqual(decoder.decode(), 'hello')
+		self.assertEqual(decoder.decode(), 'hello world')
+		self.assertIsNone(decoder.decode())
+		self.assertFalse(decoder.stable)
+		self.assertIsNone(decoder.decode())
+		self.assertTrue(decoder.stable)
+
+
+	def test_never_stable_when_disabled(self):
+		decoder = StreamingDecoder(feed=mock.MagicMock(), intermediate=mock.MagicMock(return_value='hello'), finish=mock.MagicMock())
+		for _ in range(5):
+			decoder.decode()
+
+		self.assertFalse(decoder.stable)
+
+
+	def test_finish_flushes(self):
+		feed = mock.MagicMock()
+		finish = mock.MagicMock(return_value='hello world')
+		decoder = StreamingDecoder(feed=feed, intermediate=mock.MagicMock(), finish=finish)
+
+		decoder.feed(b'\x00' * 640)
+		feed.assert_not_called()
+
+		self.assertEqual(decoder.finish(), 'hello world')
+		feed.assert_called_once()
+		finish.assert_called_once()
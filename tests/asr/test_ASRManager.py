@@ -18,6 +18,9 @@
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
 import unittest
+from unittest.mock import MagicMock, patch
+
+from core.asr.ASRManager import ASRManager
 
 
 class TestASRManager(unittest.TestCase):
@@ -34,6 +37,10 @@ class TestASRManager(unittest.TestCase):
 		pass # Nothing to test
 
 
+	def test__start_decoder_pool(self):
+		pass # Nothing to test
+
+
 	def test_asr(self):
 		pass # Nothing to test
 
@@ -58,11 +65,24 @@ class TestASRManager(unittest.TestCase):
 		pass # Nothing to test
 
 
-	def test_decode_stream(self):
-		pass # Nothing to test
+	@patch('core.base.SuperManager.SuperManager')
+	def test_decode_stream(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+
+		manager = ASRManager()
+		manager._asr = asr = MagicMock()
+		asrSession = MagicMock()
+		asr.decodeStream.side_effect = Exception('decoding failed')
+
+		manager.decodeStream(asrSession)
+
+		# The timeout starts once the worker took the session, and the session is closed whatever happens
+		self.assertEqual(['beginDecoding', 'decodeStream', 'closeSession'], [call[0] for call in asr.method_calls])
+		mock_instance.mqttManager.endSession.assert_called_once_with(sessionId=asrSession.session.sessionId)
 
 
-	def test_on_audio_frame(self):
+	def test_feed_audio_frame(self):
 		pass # Nothing to test
 
 
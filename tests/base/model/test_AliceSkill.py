@@ -199,5 +199,43 @@ class TestAliceSkill(unittest.TestCase):
 		self.assertEqual(str(intent5), 'hermes/intent/intent5')
 
 
+	@mock.patch('core.base.SuperManager.SuperManager')
+	def testAudioFrameSubscriberDeprecation(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+
+
+		class LegacySkill(AliceSkill):
+
+			# noinspection PyMissingConstructor
+			def __init__(self):
+				self._name = 'LegacySkill'
+				self._databaseSchema = dict()
+				self.loadDeviceTypes = MagicMock()
+				self.loadWidgets = MagicMock()
+				self.loadScenarioNodes = MagicMock()
+				self.logInfo = MagicMock()
+				self.logWarning = MagicMock()
+
+
+			def onAudioFrame(self, frame, deviceUid: str):
+				pass
+
+
+		class SubscriberSkill(LegacySkill):
+			AUDIO_FRAME_SUBSCRIBER = True
+
+
+		legacy = LegacySkill()
+		legacy.onStart()
+		legacy.logWarning.assert_called_once()
+		mock_instance.audioManager.subscribeAudioFrames.assert_not_called()
+
+		subscriber = SubscriberSkill()
+		subscriber.onStart()
+		subscriber.logWarning.assert_not_called()
+		mock_instance.audioManager.subscribeAudioFrames.assert_called_once_with(deviceUid=None, callback=subscriber.onAudioFrame)
+
+
 if __name__ == '__main__':
 	unittest.main()
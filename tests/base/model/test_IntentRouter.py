@@ -0,0 +1,70 @@
+#  Copyright (c) 2021
+#
+#  This file, test_IntentRouter.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from paho.mqtt.client import topic_matches_sub
+
+from core.base.model.AliceSkill import AliceSkill
+from core.base.model.Intent import Intent
+from core.base.model.IntentRouter import IntentRouter
+
+
+class TestIntentRouter(TestCase):
+
+	@staticmethod
+	def skill(*intentNames: str, ownDispatch: bool = False) -> MagicMock:
+		skill = MagicMock()
+		skill.supportedIntents = {name: Intent(name, userIntent=False) for name in intentNames}
+		skill.handlesOwnDispatch.return_value = ownDispatch
+		skill.intentNameMoreSpecific = AliceSkill.intentNameMoreSpecific
+		return skill
+
+
+	def test_route(self):
+		skill1 = self.skill('hermes/intent/a', 'hermes/intent/b')
+		skill2 = self.skill('hermes/intent/+', 'hermes/intent/a')
+		skill3 = self.skill(ownDispatch=True)
+		skill4 = self.skill('hermes/#', '#')
+		router = IntentRouter([skill1, skill2, skill3, skill4])
+
+		routes = router.route('hermes/intent/a')
+		self.assertEqual([skill for skill, _ in routes], [skill1, skill2, skill3, skill4])
+		self.assertEqual(str(routes[0][1]), 'hermes/intent/a')
+		self.assertEqual(str(routes[1][1]), 'hermes/intent/a')
+		self.assertIsNone(routes[2][1])
+		self.assertEqual(str(routes[3][1]), 'hermes/#')
+
+		routes = router.route('hermes/intent/c')
+		self.assertEqual([skill for skill, _ in routes], [skill2, skill3, skill4])
+
+		routes = router.route('$SYS/broker')
+		self.assertEqual([skill for skill, _ in routes], [skill3])
+
+
+	def test_route_matches_mqtt(self):
+		subscriptions = ['a', 'a/b', 'a/+', 'a/#', '+/b', '#', 'a/+/c', '+', 'a/b/#', '+/+']
+		topics = ['a', 'a/b', 'a/', 'a/b/c', 'b/b', 'a/x/c', '$SYS/b', 'x']
+		router = IntentRouter([self.skill(subscription) for subscription in subscriptions])
+
+		for topic in topics:
+			expected = [subscription for subscription in subscriptions if topic_matches_sub(subscription, topic)]
+			self.assertEqual([str(intent) for _, intent in router.route(topic)], expected, topic)
@@ -19,6 +19,8 @@
 
 from unittest import TestCase
 
+from core.base.model.ProjectAliceObject import ProjectAliceObject
+
 
 class TestProjectAliceObject(TestCase):
 
@@ -26,6 +28,25 @@ class TestProjectAliceObject(TestCase):
 		pass  # To be implemented or nothing to test
 
 
+	def test_is_subscribed_to(self):
+		class Subscriber(ProjectAliceObject):
+
+			def onHotword(self, deviceUid: str, user: str = ''):
+				pass
+
+
+			def onCustomEvent(self):
+				pass
+
+
+		subscriber = Subscriber()
+		self.assertTrue(subscriber.isSubscribedTo('onHotword'))
+		self.assertTrue(subscriber.isSubscribedTo('onCustomEvent'))
+		self.assertFalse(subscriber.isSubscribedTo('onWakeword'))
+		self.assertFalse(subscriber.isSubscribedTo('onUnknownEvent'))
+		self.assertFalse(ProjectAliceObject().isSubscribedTo('onHotword'))
+
+
 	def test_check_dependencies(self):
 		pass  # To be implemented or nothing to test
 
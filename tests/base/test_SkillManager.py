@@ -17,7 +17,13 @@
 #
 #  Last modified: 2021.04.13 at 12:56:50 CEST
 
+import json
+import tempfile
+from pathlib import Path
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.base.SkillManager import SkillManager
 
 
 class TestSkillManager(TestCase):
@@ -200,3 +206,58 @@ class TestSkillManager(TestCase):
 
 	def test_download_install_ticket(self):
 		pass  # To be implemented or nothing to test()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_reset_skill_caches(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'SkillManager'
+
+		skillManager = SkillManager()
+		skill = MagicMock()
+		skill.name = 'Skill'
+		skill.isSubscribedTo.side_effect = lambda method: method == 'onFullMinute'
+
+		def instantiateSkill(skillName: str, reload: bool = False):
+			# A broadcast while the skills are loading
+			self.assertEqual(skillManager.getSkillEventSubscribers('onFullMinute'), list())
+			return skill
+
+		with tempfile.TemporaryDirectory() as tempDir:
+			installFile = Path(tempDir, 'Skill.install')
+			installFile.write_text(json.dumps({'name': 'Skill'}))
+
+			skillManager._skillList = ['Skill']
+			with patch.object(skillManager, 'getSkillInstallFilePath', return_value=installFile), \
+					patch.object(skillManager, 'isSkillActive', return_value=True), \
+					patch.object(skillManager, 'checkSkillConditions'), \
+					patch.object(skillManager, 'instantiateSkill', side_effect=instantiateSkill):
+				skillManager.initSkills()
+
+		self.assertEqual(skillManager.getSkillEventSubscribers('onFullMinute'), [('Skill', skill, True, False)])
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_get_skill_event_subscribers(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'SkillManager'
+
+		skillManager = SkillManager()
+		skill = MagicMock()
+
+		def isSubscribedTo(method: str) -> bool:
+			# The active skills change while the table is being resolved
+			skillManager.resetSkillCaches()
+			return method == 'onFullMinute'
+
+		skill.isSubscribedTo.side_effect = isSubscribedTo
+		skillManager._activeSkills = {'Skill': skill}
+
+		self.assertEqual(len(skillManager.getSkillEventSubscribers('onFullMinute')), 1)
+		self.assertNotIn('onFullMinute', skillManager._skillEventSubscribers)
+
+
+	def test_intent_router(self):
+		pass  # To be implemented or nothing to test()
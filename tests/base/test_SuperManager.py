@@ -50,5 +50,13 @@ class TestSuperManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
+	def test_build_event_subscribers(self):
+		pass  # To be implemented or nothing to test()
+
+
+	def test_get_event_subscribers(self):
+		pass  # To be implemented or nothing to test()
+
+
 	def test_managers(self):
 		pass  # To be implemented or nothing to test()
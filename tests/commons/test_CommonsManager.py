@@ -31,6 +31,13 @@ class TestCommonsManager(unittest.TestCase):
 		self.assertEqual(CommonsManager.getFunctionCaller(1), 'test_CommonsManager')
 
 
+	def test_getCallerModules(self):
+		callers = CommonsManager.getCallerModules()
+		self.assertEqual(next(callers), 'test_CommonsManager')
+		self.assertIn('case', callers)
+		self.assertEqual(CommonsManager._MODULE_NAMES[__file__], 'test_CommonsManager')
+
+
 	@mock.patch('core.commons.CommonsManager.CommonsManager.LanguageManager')
 	def test_isEqualTranslated(self, mock_LanguageManager):
 		commonsManager = CommonsManager()
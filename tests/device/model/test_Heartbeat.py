@@ -17,11 +17,58 @@
 #
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
+import json
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.commons import constants
+from core.device.model.Heartbeat import Heartbeat
+
+
+def newDevice(uid: str, heartbeatRate: int = 5) -> MagicMock:
+	device = MagicMock()
+	device.uid = uid
+	device.deviceType.heartbeatRate = heartbeatRate
+	return device
 
 
 class TestHeartbeat(TestCase):
 
+	@patch('core.base.SuperManager.SuperManager')
+	def test_add_device(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+
+		heartbeat = Heartbeat()
+		heartbeat.addDevice(newDevice('main', heartbeatRate=5))
+		heartbeat.addDevice(newDevice('other'), tempo=2, topic='custom/topic')
+
+		self.assertEqual((5, constants.TOPIC_CORE_HEARTBEAT, json.dumps({'uid': 'main'})), heartbeat._beats['main'])
+		self.assertEqual((2, 'custom/topic', json.dumps({'uid': 'other'})), heartbeat._beats['other'])
+		self.assertEqual(['main', 'other'], sorted(uid for _, uid in heartbeat._schedule))
+		self.assertTrue(heartbeat._wakeup.is_set())
+
+		# Adding a device again updates its beat without scheduling it twice
+		heartbeat.addDevice(newDevice('main'), tempo=1)
+		self.assertEqual(1, heartbeat._beats['main'][0])
+		self.assertEqual(2, len(heartbeat._schedule))
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_remove_device(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+
+		heartbeat = Heartbeat()
+		heartbeat.addDevice(newDevice('main'))
+		heartbeat.addDevice(newDevice('other'))
+		heartbeat.removeDevice('main')
+		heartbeat.removeDevice('unknown')
+
+		self.assertEqual(['other'], list(heartbeat._beats))
+		self.assertEqual(['other'], [uid for _, uid in heartbeat._schedule])
+
+
 	def test_start_heartbeat(self):
 		pass  # To be implemented or nothing to test()
 
@@ -30,9 +77,38 @@ class TestHeartbeat(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_thread(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.base.SuperManager.SuperManager')
+	def test_thread(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.projectAlice.shuttingDown = False
 
+		heartbeat = Heartbeat()
+		heartbeat.addDevice(newDevice('main'), tempo=5)
+		heartbeat.addDevice(newDevice('other'), tempo=10)
 
-	def test_beat(self):
-		pass  # To be implemented or nothing to test()
+		timeouts = list()
+
+		def wait(timeout):
+			timeouts.append(timeout)
+			heartbeat._running = False
+
+		heartbeat._wakeup = MagicMock()
+		heartbeat._wakeup.wait.side_effect = wait
+		heartbeat._running = True
+		heartbeat.thread()
+
+		# Both devices were due, one publish each, then sleeps until the next beat
+		self.assertEqual(['main', 'other'], sorted(json.loads(call[1]['payload'])['uid'] for call in mock_instance.mqttManager.publish.call_args_list))
+		self.assertEqual(1, len(timeouts))
+		self.assertGreater(timeouts[0], 4)
+		self.assertLessEqual(timeouts[0], 5)
+		self.assertEqual(2, len(heartbeat._schedule))
+
+		# Nothing goes out while shutting down
+		mock_instance.mqttManager.publish.reset_mock()
+		mock_instance.projectAlice.shuttingDown = True
+		heartbeat._schedule = [(0, 'main')]
+		heartbeat._running = True
+		heartbeat.thread()
+		mock_instance.mqttManager.publish.assert_not_called()
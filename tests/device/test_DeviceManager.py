@@ -17,11 +17,67 @@
 #
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
+import heapq
+import threading
+import time
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.commons import constants
+from core.device.DeviceManager import DeviceManager
+from core.device.model.DeviceAbility import DeviceAbility
+
+
+def newDevice(uid: str, heartbeatRate: int = 5, deviceId: int = 0, location: int = 1, abilities: int = 0, deviceType=None) -> MagicMock:
+	device = MagicMock()
+	device.id = deviceId
+	device.uid = uid
+	device.heartbeatRate = heartbeatRate
+	device.connected = True
+	device.parentLocation = location
+	device.skillName = 'AliceCore'
+	device.deviceTypeName = deviceType.deviceTypeName if deviceType else 'Lamp'
+	# Devices without abilities of their own have their type's
+	device.getAbilities.side_effect = lambda: abilities or (deviceType.abilities if deviceType else 0)
+	return device
+
+
+def newLink(linkId: int, deviceId: int, targetLocation: int) -> MagicMock:
+	link = MagicMock()
+	link.id = linkId
+	link.deviceId = deviceId
+	link.targetLocation = targetLocation
+	return link
+
+
+def newManager(*devices) -> DeviceManager:
+	manager = DeviceManager()
+	manager._loadingDone.set()
+	for device in devices:
+		manager._devicesByUid[device.uid] = device
+	return manager
 
 
 class TestDeviceManager(TestCase):
 
+	def assertIndexesConsistent(self, manager: DeviceManager):
+		"""
+		Every index holds exactly the registered devices, under their current keys, and no empty bucket
+		"""
+		byLocation, byType, byAbility = dict(), dict(), dict()
+		for device in manager._devices.values():
+			byLocation.setdefault(device.parentLocation, dict())[device.id] = device
+			byType.setdefault((device.skillName.lower(), device.deviceTypeName.lower()), dict())[device.id] = device
+			for bit in DeviceManager.abilityBits(device.getAbilities()):
+				byAbility.setdefault(bit, dict())[device.id] = device
+
+		self.assertEqual({str(device.uid): device for device in manager._devices.values()}, manager._devicesByUid)
+		self.assertEqual(byLocation, manager._devicesByLocation)
+		self.assertEqual(byType, manager._devicesByType)
+		self.assertEqual(byAbility, manager._devicesByAbility)
+		self.assertEqual(set(manager._devices), set(manager._deviceIndexKeys))
+
+
 	def test_on_start(self):
 		pass  # To be implemented or nothing to test()
 
@@ -142,8 +198,135 @@ class TestDeviceManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_check_heartbeats(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.base.SuperManager.SuperManager')
+	def test_check_heartbeats(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'DeviceManager'
+
+		alive, silent = newDevice('alive'), newDevice('silent')
+		manager = newManager(alive, silent)
+		now = time.time()
+
+		# Alive signaled since its entry was queued, silent did not, gone is no longer known
+		manager._heartbeats = {'alive': now - 1, 'silent': now - 20, 'gone': now - 20}
+		manager._heartbeatTracked = {'alive', 'silent', 'gone'}
+		manager._heartbeatExpiries = [(now - 10, 'alive'), (now - 10, 'silent'), (now - 10, 'gone')]
+		heapq.heapify(manager._heartbeatExpiries)
+
+		manager.checkHeartbeats()
+
+		self.assertEqual([(now - 1 + 10, 'alive')], manager._heartbeatExpiries)
+		self.assertEqual({'alive'}, manager._heartbeatTracked)
+		self.assertEqual({'alive'}, set(manager._heartbeats))
+		self.assertTrue(alive.connected)
+		self.assertFalse(silent.connected)
+		mock_instance.mqttManager.publish.assert_called_once_with(constants.TOPIC_DEVICE_UPDATED, payload={'device': silent.toDict()})
+		self.assertEqual(now - 1 + 10, manager._heartbeatsCheckDeadline)
+
+		# A device that was disconnected is tracked again once it signals
+		manager.registerHeartbeat(silent)
+		self.assertIn('silent', manager._heartbeatTracked)
+		self.assertEqual(2, len(manager._heartbeatExpiries))
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_check_heartbeats_while_loading(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'DeviceManager'
+
+		device = newDevice('device')
+		manager = newManager()
+		now = time.time()
+		manager._heartbeats = {'device': now - 20}
+		manager._heartbeatTracked = {'device'}
+		manager._heartbeatExpiries = [(now - 10, 'device')]
+
+		# The devices are still loading, resolving the due one waits
+		resolving = threading.Event()
+		loaded = threading.Event()
+
+		def getDevice(uid: str):
+			resolving.set()
+			loaded.wait(timeout=5)
+			return device
+
+		manager.getDevice = getDevice
+		check = threading.Thread(target=manager.checkHeartbeats)
+		check.start()
+		self.assertTrue(resolving.wait(timeout=2))
+
+		# Heartbeats are not held meanwhile, and the one received counts
+		registering = threading.Thread(target=manager.registerHeartbeat, args=[device])
+		registering.start()
+		registering.join(timeout=1)
+		self.assertFalse(registering.is_alive())
+
+		loaded.set()
+		check.join(timeout=2)
+		self.assertFalse(check.is_alive())
+		self.assertTrue(device.connected)
+		self.assertEqual({'device'}, manager._heartbeatTracked)
+		self.assertEqual(1, len(manager._heartbeatExpiries))
+		mock_instance.mqttManager.publish.assert_not_called()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_schedule_heartbeats_check(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'DeviceManager'
+
+		timer = MagicMock()
+		timer.is_alive.return_value = True
+		mock_instance.threadManager.newTimer.return_value = timer
+		manager = newManager()
+		now = time.time()
+
+		manager.scheduleHeartbeatsCheck(now + 10)
+		mock_instance.threadManager.newTimer.assert_called_once()
+
+		# A check already runs earlier
+		manager.scheduleHeartbeatsCheck(now + 20)
+		mock_instance.threadManager.newTimer.assert_called_once()
+		timer.cancel.assert_not_called()
+
+		manager.scheduleHeartbeatsCheck(now + 5)
+		timer.cancel.assert_called_once()
+		self.assertEqual(2, mock_instance.threadManager.newTimer.call_count)
+		self.assertEqual(now + 5, manager._heartbeatsCheckDeadline)
+		self.assertLessEqual(mock_instance.threadManager.newTimer.call_args[1]['interval'], 5)
+
+		# Past deadlines are checked right away
+		timer.is_alive.return_value = False
+		manager.scheduleHeartbeatsCheck(now - 5)
+		self.assertEqual(0, mock_instance.threadManager.newTimer.call_args[1]['interval'])
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_register_heartbeat(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'DeviceManager'
+
+		timer = MagicMock()
+		timer.is_alive.return_value = True
+		mock_instance.threadManager.newTimer.return_value = timer
+		device = newDevice('device', heartbeatRate=5)
+		manager = newManager(device)
+
+		manager.registerHeartbeat(device)
+		first = manager._heartbeats['device']
+		self.assertEqual(1, len(manager._heartbeatExpiries))
+		self.assertAlmostEqual(first + 10, manager._heartbeatExpiries[0][0])
+		mock_instance.threadManager.newTimer.assert_called_once()
+
+		# Signaling again only notes the time, the queued expiry is checked against it when due
+		manager.registerHeartbeat(device)
+		self.assertGreaterEqual(manager._heartbeats['device'], first)
+		self.assertEqual([(first + 10, 'device')], manager._heartbeatExpiries)
+		mock_instance.threadManager.newTimer.assert_called_once()
 
 
 	def test_get_device_type_by_skill_raw(self):
@@ -224,3 +407,172 @@ class TestDeviceManager(TestCase):
 
 	def test_site_id_to_device_name(self):
 		pass  # To be implemented or nothing to test()
+
+
+	def test_get_device(self):
+		pass  # To be implemented or nothing to test()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_index_device(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'DeviceManager'
+
+		manager = newManager()
+		core = newDevice('core', deviceId=1, location=1, abilities=DeviceAbility.IS_CORE | DeviceAbility.PLAY_SOUND)
+		satellite = newDevice('satellite', deviceId=2, location=2, abilities=DeviceAbility.IS_SATELITTE | DeviceAbility.PLAY_SOUND)
+		manager.indexDevice(core)
+		manager.indexDevice(satellite)
+
+		self.assertIndexesConsistent(manager)
+		self.assertIs(satellite, manager.getDevice(uid='satellite'))
+		self.assertEqual({1: core, 2: satellite}, manager._devicesByAbility[DeviceAbility.PLAY_SOUND.value])
+
+		# Indexing again refreshes the entries, the old ones don't linger
+		satellite.parentLocation = 3
+		satellite.uid = 'moved'
+		manager.indexDevice(satellite)
+
+		self.assertIndexesConsistent(manager)
+		self.assertNotIn(2, manager._devicesByLocation)
+		self.assertIsNone(manager.getDevice(uid='satellite'))
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_unindex_device(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'DeviceManager'
+
+		manager = newManager()
+		first = newDevice('device', deviceId=1, abilities=DeviceAbility.IS_CORE)
+		second = newDevice('other', deviceId=2, abilities=DeviceAbility.IS_SATELITTE)
+		manager.indexDevice(first)
+		manager.indexDevice(second)
+
+		manager.unindexDevice(first)
+		manager.unindexDevice(first)
+		self.assertIndexesConsistent(manager)
+		self.assertNotIn(DeviceAbility.IS_CORE.value, manager._devicesByAbility)
+
+		# A device that took over the uid keeps it
+		third = newDevice('other', deviceId=3)
+		manager.indexDevice(third)
+		manager.unindexDevice(second)
+		self.assertIs(third, manager._devicesByUid['other'])
+		self.assertEqual({3: third}, manager._devices)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_reindex_device(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'DeviceManager'
+
+		manager = newManager()
+		device = newDevice('device', deviceId=1, abilities=DeviceAbility.IS_CORE)
+
+		# Devices being created aren't registered yet
+		manager.reindexDevice(device)
+		self.assertFalse(manager._devices)
+
+		manager.indexDevice(device)
+		device.getAbilities.side_effect = lambda: DeviceAbility.DISPLAY.value
+		manager.reindexDevice(device)
+
+		self.assertIndexesConsistent(manager)
+		self.assertEqual([device], manager.getDevicesWithAbilities([DeviceAbility.DISPLAY]))
+		self.assertEqual(list(), manager.getDevicesWithAbilities([DeviceAbility.IS_CORE]))
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_reindex_device_type(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'DeviceManager'
+
+		manager = newManager()
+		mock_instance.deviceManager = manager
+		manager.registerDeviceType('AliceCore', {'deviceTypeName': 'Speaker', 'abilities': [DeviceAbility.PLAY_SOUND]})
+		deviceType = manager._deviceTypes['alicecore']['speaker']
+
+		inheriting = newDevice('inheriting', deviceId=1, deviceType=deviceType)
+		own = newDevice('own', deviceId=2, abilities=DeviceAbility.DISPLAY, deviceType=deviceType)
+		other = newDevice('other', deviceId=3, abilities=DeviceAbility.PLAY_SOUND)
+		for device in (inheriting, own, other):
+			manager.indexDevice(device)
+
+		# The skill got updated, its speakers can now capture sound too
+		manager.registerDeviceType('AliceCore', {'deviceTypeName': 'Speaker', 'abilities': [DeviceAbility.PLAY_SOUND, DeviceAbility.CAPTURE_SOUND]})
+
+		self.assertIs(deviceType, manager._deviceTypes['alicecore']['speaker'])
+		self.assertIndexesConsistent(manager)
+		self.assertEqual({1: inheriting}, manager._devicesByAbility[DeviceAbility.CAPTURE_SOUND.value])
+		self.assertEqual({1: inheriting, 3: other}, manager._devicesByAbility[DeviceAbility.PLAY_SOUND.value])
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_index_link(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'DeviceManager'
+
+		manager = newManager()
+		kitchen = newLink(1, deviceId=1, targetLocation=10)
+		livingRoom = newLink(2, deviceId=1, targetLocation=20)
+		manager.indexLink(kitchen)
+		manager.indexLink(livingRoom)
+
+		self.assertEqual({1: kitchen, 2: livingRoom}, manager._linksByDevice[1])
+		self.assertEqual({1: kitchen}, manager._linksByLocation[10])
+		self.assertEqual({1: kitchen, 2: livingRoom}, manager._deviceLinks)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_unindex_link(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'DeviceManager'
+
+		manager = newManager()
+		manager.indexLink(newLink(1, deviceId=1, targetLocation=10))
+		manager.unindexLink(1)
+		manager.unindexLink(1)
+
+		self.assertEqual(dict(), manager._deviceLinks)
+		self.assertEqual(dict(), manager._linksByDevice)
+		self.assertEqual(dict(), manager._linksByLocation)
+		self.assertEqual(dict(), manager._linkIndexKeys)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_reindex_link(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'DeviceManager'
+
+		manager = newManager()
+		link = newLink(1, deviceId=1, targetLocation=10)
+		manager.reindexLink(link)
+		self.assertFalse(manager._deviceLinks)
+
+		manager.indexLink(link)
+		link.targetLocation = 20
+		manager.reindexLink(link)
+
+		self.assertEqual({20: {1: link}}, manager._linksByLocation)
+		self.assertEqual({1: {1: link}}, manager._linksByDevice)
+
+
+	def test_get_device_link(self):
+		pass  # To be implemented or nothing to test()
+
+
+	def test_ability_bits(self):
+		self.assertEqual(DeviceManager.abilityBits(0), list())
+		self.assertEqual(DeviceManager.abilityBits(DeviceAbility.IS_CORE.value), [DeviceAbility.IS_CORE.value])
+		self.assertEqual(
+			DeviceManager.abilityBits(DeviceAbility.IS_CORE | DeviceAbility.PLAY_SOUND | DeviceAbility.NOTIFY),
+			[DeviceAbility.IS_CORE.value, DeviceAbility.PLAY_SOUND.value, DeviceAbility.NOTIFY.value]
+		)
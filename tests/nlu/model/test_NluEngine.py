@@ -30,9 +30,17 @@ class TestNluEngine(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
+	def test_reload(self):
+		pass  # To be implemented or nothing to test()
+
+
 	def test_train(self):
 		pass  # To be implemented or nothing to test()
 
 
+	def test_clear_engine_cache(self):
+		pass  # To be implemented or nothing to test()
+
+
 	def test_convert_dialog_template(self):
 		pass  # To be implemented or nothing to test()
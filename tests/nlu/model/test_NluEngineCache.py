@@ -0,0 +1,118 @@
+#  Copyright (c) 2021
+#
+#  This file, test_NluEngineCache.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from core.nlu.model.NluEngineCache import NluEngineCache
+
+
+def newEngine(root: Path, content: str) -> Path:
+	engine = root / 'trained' / content
+	engine.mkdir(parents=True)
+	(engine / 'model.json').write_text(content)
+	return engine
+
+
+class TestNluEngineCache(unittest.TestCase):
+
+	def test_fingerprint(self):
+		first = {'language': 'en', 'intents': {'a': 1, 'b': 2}}
+		second = {'intents': {'b': 2, 'a': 1}, 'language': 'en'}
+		self.assertEqual(NluEngineCache.fingerprint(first), NluEngineCache.fingerprint(second))
+		self.assertNotEqual(NluEngineCache.fingerprint(first), NluEngineCache.fingerprint({'language': 'de', 'intents': {'a': 1, 'b': 2}}))
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_store_restore(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = 2
+
+		with tempfile.TemporaryDirectory() as tempDir:
+			root = Path(tempDir)
+			cache = NluEngineCache(root / 'engines')
+
+			cache.store('abc', newEngine(root, 'abc'))
+			self.assertTrue(cache.contains('abc'))
+
+			destination = newEngine(root, 'current')
+			self.assertTrue(cache.restore('abc', destination))
+			self.assertEqual((destination / 'model.json').read_text(), 'abc')
+			self.assertFalse(destination.with_name('current.tmp').exists())
+
+			self.assertFalse(cache.restore('unknown', destination))
+			self.assertEqual((destination / 'model.json').read_text(), 'abc')
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_evict(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = 2
+
+		with tempfile.TemporaryDirectory() as tempDir:
+			root = Path(tempDir)
+			cache = NluEngineCache(root / 'engines')
+
+			for index, fingerprint in enumerate(['a', 'b', 'c']):
+				cache.store(fingerprint, newEngine(root, fingerprint))
+				os.utime(cache.path(fingerprint), (index, index))
+
+			cache.evict()
+			self.assertFalse(cache.contains('a'))
+			self.assertTrue(cache.contains('b'))
+			self.assertTrue(cache.contains('c'))
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_active(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = 2
+
+		with tempfile.TemporaryDirectory() as tempDir:
+			cache = NluEngineCache(Path(tempDir, 'engines'))
+
+			self.assertIsNone(cache.active('en'))
+			cache.setActive('en', 'abc')
+			cache.setActive('de', 'def')
+			self.assertEqual(cache.active('en'), 'abc')
+
+			cache.setActive('en', None)
+			self.assertIsNone(cache.active('en'))
+			self.assertEqual(cache.active('de'), 'def')
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_clear(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.configManager.getAliceConfigByName.return_value = 2
+
+		with tempfile.TemporaryDirectory() as tempDir:
+			root = Path(tempDir)
+			cache = NluEngineCache(root / 'engines')
+
+			cache.store('abc', newEngine(root, 'abc'))
+			cache.clear()
+			self.assertFalse(cache.contains('abc'))
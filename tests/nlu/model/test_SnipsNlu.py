@@ -17,7 +17,20 @@
 #
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
+import json
+import tempfile
+import threading
+from pathlib import Path
 from unittest import TestCase
+from unittest.mock import MagicMock, PropertyMock, patch
+
+from core.commons import constants
+from core.nlu.model.SnipsNlu import SnipsNlu
+
+
+def newNlu(mock_instance: MagicMock) -> SnipsNlu:
+	mock_instance.commonsManager.rootDir.return_value = tempfile.gettempdir()
+	return SnipsNlu()
 
 
 class TestSnipsNlu(TestCase):
@@ -26,22 +39,104 @@ class TestSnipsNlu(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_stop(self):
+	@patch('core.base.SuperManager.SuperManager')
+	def test_stop(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		nlu = newNlu(mock_instance)
+		probing = threading.Event()
+
+		def probe(answers: int, timeout: float, cancel: threading.Event) -> bool:
+			probing.set()
+			cancel.wait(timeout=5)
+			return False
+
+		mock_instance.nluManager.probe.side_effect = probe
+		nlu.start()
+		swap = threading.Thread(target=nlu._swapProcesses)
+		swap.start()
+		self.assertTrue(probing.wait(timeout=2))
+		self.assertTrue(nlu.swapping)
+
+		# Stopping doesn't wait on the readiness probe, the swap is abandoned
+		nlu.stop()
+		swap.join(timeout=2)
+
+		self.assertFalse(swap.is_alive())
+		self.assertFalse(nlu.swapping)
+		self.assertEqual([SnipsNlu.SLOTS[1], SnipsNlu.SLOTS[0]], [call[1]['name'] for call in mock_instance.subprocessManager.terminateSubprocess.call_args_list])
+
+
+	def test_reload(self):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_convert_dialog_template(self):
+	@patch('core.base.SuperManager.SuperManager')
+	def test_swap_processes(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		nlu = newNlu(mock_instance)
+		subprocessManager = mock_instance.subprocessManager
+
+		nlu.start()
+		subprocessManager.runSubprocess.assert_called_once()
+		self.assertEqual(subprocessManager.runSubprocess.call_args[1]['name'], SnipsNlu.SLOTS[0])
+
+		mock_instance.nluManager.probe.return_value = True
+		nlu._swapProcesses()
+		self.assertEqual(subprocessManager.runSubprocess.call_args[1]['name'], SnipsNlu.SLOTS[1])
+		subprocessManager.terminateSubprocess.assert_called_once_with(name=SnipsNlu.SLOTS[0])
+
+		nlu.stop()
+		subprocessManager.terminateSubprocess.assert_called_with(name=SnipsNlu.SLOTS[1])
+
+
+	def test_run_process(self):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_train(self):
+	def test_convert_dialog_template(self):
 		pass  # To be implemented or nothing to test()
 
 
+	@patch('core.base.SuperManager.SuperManager')
+	def test_train(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.languageManager.activeLanguage = 'en'
+		mock_instance.nluManager.training = False
+
+		nlu = newNlu(mock_instance)
+		nlu.broadcast = MagicMock()
+		nlu._engineCache = MagicMock()
+		nlu._engineCache.fingerprint.return_value = 'fingerprint'
+		nlu._engineCache.active.return_value = 'fingerprint'
+
+		with tempfile.TemporaryDirectory() as tempDir, patch.object(SnipsNlu, 'enginePath', new_callable=PropertyMock, return_value=Path(tempDir)):
+			nlu._cachePath = Path(tempDir)
+			Path(tempDir, 'en.json').write_text(json.dumps({'entities': dict(), 'intents': dict()}))
+			nlu.train()
+
+		# The dataset didn't change, the running engine is kept but the training is still announced as done
+		mock_instance.nluManager.reloadEngine.assert_not_called()
+		mock_instance.webUINotificationManager.newNotification.assert_called_once()
+		nlu.broadcast.assert_called_once()
+		self.assertEqual(constants.EVENT_NLU_TRAINED, nlu.broadcast.call_args[1]['method'])
+		self.assertFalse(mock_instance.nluManager.training)
+
+
 	def test_nlu_training_thread(self):
 		pass  # To be implemented or nothing to test()
 
 
+	def test_training_done(self):
+		pass  # To be implemented or nothing to test()
+
+
+	def test_clear_engine_cache(self):
+		pass  # To be implemented or nothing to test()
+
+
 	def test_training_status(self):
 		pass  # To be implemented or nothing to test()
 
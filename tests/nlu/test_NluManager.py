@@ -17,7 +17,18 @@
 #
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
+import tempfile
+import threading
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.nlu.NluManager import NluManager
+
+
+def newManager(mock_instance: MagicMock) -> NluManager:
+	mock_instance.commonsManager.rootDir.return_value = tempfile.gettempdir()
+	mock_instance.commonsManager.payload.side_effect = lambda message: message
+	return NluManager()
 
 
 class TestNluManager(TestCase):
@@ -56,3 +67,69 @@ class TestNluManager(TestCase):
 
 	def test_clear_cache(self):
 		pass  # To be implemented or nothing to test()
+
+
+	def test_restart_engine(self):
+		pass  # To be implemented or nothing to test()
+
+
+	def test_reload_engine(self):
+		pass  # To be implemented or nothing to test()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_accept_response(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		manager = newManager(mock_instance)
+
+		self.assertTrue(manager.acceptResponse({'input': 'no id'}))
+		self.assertTrue(manager.acceptResponse({'input': 'no id'}))
+
+		self.assertTrue(manager.acceptResponse({'id': 'query'}))
+		self.assertFalse(manager.acceptResponse({'id': 'query'}))
+		self.assertTrue(manager.acceptResponse({'id': 'other'}))
+
+		# Both processes answer queries sent without an id while the engine is swapped
+		manager._nluEngine = MagicMock(swapping=True)
+		self.assertTrue(manager.acceptResponse({'sessionId': 'session', 'input': 'no id'}))
+		self.assertFalse(manager.acceptResponse({'sessionId': 'session', 'input': 'no id'}))
+		self.assertTrue(manager.acceptResponse({'sessionId': 'session', 'input': 'another'}))
+		self.assertTrue(manager.acceptResponse({'sessionId': 'other', 'input': 'no id'}))
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_is_probe(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		manager = newManager(mock_instance)
+
+		self.assertTrue(manager.isProbe({'id': f'{NluManager.PROBE_PREFIX}abc'}))
+		self.assertFalse(manager.isProbe({'id': 'abc'}))
+		self.assertFalse(manager.isProbe(dict()))
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_probe(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		manager = newManager(mock_instance)
+
+		def answer(times: int):
+			def publish(topic: str, payload: dict):
+				for _ in range(times):
+					self.assertFalse(manager.acceptResponse({'id': payload['id']}))
+			return publish
+
+		mock_instance.mqttManager.publish.side_effect = answer(2)
+		self.assertTrue(manager.probe(answers=2, timeout=1))
+
+		mock_instance.mqttManager.publish.side_effect = answer(1)
+		self.assertFalse(manager.probe(answers=2, timeout=0.1))
+		self.assertFalse(manager._probes)
+
+		cancel = threading.Event()
+		cancel.set()
+		mock_instance.mqttManager.publish.reset_mock()
+		self.assertFalse(manager.probe(answers=2, timeout=1, cancel=cancel))
+		mock_instance.mqttManager.publish.assert_not_called()
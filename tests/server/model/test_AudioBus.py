@@ -0,0 +1,85 @@
+#  Copyright (c) 2021
+#
+#  This file, test_AudioBus.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+
+import unittest
+from unittest import mock
+
+from core.server.model.AudioBus import AudioBus
+from core.server.model.AudioFrame import AudioFrame
+
+
+class TestAudioBus(unittest.TestCase):
+
+	def test_publish(self):
+		bus = AudioBus()
+		everything = mock.MagicMock()
+		kitchenOnly = mock.MagicMock()
+		bus.subscribe(None, everything)
+		bus.subscribe('kitchen', kitchenOnly)
+
+		frame = AudioFrame(pcm=b'\x00\x01')
+		bus.publish(frame, 'kitchen')
+		bus.publish(frame, 'bathroom')
+
+		self.assertEqual(everything.call_count, 2)
+		kitchenOnly.assert_called_once_with(frame, 'kitchen')
+
+
+	def test_subscribe_unsubscribe(self):
+		bus = AudioBus()
+		callback = mock.MagicMock()
+		bus.subscribe('kitchen', callback)
+		bus.subscribe('kitchen', callback)
+		bus.subscribe('bathroom', callback)
+		self.assertEqual(bus.subscribers, 2)
+
+		bus.unsubscribe(callback, 'bathroom')
+		bus.publish(AudioFrame(pcm=b'\x00\x01'), 'bathroom')
+		callback.assert_not_called()
+		bus.publish(AudioFrame(pcm=b'\x00\x01'), 'kitchen')
+		callback.assert_called_once()
+
+		bus.subscribe(None, callback)
+		bus.unsubscribe(callback)
+		self.assertEqual(bus.subscribers, 0)
+
+
+	@mock.patch('core.server.model.AudioBus.AudioBus.logError')
+	def test_failing_subscriber(self, mock_logError):
+		bus = AudioBus()
+		failing = mock.MagicMock(side_effect=ValueError('boom'))
+		working = mock.MagicMock()
+		bus.subscribe(None, failing)
+		bus.subscribe('kitchen', working)
+
+		bus.publish(AudioFrame(pcm=b'\x00\x01'), 'kitchen')
+		working.assert_called_once()
+		mock_logError.assert_called_once()
+
+
+	def test_local_devices(self):
+		bus = AudioBus()
+		bus.addLocalDevice('kitchen')
+		self.assertTrue(bus.isLocal('kitchen'))
+		self.assertFalse(bus.isLocal('bathroom'))
+
+		bus.removeLocalDevice('kitchen')
+		self.assertFalse(bus.isLocal('kitchen'))
@@ -0,0 +1,75 @@
+#  Copyright (c) 2021
+#
+#  This file, test_AudioFrame.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+import io
+import unittest
+import wave
+
+from core.server.model.AudioFrame import AudioFrame
+
+
+class TestAudioFrame(unittest.TestCase):
+
+	def test_encode(self):
+		payload = AudioFrame.encode(pcm=b'\x01\x02\x03\x04', sampleRate=16000, sequence=5)
+		self.assertEqual(len(payload), AudioFrame.HEADER.size + 4)
+		self.assertTrue(payload.startswith(AudioFrame.MAGIC))
+
+
+	def test_fromPayload(self):
+		frame = AudioFrame.fromPayload(AudioFrame.encode(pcm=b'\x01\x02\x03\x04', sampleRate=8000, sequence=2 ** 32 + 3))
+		self.assertEqual(frame.pcm, b'\x01\x02\x03\x04')
+		self.assertEqual(frame.sampleRate, 8000)
+		self.assertEqual(frame.channels, 1)
+		self.assertEqual(frame.sampleWidth, 2)
+		self.assertEqual(frame.sequence, 3)
+		self.assertFalse(frame.legacy)
+		self.assertEqual(len(frame), 2)
+
+		self.assertIsNone(AudioFrame.fromPayload(b''))
+		self.assertIsNone(AudioFrame.fromPayload(b'garbage'))
+		self.assertIsNone(AudioFrame.fromPayload(AudioFrame.MAGIC))
+
+
+	def test_fromPayload_legacy(self):
+		with io.BytesIO() as buffer:
+			with wave.open(buffer, 'wb') as wav:
+				wav.setnchannels(1)
+				wav.setsampwidth(2)
+				wav.setframerate(16000)
+				wav.writeframes(b'\x05\x06' * 320)
+			payload = buffer.getvalue()
+
+		frame = AudioFrame.fromPayload(payload)
+		self.assertTrue(frame.legacy)
+		self.assertEqual(frame.pcm, b'\x05\x06' * 320)
+		self.assertEqual(frame.sampleRate, 16000)
+		self.assertEqual(len(frame), 320)
+
+
+	def test_toWav(self):
+		frame = AudioFrame(pcm=b'\x07\x08' * 10, sampleRate=22050)
+		decoded = AudioFrame.fromPayload(frame.toWav())
+		self.assertTrue(decoded.legacy)
+		self.assertEqual(decoded.pcm, frame.pcm)
+		self.assertEqual(decoded.sampleRate, 22050)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,111 @@
+#  Copyright (c) 2021
+#
+#  This file, test_AudioPlayer.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import io
+import unittest
+import wave
+from unittest import mock
+
+from core.server.model.AudioPlayer import AudioPlayer, PlaybackClip
+
+
+class TestAudioPlayer(unittest.TestCase):
+
+	@staticmethod
+	def clip(pcm: bytes, requestId: str, sampleRate: int = 16000) -> PlaybackClip:
+		return PlaybackClip(pcm=pcm, channels=1, sampleRate=sampleRate, sampleWidth=2, deviceUid='device', requestId=requestId)
+
+
+	def test_from_wav(self):
+		with io.BytesIO() as buffer:
+			with wave.open(buffer, 'wb') as wav:
+				wav.setnchannels(2)
+				wav.setsampwidth(2)
+				wav.setframerate(22050)
+				wav.writeframes(b'\x01\x02\x03\x04')
+
+			clip = PlaybackClip.fromWav(buffer.getvalue(), deviceUid='device', requestId='request')
+
+		self.assertEqual(clip.pcm, b'\x01\x02\x03\x04')
+		self.assertEqual(clip.format, (2, 22050, 2))
+
+
+	@mock.patch.object(AudioPlayer, '_startNext')
+	def test_fill_gapless(self, _startNext):
+		player = AudioPlayer(onClipFinished=mock.MagicMock())
+		player._format = (1, 16000, 2)
+		first, second, other = self.clip(b'\x01\x01\x01', 'first'), self.clip(b'\x02\x02\x02', 'second'), self.clip(b'\x03\x03', 'other', 8000)
+		for clip in (first, second, other):
+			player.play(clip)
+
+		outData = bytearray(4)
+		player._fill(outData, 2, None, None)
+		self.assertEqual(outData, b'\x01\x01\x01\x02')
+
+		player._fill(outData, 2, None, None)
+		self.assertEqual(outData, b'\x02\x02\x00\x00')  # The next clip needs another stream
+		self.assertEqual([player._finished.get_nowait(), player._finished.get_nowait()], [first, second])
+		self.assertTrue(player.busy)
+
+
+	@mock.patch.object(AudioPlayer, '_startNext')
+	def test_cancel(self, _startNext):
+		player = AudioPlayer(onClipFinished=mock.MagicMock())
+		player._format = (1, 16000, 2)
+		first, second = self.clip(b'\x01\x01\x01\x01', 'first'), self.clip(b'\x02\x02', 'second')
+		player.play(first)
+		player.play(second)
+		player._fill(bytearray(2), 1, None, None)
+
+		player.cancel()
+		self.assertFalse(player.busy)
+		self.assertEqual([player._finished.get_nowait(), player._finished.get_nowait()], [first, second])
+		self.assertTrue(first.cancelled and second.cancelled)
+
+
+	@mock.patch.object(AudioPlayer, 'logError')
+	def test_stream_failure(self, _logError):
+		sounddevice = mock.MagicMock()
+		sounddevice.RawOutputStream.side_effect = OSError('PortAudio error: no device')
+		onClipFinished = mock.MagicMock()
+
+		with mock.patch.dict('sys.modules', {'sounddevice': sounddevice}):
+			player = AudioPlayer(onClipFinished=onClipFinished)
+			player.start()
+			first, second = self.clip(b'\x01\x01', 'first'), self.clip(b'\x02\x02', 'second')
+			player.play(first)
+			player.play(second)
+
+			self.assertFalse(player.busy)
+			player.stop()
+			player._notifier.join(timeout=2)
+
+		self.assertEqual([call[0][0] for call in onClipFinished.call_args_list], [first, second])
+		self.assertTrue(first.cancelled and second.cancelled)
+
+		# Once the device is back, clips play again
+		stream = mock.MagicMock(latency=0)
+		sounddevice.RawOutputStream.side_effect = None
+		sounddevice.RawOutputStream.return_value = stream
+		with mock.patch.dict('sys.modules', {'sounddevice': sounddevice}):
+			player.play(self.clip(b'\x03\x03', 'third'))
+
+		stream.start.assert_called_once()
+		self.assertTrue(player.busy)
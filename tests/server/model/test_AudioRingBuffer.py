@@ -0,0 +1,56 @@
+#  Copyright (c) 2021
+#
+#  This file, test_AudioRingBuffer.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import threading
+import unittest
+
+from core.server.model.AudioRingBuffer import AudioRingBuffer
+
+
+class TestAudioRingBuffer(unittest.TestCase):
+
+	def test_read_write(self):
+		ring = AudioRingBuffer(frameSize=2, capacity=3)
+		for frame in (b'\x00\x01', b'\x02\x03', b'\x04\x05'):
+			self.assertTrue(ring.write(frame))
+
+		self.assertFalse(ring.write(b'\x06\x07'))
+		self.assertEqual(ring.overruns, 1)
+		self.assertEqual(ring.available, 3)
+
+		self.assertEqual(ring.read(), b'\x00\x01')
+		self.assertTrue(ring.write(b'\x08\x09'))
+		self.assertEqual([ring.read() for _ in range(3)], [b'\x02\x03', b'\x04\x05', b'\x08\x09'])
+		self.assertIsNone(ring.read(timeout=0.01))
+
+
+	def test_read_waits(self):
+		ring = AudioRingBuffer(frameSize=1, capacity=2)
+		timer = threading.Timer(0.05, ring.write, args=[b'\x01'])
+		timer.start()
+		self.assertEqual(ring.read(timeout=2), b'\x01')
+		timer.join()
+
+
+	def test_clear(self):
+		ring = AudioRingBuffer(frameSize=1, capacity=2)
+		ring.write(b'\x01')
+		ring.clear()
+		self.assertEqual(ring.available, 0)
@@ -0,0 +1,74 @@
+#  Copyright (c) 2021
+#
+#  This file, test_MqttEnvelope.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import json
+import unittest
+from unittest import mock
+
+from paho.mqtt.client import MQTTMessage
+
+from core.server.model.MqttEnvelope import MqttEnvelope
+
+
+class TestMqttEnvelope(unittest.TestCase):
+
+	@staticmethod
+	def message(payload) -> MQTTMessage:
+		message = MQTTMessage(mid=3, topic=b'hermes/intent/test')
+		message.payload = payload
+		message.qos = 1
+		return message
+
+
+	def test_wrap(self):
+		message = self.message(b'{}')
+		envelope = MqttEnvelope.wrap(message)
+		self.assertIsInstance(envelope, MQTTMessage)
+		self.assertEqual(envelope.topic, 'hermes/intent/test')
+		self.assertEqual(envelope.payload, b'{}')
+		self.assertEqual(envelope.mid, 3)
+		self.assertEqual(envelope.qos, 1)
+		self.assertIs(MqttEnvelope.wrap(envelope), envelope)
+
+
+	def test_parses_once(self):
+		payload = {
+			'sessionId' : 'unittest',
+			'customData': json.dumps({'key': 'value'}),
+			'slots'     : [{'slotName': 'Name', 'rawValue': 'raw', 'value': {'value': 'value'}, 'entity': 'entity', 'range': {'start': 0, 'end': 3}}]
+		}
+		envelope = MqttEnvelope.wrap(self.message(json.dumps(payload)))
+
+		with mock.patch('core.server.model.MqttEnvelope.json.loads', wraps=json.loads) as loads:
+			for _ in range(2):
+				self.assertEqual(envelope.sessionId, 'unittest')
+				self.assertEqual(envelope.slots, {'Name': 'raw'})
+				self.assertEqual(envelope.slotsAsObjects['Name'][0].value, {'value': 'value'})
+				self.assertEqual(envelope.customData, {'key': 'value'})
+
+			# Once for the payload, once for the custom data
+			self.assertEqual(loads.call_count, 2)
+
+
+	def test_non_json_payload(self):
+		envelope = MqttEnvelope.wrap(self.message(b'true'))
+		self.assertEqual(envelope.data, {'test': True})
+		self.assertFalse(envelope.sessionId)
+		self.assertEqual(envelope.slots, dict())
@@ -0,0 +1,65 @@
+#  Copyright (c) 2021
+#
+#  This file, test_PcmReblocker.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+
+import unittest
+
+import numpy as np
+
+from core.server.model.PcmReblocker import PcmReblocker
+
+
+class TestPcmReblocker(unittest.TestCase):
+
+	def test_feed(self):
+		reblocker = PcmReblocker(blockSize=4)
+		samples = np.arange(10, dtype=np.int16)
+
+		blocks = [block.copy() for block in reblocker.feed(samples[:6])]
+		self.assertEqual([block.tolist() for block in blocks], [[0, 1, 2, 3]])
+		self.assertEqual(reblocker.pending, 2)
+
+		blocks = [block.copy() for block in reblocker.feed(samples[6:7])]
+		self.assertEqual(blocks, [])
+		self.assertEqual(reblocker.pending, 3)
+
+		blocks = [block.copy() for block in reblocker.feed(samples[7:])]
+		self.assertEqual([block.tolist() for block in blocks], [[4, 5, 6, 7]])
+		self.assertEqual(reblocker.pending, 2)
+
+
+	def test_whole_blocks_are_views(self):
+		reblocker = PcmReblocker(blockSize=4)
+		samples = np.arange(8, dtype=np.int16)
+
+		blocks = list(reblocker.feed(samples))
+		self.assertEqual(len(blocks), 2)
+		self.assertTrue(all(np.shares_memory(block, samples) for block in blocks))
+		self.assertEqual(reblocker.pending, 0)
+
+
+	def test_clear(self):
+		reblocker = PcmReblocker(blockSize=4)
+		list(reblocker.feed(np.arange(3, dtype=np.int16)))
+		reblocker.clear()
+		self.assertEqual(reblocker.pending, 0)
+
+		blocks = [block.tolist() for block in reblocker.feed(np.arange(10, 14, dtype=np.int16))]
+		self.assertEqual(blocks, [[10, 11, 12, 13]])
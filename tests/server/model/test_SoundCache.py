@@ -0,0 +1,57 @@
+#  Copyright (c) 2021
+#
+#  This file, test_SoundCache.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from core.server.model.SoundCache import SoundCache
+
+
+class TestSoundCache(unittest.TestCase):
+
+	def test_get(self):
+		with tempfile.TemporaryDirectory() as directory:
+			file = Path(directory, 'sound.wav')
+			file.write_bytes(b'1234')
+
+			cache = SoundCache()
+			self.assertEqual(cache.get(file), b'1234')
+			self.assertEqual(cache.size, 4)
+
+			file.write_bytes(b'123456')
+			self.assertEqual(cache.get(file), b'123456')
+			self.assertEqual(cache.size, 6)
+
+			file.unlink()
+			self.assertIsNone(cache.get(file))
+			self.assertEqual(cache.size, 0)
+
+
+	def test_evict(self):
+		with tempfile.TemporaryDirectory() as directory:
+			cache = SoundCache(maxSize=10, maxFileSize=6)
+			for name in ('a', 'b', 'c'):
+				Path(directory, f'{name}.wav').write_bytes(b'1234')
+			Path(directory, 'big.wav').write_bytes(b'1234567')
+
+			cache.preload(Path(directory))
+			self.assertEqual(cache.size, 8)
+			self.assertEqual(list(cache._entries), [Path(directory, 'b.wav'), Path(directory, 'c.wav')])
@@ -18,6 +18,11 @@
 #  Last modified: 2021.04.13 at 12:56:51 CEST
 
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.commons import constants
+from core.server.MqttManager import MqttManager
+from core.server.model.AudioFrame import AudioFrame
 
 
 class TestMqttManager(TestCase):
@@ -30,6 +35,10 @@ class TestMqttManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
+	def test_enveloped(self):
+		pass  # To be implemented or nothing to test()
+
+
 	def test_on_log(self):
 		pass  # To be implemented or nothing to test()
 
@@ -58,6 +67,29 @@ class TestMqttManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
+	@patch('core.base.SuperManager.SuperManager')
+	def test_on_mqtt_message_audio_frame(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'MqttManager'
+		mock_instance.audioManager.audioBus.isLocal.return_value = False
+
+		manager = MqttManager()
+		manager.logError = MagicMock()
+		topic = constants.TOPIC_AUDIO_FRAME.format('satellite')
+
+		# A frame without samples has no length, it is still a valid frame
+		empty = AudioFrame(pcm=b'')
+		manager.onMqttMessage(None, None, MagicMock(topic=topic, payload=empty.toPayload()))
+		mock_instance.audioManager.dispatchAudioFrame.assert_called_once()
+		self.assertEqual(b'', mock_instance.audioManager.dispatchAudioFrame.call_args[1]['frame'].pcm)
+
+		mock_instance.audioManager.dispatchAudioFrame.reset_mock()
+		manager.onMqttMessage(None, None, MagicMock(topic=topic, payload=b'garbage'))
+		mock_instance.audioManager.dispatchAudioFrame.assert_not_called()
+		manager.logError.assert_called_once()
+
+
 	def test_on_mqtt_message(self):
 		pass  # To be implemented or nothing to test()
 
@@ -224,3 +256,33 @@ class TestMqttManager(TestCase):
 
 	def test_get_default_site_id(self):
 		pass  # To be implemented or nothing to test()
+
+
+	@patch('core.server.MqttManager.time.monotonic')
+	@patch('core.server.MqttManager.MqttManager.broadcast')
+	@patch('core.base.SuperManager.SuperManager')
+	def test_topic_play_bytes_streaming(self, mock_superManager, mock_broadcast, mock_monotonic):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'MqttManager'
+		mock_monotonic.return_value = 100
+
+		def chunk(requestId: str, index: int, isLast: bool, payload: bytes) -> MagicMock:
+			return MagicMock(topic=f'hermes/audioServer/device/playBytesStreaming/{requestId}/{index}/{int(isLast)}', payload=payload)
+
+		manager = MqttManager()
+		manager.topicPlayBytesStreaming(None, None, chunk('request', 1, False, b'b'))
+		manager.topicPlayBytesStreaming(None, None, chunk('request', 0, False, b'a'))
+		manager.topicPlayBytesStreaming(None, None, chunk('request', 2, True, b'c'))
+		mock_broadcast.assert_called_once_with(method='playBytes', exceptions='MqttManager', propagateToSkills=True, payload=b'abc', deviceUid='device', sessionId='request')
+		self.assertFalse(manager._soundStreams)
+
+		# A stream whose last chunk got lost is forgotten after a while
+		manager.topicPlayBytesStreaming(None, None, chunk('lost', 0, False, b'a'))
+		mock_monotonic.return_value = 100 + MqttManager.SOUND_STREAM_TIMEOUT + 1
+		manager.topicPlayBytesStreaming(None, None, chunk('other', 0, False, b'a'))
+		self.assertEqual(list(manager._soundStreams), ['other'])
+
+
+	def test_stream_sound(self):
+		pass  # To be implemented or nothing to test()
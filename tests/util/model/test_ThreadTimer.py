@@ -17,8 +17,58 @@
 #
 #  Last modified: 2021.04.13 at 12:56:52 CEST
 
+import threading
 from unittest import TestCase
 
+from core.util.model.ThreadTimer import ThreadTimer
+from core.util.model.TimerScheduler import TimerScheduler
+
 
 class TestThreadTimer(TestCase):
-	pass
+
+	def setUp(self) -> None:
+		self.scheduler = TimerScheduler(dispatch=self.dispatch, workers=2)
+
+
+	def tearDown(self) -> None:
+		self.scheduler.stop()
+
+
+	@staticmethod
+	def dispatch(timer: ThreadTimer):
+		if not timer.cancelled:
+			timer.callback(*timer.args, **timer.kwargs)
+		timer.finish()
+
+
+	def test_join(self):
+		fired = threading.Event()
+		timer = ThreadTimer(callback=fired.set, interval=0.05, scheduler=self.scheduler)
+
+		with self.assertRaises(RuntimeError):
+			timer.join()
+
+		timer.start()
+		timer.join(timeout=2)
+		self.assertTrue(fired.is_set())
+		self.assertFalse(timer.is_alive())
+
+		# Joining a cancelled timer doesn't wait for its deadline
+		timer = ThreadTimer(callback=fired.set, interval=60, scheduler=self.scheduler)
+		timer.start()
+		threading.Timer(0.05, timer.cancel).start()
+		timer.join(timeout=2)
+		self.assertTrue(timer.cancelled)
+		self.assertTrue(timer.done.is_set())
+
+
+	def test_is_alive(self):
+		timer = ThreadTimer(callback=lambda: None, interval=60, scheduler=self.scheduler)
+		self.assertFalse(timer.isAlive())
+
+		timer.start()
+		self.assertTrue(timer.isAlive())
+		self.assertTrue(timer.is_alive())
+
+		timer.cancel()
+		self.assertFalse(timer.isAlive())
@@ -0,0 +1,107 @@
+#  Copyright (c) 2021
+#
+#  This file, test_TimerScheduler.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import threading
+from unittest import TestCase
+
+from core.util.model.ThreadTimer import ThreadTimer
+from core.util.model.TimerScheduler import TimerScheduler
+
+
+class TestTimerScheduler(TestCase):
+
+	def setUp(self) -> None:
+		self.fired = list()
+		self.done = threading.Event()
+		self.scheduler = TimerScheduler(dispatch=self.dispatch, workers=2)
+
+
+	def tearDown(self) -> None:
+		self.scheduler.stop()
+
+
+	def dispatch(self, timer: ThreadTimer):
+		if not timer.cancelled:
+			timer.callback(*timer.args, **timer.kwargs)
+		timer.finished = True
+
+
+	def fire(self, name: str, last: bool = False):
+		self.fired.append(name)
+		if last:
+			self.done.set()
+
+
+	def test_schedule(self):
+		ThreadTimer(callback=self.fire, args=['late', True], interval=0.1, scheduler=self.scheduler).start()
+		ThreadTimer(callback=self.fire, args=['early'], interval=0.01, scheduler=self.scheduler).start()
+
+		self.assertTrue(self.done.wait(timeout=2))
+		self.assertListEqual(self.fired, ['early', 'late'])
+
+
+	def test_cancel(self):
+		timer = ThreadTimer(callback=self.fire, args=['cancelled'], interval=0.01, scheduler=self.scheduler)
+		timer.start()
+		self.assertTrue(timer.is_alive())
+
+		timer.cancel()
+		self.assertFalse(timer.is_alive())
+
+		ThreadTimer(callback=self.fire, args=['kept', True], interval=0.05, scheduler=self.scheduler).start()
+		self.assertTrue(self.done.wait(timeout=2))
+		self.assertListEqual(self.fired, ['kept'])
+
+
+	def test_cancel_while_running(self):
+		running = threading.Event()
+		release = threading.Event()
+
+		def block():
+			running.set()
+			release.wait(timeout=2)
+
+		timer = ThreadTimer(callback=block, interval=0, scheduler=self.scheduler)
+		timer.start()
+		self.assertTrue(running.wait(timeout=2))
+
+		# The timer already left the heap, cancelling it must not count against the pending ones
+		timer.cancel()
+		release.set()
+		self.assertEqual(self.scheduler.pending, 0)
+
+		ThreadTimer(callback=self.fire, args=['queued'], interval=10, scheduler=self.scheduler).start()
+		self.assertEqual(self.scheduler.pending, 1)
+
+
+	def test_skill_workers(self):
+		threads = dict()
+
+		def record(name: str, last: bool = False):
+			threads[name] = threading.current_thread().name
+			if last:
+				self.done.set()
+
+		ThreadTimer(callback=record, args=['core'], interval=0, scheduler=self.scheduler).start()
+		ThreadTimer(callback=record, args=['skill', True], interval=0.05, scheduler=self.scheduler, skill=True).start()
+
+		self.assertTrue(self.done.wait(timeout=2))
+		self.assertTrue(threads['core'].startswith('timerWorker'))
+		self.assertTrue(threads['skill'].startswith('skillTimerWorker'))
@@ -17,20 +17,84 @@
 #
 #  Last modified: 2021.04.13 at 12:56:52 CEST
 
-from unittest import TestCase
+import tempfile
+import threading
+from pathlib import Path
+from unittest import TestCase, mock
+from unittest.mock import MagicMock, patch
+
+from core.util.DatabaseManager import DatabaseManager
 
 
 class TestDatabaseManager(TestCase):
 
+	@staticmethod
+	def newManager(mock_superManager) -> DatabaseManager:
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'unittest'
+		mock_instance.configManager.getAliceConfigByName.return_value = False
+
+		manager = DatabaseManager()
+		manager.initDB(schema={'rows': ['id INTEGER PRIMARY KEY', 'text TEXT NOT NULL']}, callerName='unittest')
+		return manager
+
+
+	@staticmethod
+	def count(manager: DatabaseManager) -> int:
+		return len(manager.fetch(tableName='rows', query='SELECT * FROM :__table__', callerName='unittest'))
+
+
 	def test_on_start(self):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_clear_db(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.base.SuperManager.SuperManager')
+	def test_clear_db(self, mock_superManager):
+		with tempfile.TemporaryDirectory() as tempDir, mock.patch('core.commons.constants.DATABASE_FILE', str(Path(tempDir, 'system/database/data.db'))):
+			Path(tempDir, 'system/database').mkdir(parents=True)
+			manager = self.newManager(mock_superManager)
+			mock_superManager.getInstance.return_value.commonsManager.rootDir.return_value = tempDir
+			manager.enableWriteAheadLog()
+
+			manager.clearDB()
+			for suffix in ('', '-wal', '-shm'):
+				self.assertFalse(Path(tempDir, f'system/database/data.db{suffix}').exists())
+
 
+	@patch('core.base.SuperManager.SuperManager')
+	def test_get_connection(self, mock_superManager):
+		with tempfile.TemporaryDirectory() as tempDir, mock.patch('core.commons.constants.DATABASE_FILE', str(Path(tempDir, 'data.db'))):
+			manager = self.newManager(mock_superManager)
 
-	def test_get_connection(self):
+			connection = manager.getConnection()
+			manager.releaseConnection(connection)
+			self.assertIs(manager.getConnection(), connection)
+			manager.releaseConnection(connection)
+
+			used = list()
+			barrier = threading.Barrier(DatabaseManager.POOL_SIZE * 2)
+
+			def work():
+				database = manager.getConnection()
+				used.append(database)
+				barrier.wait(timeout=5)
+				database.execute('SELECT 1').fetchone()
+				manager.releaseConnection(database)
+
+			threads = [threading.Thread(target=work) for _ in range(DatabaseManager.POOL_SIZE * 2)]
+			for thread in threads:
+				thread.start()
+			for thread in threads:
+				thread.join()
+
+			self.assertIn(connection, used)
+			self.assertEqual(len(set(map(id, used))), DatabaseManager.POOL_SIZE * 2)
+			self.assertEqual(manager._pool.qsize(), DatabaseManager.POOL_SIZE)
+			manager.closeConnections()
+
+
+	def test_release_connection(self):
 		pass  # To be implemented or nothing to test()
 
 
@@ -50,6 +114,78 @@ class TestDatabaseManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
+	@patch('core.base.SuperManager.SuperManager')
+	def test_insert_many(self, mock_superManager):
+		with tempfile.TemporaryDirectory() as tempDir, mock.patch('core.commons.constants.DATABASE_FILE', str(Path(tempDir, 'data.db'))):
+			manager = self.newManager(mock_superManager)
+
+			self.assertEqual(manager.insertMany(tableName='rows', callerName='unittest', values=[{'text': str(index)} for index in range(120)]), 120)
+			self.assertEqual(self.count(manager), 120)
+			manager.closeConnections()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_execute_batch(self, mock_superManager):
+		with tempfile.TemporaryDirectory() as tempDir, mock.patch('core.commons.constants.DATABASE_FILE', str(Path(tempDir, 'data.db'))):
+			manager = self.newManager(mock_superManager)
+
+			self.assertTrue(manager.executeBatch(tableName='rows', callerName='unittest', statements=[
+				('INSERT INTO :__table__ (text) VALUES (:text)', [{'text': 'a'}, {'text': 'b'}]),
+				('DELETE FROM :__table__ WHERE text = :text', {'text': 'a'})
+			]))
+			self.assertEqual(self.count(manager), 1)
+
+			# A failing statement rolls the whole batch back
+			self.assertFalse(manager.executeBatch(tableName='rows', callerName='unittest', statements=[
+				('INSERT INTO :__table__ (text) VALUES (:text)', [{'text': 'c'}]),
+				('INSERT INTO :__table__ (text) VALUES (:text)', [{'text': None}])
+			]))
+			self.assertEqual(self.count(manager), 1)
+			manager.closeConnections()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_queue_insert(self, mock_superManager):
+		with tempfile.TemporaryDirectory() as tempDir, mock.patch('core.commons.constants.DATABASE_FILE', str(Path(tempDir, 'data.db'))):
+			manager = self.newManager(mock_superManager)
+			threadManager = mock_superManager.getInstance.return_value.threadManager
+
+			for index in range(3):
+				manager.queueInsert(tableName='rows', callerName='unittest', values={'text': str(index)})
+
+			threadManager.newTimer.assert_called_once()
+			self.assertEqual(sum(len(rows) for rows in manager._queuedInserts.values()), 3)
+
+			# Reading the table writes what was queued for it first
+			self.assertEqual(self.count(manager), 3)
+			self.assertFalse(manager._queuedInserts)
+
+			# A full batch is written right away
+			for index in range(DatabaseManager.BATCH_SIZE):
+				manager.queueInsert(tableName='rows', callerName='unittest', values={'text': str(index)})
+			self.assertFalse(manager._queuedInserts)
+			manager.closeConnections()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_flush_queued_inserts(self, mock_superManager):
+		with tempfile.TemporaryDirectory() as tempDir, mock.patch('core.commons.constants.DATABASE_FILE', str(Path(tempDir, 'data.db'))):
+			manager = self.newManager(mock_superManager)
+
+			manager.queueInsert(tableName='rows', callerName='unittest', values={'text': 'a'})
+			manager.queueInsert(tableName='rows', callerName='unittest', values={'text': 'b'})
+			manager.onStop()
+
+			self.assertFalse(manager._queuedInserts)
+			self.assertEqual(manager._pool.qsize(), 0)
+			self.assertEqual(self.count(manager), 2)
+			manager.closeConnections()
+
+
+	def test_build_insert_query(self):
+		self.assertEqual(DatabaseManager.buildInsertQuery({'text': 'a', 'deviceId': 1}), 'INSERT INTO :__table__ (text, deviceId) VALUES (:text, :deviceId)')
+
+
 	def test_update(self):
 		pass  # To be implemented or nothing to test()
 
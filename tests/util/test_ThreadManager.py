@@ -17,13 +17,36 @@
 #
 #  Last modified: 2021.04.13 at 12:56:52 CEST
 
+import threading
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.util.ThreadManager import ThreadManager
 
 
 class TestThreadManager(TestCase):
 
-	def test_on_stop(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.base.SuperManager.SuperManager')
+	def test_on_stop(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'ThreadManager'
+
+		manager = ThreadManager()
+		errors = list()
+
+		def restart():
+			try:
+				manager.onStop()
+			except Exception as e:
+				errors.append(e)
+
+		# A restart stops the managers from one of the threads the manager keeps track of
+		thread = manager.newThread(name='restart', target=restart)
+		thread.join(timeout=2)
+
+		self.assertFalse(thread.is_alive())
+		self.assertEqual(list(), errors)
 
 
 	def test_on_booted(self):
@@ -38,14 +61,60 @@ class TestThreadManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_new_timer(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.base.SuperManager.SuperManager')
+	def test_new_timer(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'ThreadManager'
+
+		manager = ThreadManager()
+		self.addCleanup(manager.onStop)
+
+		def skillCallback():
+			pass
+
+		skillCallback.__module__ = 'skills.AliceCore.AliceCore'
+
+		# Skill callbacks are kept apart from the core timers
+		self.assertTrue(manager.newTimer(interval=10, func=skillCallback).skill)
+		self.assertFalse(manager.newTimer(interval=10, func=manager.onQuarterHour).skill)
+		self.assertFalse(manager.newTimer(interval=10, func=print).skill)
 
 
 	def test_do_later(self):
 		pass  # To be implemented or nothing to test()
 
 
+	@patch('core.base.SuperManager.SuperManager')
+	def test_do_later_in_thread(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.commonsManager.getFunctionCaller.return_value = 'ThreadManager'
+
+		manager = ThreadManager()
+		self.addCleanup(manager.onStop)
+		release = threading.Event()
+		names = list()
+
+		def long(index: int):
+			names.append((index, threading.current_thread().name))
+			release.wait(timeout=5)
+
+		for index in range(ThreadManager.TIMER_WORKERS):
+			manager.doLaterInThread(interval=0, name=f'long_{index}', func=long, args=[index])
+
+		# Long callbacks don't hold the timer workers, short ones still run on time
+		fired = threading.Event()
+		manager.doLater(interval=0.01, func=fired.set)
+		self.assertTrue(fired.wait(timeout=2))
+
+		release.set()
+		for index in range(ThreadManager.TIMER_WORKERS):
+			manager._threads[f'long_{index}'].join(timeout=2)
+
+		self.assertEqual([(index, f'long_{index}') for index in range(ThreadManager.TIMER_WORKERS)], sorted(names))
+
+
 	def test_on_timer_end(self):
 		pass  # To be implemented or nothing to test()
 
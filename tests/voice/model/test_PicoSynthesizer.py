@@ -0,0 +1,61 @@
+#  Copyright (c) 2021
+#
+#  This file, test_PicoSynthesizer.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core.voice.model import PicoSynthesizer
+
+
+class TestPicoSynthesizer(unittest.TestCase):
+
+	def test_serve(self):
+		engine = MagicMock()
+		engine.synthesize.side_effect = [None, RuntimeError('Pico error'), None]
+		factory = MagicMock(return_value=engine)
+		answers = list()
+
+		requests = [
+			json.dumps({'lang': 'en-US', 'text': 'one', 'file': 'one.wav'}),
+			'',
+			json.dumps({'lang': 'en-US', 'text': 'two', 'file': 'two.wav'}),
+			json.dumps({'lang': 'de-DE', 'text': 'drei', 'file': 'drei.wav'})
+		]
+		PicoSynthesizer.serve(requests, answers.append, factory)
+
+		self.assertEqual(answers, [{'ok': True}, {'ok': False, 'error': 'Pico error'}, {'ok': True}])
+
+		# Voices are loaded once, on their first request
+		self.assertEqual([call[0][0] for call in factory.call_args_list], ['en-US', 'de-DE'])
+		engine.synthesize.assert_called_with('drei', 'drei.wav')
+
+
+	@patch('core.voice.model.PicoSynthesizer.ctypes.util.find_library', return_value=None)
+	def test_main_without_library(self, _mock_findLibrary):
+		with patch('sys.stdout') as stdout:
+			PicoSynthesizer.main()
+
+		self.assertFalse(json.loads(stdout.write.call_args[0][0])['ready'])
+
+
+	def test_unsupported_language(self):
+		with self.assertRaises(ValueError):
+			PicoSynthesizer.PicoEngine(MagicMock(), 'xx-XX')
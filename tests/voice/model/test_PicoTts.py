@@ -17,7 +17,19 @@
 #
 #  Last modified: 2021.04.13 at 12:56:52 CEST
 
+from pathlib import Path
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.voice.model.PicoTts import PicoTts
+
+
+def newTts() -> PicoTts:
+	tts = PicoTts()
+	tts._lang = 'en-US'
+	tts.logError = MagicMock()
+	tts.logDebug = MagicMock()
+	return tts
 
 
 class TestPicoTts(TestCase):
@@ -28,3 +40,32 @@ class TestPicoTts(TestCase):
 
 	def test_on_say(self):
 		pass  # To be implemented or nothing to test()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test__generate(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		pool = mock_instance.ttsManager.synthesisPool.return_value
+		tts = newTts()
+
+		pool.run.return_value = (True, '')
+		self.assertTrue(tts._generate(text='hello', file=Path('hello.wav')))
+		pool.run.assert_called_once_with({'lang': 'en-US', 'text': 'hello', 'file': 'hello.wav'})
+		mock_instance.commonsManager.runRootSystemCommand.assert_not_called()
+
+		pool.run.return_value = (False, 'Pico error')
+		self.assertFalse(tts._generate(text='hello', file=Path('hello.wav')))
+		tts.logError.assert_called_once()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test__generate_without_workers(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		mock_instance.ttsManager.synthesisPool.return_value = None
+		mock_instance.commonsManager.runRootSystemCommand.return_value = MagicMock(returncode=0)
+		tts = newTts()
+
+		self.assertTrue(tts._generate(text='hello', file=Path('hello.wav')))
+		mock_instance.commonsManager.runRootSystemCommand.assert_called_once_with(['pico2wave', '-l', 'en-US', '-w', 'hello.wav', 'hello'])
@@ -17,7 +17,34 @@
 #
 #  Last modified: 2021.04.13 at 12:56:52 CEST
 
-from unittest import TestCase
+import threading
+from unittest import TestCase, mock
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from core.server.model.PcmReblocker import PcmReblocker
+
+
+def newHandler() -> MagicMock:
+	handler = MagicMock()
+	handler.frame_length = 4
+	handler.process.return_value = -1
+	return handler
+
+
+def newEngine(mock_instance: MagicMock, pvporcupine: MagicMock):
+	mock_instance.threadManager.newEvent.return_value = threading.Event()
+	with mock.patch.dict('sys.modules', {'pyaudio': MagicMock(), 'pvporcupine': pvporcupine}):
+		from core.voice.model.PorcupineWakeword import PorcupineWakeword
+
+		engine = PorcupineWakeword()
+		engine._mainDeviceUid = 'main'
+		return engine
+
+
+def samples(count: int) -> bytes:
+	return np.zeros(count, dtype=np.int16).tobytes()
 
 
 class TestPorcupineWakeword(TestCase):
@@ -26,25 +53,149 @@ class TestPorcupineWakeword(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_on_stop(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.base.SuperManager.SuperManager')
+	def test_on_stop(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
 
+		handlers = list()
+		working = threading.Event()
 
-	def test_on_hotword_toggle_off(self):
-		pass  # To be implemented or nothing to test()
+		def create(**_kwargs):
+			handlers.append(newHandler())
+			working.set()
+			return handlers[-1]
 
+		pvporcupine = MagicMock()
+		pvporcupine.create.side_effect = create
+		engine = newEngine(mock_instance, pvporcupine)
+		working.clear()
 
-	def test_on_hotword_toggle_on(self):
-		pass  # To be implemented or nothing to test()
+		worker = threading.Thread(target=engine.worker)
+		worker.start()
+		engine._buffer.put(('satellite', samples(2)))
+		self.assertTrue(working.wait(timeout=2))
 
+		engine.onStop()
+		worker.join(timeout=2)
 
-	def test_on_audio_frame(self):
-		pass  # To be implemented or nothing to test()
+		self.assertFalse(worker.is_alive())
+		main, satellite = handlers
+		satellite.delete.assert_called_once()
+		main.delete.assert_not_called()
+		self.assertEqual(dict(), engine._satelliteHandlers)
+		self.assertEqual(dict(), engine._reblockers)
 
 
-	def test_worker(self):
-		pass  # To be implemented or nothing to test()
+	@patch('core.base.SuperManager.SuperManager')
+	def test_on_hotword_toggle_off(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+
+		engine = newEngine(mock_instance, MagicMock())
+		engine.onHotwordToggleOff('satellite', MagicMock())
+
+		self.assertIn('satellite', engine._muted)
+		self.assertEqual(('satellite', None), engine._buffer.get(block=False))
 
 
-	def test_audio_stream(self):
+	@patch('core.base.SuperManager.SuperManager')
+	def test_on_hotword_toggle_on(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+
+		engine = newEngine(mock_instance, MagicMock())
+		engine._muted.add('satellite')
+		engine.onHotwordToggleOn('satellite', MagicMock())
+
+		self.assertNotIn('satellite', engine._muted)
+		self.assertEqual(('satellite', None), engine._buffer.get(block=False))
+
+
+	def test_feed_audio_frame(self):
 		pass  # To be implemented or nothing to test()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_worker(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+
+		handler = newHandler()
+		pvporcupine = MagicMock()
+		pvporcupine.create.side_effect = [newHandler(), handler]
+		engine = newEngine(mock_instance, pvporcupine)
+
+		engine._buffer.put(('satellite', samples(6)))  # One block, two samples pending
+		engine._buffer.put(('satellite', None))  # Clearing drops the pending samples
+		engine._buffer.put(('satellite', samples(2)))
+		engine._buffer.put((None, None))
+		engine.worker()
+
+		handler.process.assert_called_once()
+		self.assertIsInstance(handler.process.call_args[0][0], list)
+		handler.delete.assert_called_once()
+		self.assertEqual(dict(), engine._satelliteHandlers)
+		self.assertEqual(dict(), engine._reblockers)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_on_wakeword_detected(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+
+		handler = newHandler()
+		handler.process.side_effect = [-1, 2]
+		pvporcupine = MagicMock()
+		pvporcupine.create.side_effect = [newHandler(), handler]
+		engine = newEngine(mock_instance, pvporcupine)
+
+		engine._buffer.put(('satellite', samples(10)))
+		engine._buffer.put(('satellite', samples(4)))  # Muted once the wakeword was heard
+		engine._buffer.put((None, None))
+
+		with patch.object(engine, 'onWakewordDetected', wraps=engine.onWakewordDetected) as onWakewordDetected:
+			engine.worker()
+
+		onWakewordDetected.assert_called_once_with(deviceUid='satellite', keywordIndex=2, handler=handler)
+		self.assertEqual(2, handler.process.call_count)
+		self.assertIn('satellite', engine._muted)
+		payload = mock_instance.mqttManager.publish.call_args[1]['payload']
+		self.assertEqual('satellite', payload['siteId'])
+		self.assertEqual('porcupine_2', payload['modelId'])
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test__get_handler(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+
+		pvporcupine = MagicMock()
+		pvporcupine.create.side_effect = lambda **kwargs: newHandler()
+		engine = newEngine(mock_instance, pvporcupine)
+
+		self.assertIs(engine._handler, engine._getHandler('main'))
+
+		handler = engine._getHandler('satellite')
+		self.assertIsNot(engine._handler, handler)
+		self.assertIs(handler, engine._getHandler('satellite'))
+		self.assertEqual(2, pvporcupine.create.call_count)
+
+		pvporcupine.create.side_effect = Exception('no more handles')
+		self.assertIsNone(engine._getHandler('other'))
+		self.assertNotIn('other', engine._satelliteHandlers)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test__clear_device(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+
+		engine = newEngine(mock_instance, MagicMock())
+		reblocker = PcmReblocker(blockSize=4)
+		list(reblocker.feed(np.zeros(3, dtype=np.int16)))
+		engine._reblockers['satellite'] = reblocker
+
+		engine._clearDevice('satellite')
+		engine._clearDevice('unknown')
+		self.assertEqual(0, reblocker.pending)
@@ -38,5 +38,5 @@ class TestPreciseWakeword(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_on_audio_frame(self):
+	def test_feed_audio_frame(self):
 		pass  # To be implemented or nothing to test()
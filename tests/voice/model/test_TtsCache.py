@@ -0,0 +1,116 @@
+#  Copyright (c) 2021
+#
+#  This file, test_TtsCache.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import tempfile
+import unittest
+import wave
+from pathlib import Path
+from unittest import mock
+from unittest.mock import MagicMock, PropertyMock
+
+from core.voice.model.TtsCache import TtsCache
+
+
+class TestTtsCache(unittest.TestCase):
+
+	def setUp(self) -> None:
+		self._tmp = tempfile.TemporaryDirectory()
+		self.root = Path(self._tmp.name)
+
+
+	def tearDown(self) -> None:
+		self._tmp.cleanup()
+
+
+	def makeWav(self, name: str, seconds: float) -> Path:
+		file = self.root / 'pico' / name
+		file.parent.mkdir(parents=True, exist_ok=True)
+		with wave.open(str(file), 'wb') as wav:
+			wav.setnchannels(1)
+			wav.setsampwidth(2)
+			wav.setframerate(16000)
+			wav.writeframes(b'\x00\x00' * int(16000 * seconds))
+		return file
+
+
+	@mock.patch('core.voice.model.TtsCache.TtsCache.ThreadManager', new_callable=PropertyMock)
+	@mock.patch('core.voice.model.TtsCache.TtsCache.budget', new_callable=PropertyMock)
+	def test_duration(self, mock_budget, mock_threadManager):
+		mock_budget.return_value = 1024 * 1024
+		mock_threadManager.return_value = MagicMock()
+
+		cache = TtsCache(self.root)
+		file = self.makeWav('a.wav', 0.5)
+
+		self.assertFalse(cache.contains(file))
+		self.assertEqual(cache.duration(file), 0.5)
+		self.assertTrue(cache.contains(file))
+
+		# Second hit comes from the index
+		with mock.patch.object(cache, '_readDuration') as mock_read:
+			self.assertEqual(cache.duration(file), 0.5)
+			mock_read.assert_not_called()
+
+
+	@mock.patch('core.voice.model.TtsCache.TtsCache.ThreadManager', new_callable=PropertyMock)
+	@mock.patch('core.voice.model.TtsCache.TtsCache.budget', new_callable=PropertyMock)
+	def test_evict(self, mock_budget, mock_threadManager):
+		mock_budget.return_value = 1024 * 1024
+		mock_threadManager.return_value = MagicMock()
+
+		cache = TtsCache(self.root)
+		first = self.makeWav('first.wav', 1)
+		second = self.makeWav('second.wav', 1)
+		cache.add(first)
+		cache.add(second)
+		cache.duration(first)
+
+		mock_budget.return_value = first.stat().st_size
+		third = self.makeWav('third.wav', 1)
+		cache.add(third)
+
+		self.assertTrue(third.exists())
+		self.assertFalse(second.exists())
+		self.assertFalse(first.exists())
+		self.assertEqual(cache.size, third.stat().st_size)
+
+
+	@mock.patch('core.voice.model.TtsCache.TtsCache.ThreadManager', new_callable=PropertyMock)
+	@mock.patch('core.voice.model.TtsCache.TtsCache.budget', new_callable=PropertyMock)
+	def test_missing_files(self, mock_budget, mock_threadManager):
+		mock_budget.return_value = 1024 * 1024
+		mock_threadManager.return_value = MagicMock()
+
+		cache = TtsCache(self.root)
+		first = self.makeWav('first.wav', 1)
+		second = self.makeWav('second.wav', 1)
+		cache.add(first)
+		cache.add(second)
+
+		# Files deleted behind the cache's back don't break removal nor eviction
+		first.unlink()
+		cache.remove(first)
+		self.assertFalse(cache.contains(first))
+
+		second.unlink()
+		mock_budget.return_value = 0
+		cache.evict()
+		self.assertFalse(cache.contains(second))
+		self.assertEqual(cache.size, 0)
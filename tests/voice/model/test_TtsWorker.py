@@ -0,0 +1,126 @@
+#  Copyright (c) 2021
+#
+#  This file, test_TtsWorker.py, is part of Project Alice.
+#
+#  Project Alice is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>
+#
+#  Last modified: 2021.10.18 at 11:02:17 CEST
+
+
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+from core.voice.model.TtsWorker import TtsWorker, TtsWorkerPool
+
+
+ECHO = """
+import json, sys, time
+print(json.dumps({'ready': True}), flush=True)
+for line in sys.stdin:
+	request = json.loads(line)
+	time.sleep(request.get('sleep', 0))
+	print(json.dumps({'ok': request['ok'], 'error': request.get('error', '')}), flush=True)
+"""
+
+UNAVAILABLE = """
+import json
+print(json.dumps({'ready': False, 'error': 'no synthesizer'}), flush=True)
+"""
+
+
+def newWorker(script: str = ECHO, timeout: float = 5) -> TtsWorker:
+	worker = TtsWorker(command=[sys.executable, '-c', script], timeout=timeout)
+	worker.logWarning = MagicMock()
+	return worker
+
+
+class TestTtsWorker(unittest.TestCase):
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_run(self, mock_superManager):
+		mock_superManager.getInstance.return_value = MagicMock()
+		worker = newWorker()
+		try:
+			self.assertTrue(worker.start())
+			process = worker._process
+			self.assertEqual(worker.run({'ok': True}), (True, ''))
+			self.assertEqual(worker.run({'ok': False, 'error': 'failed'}), (False, 'failed'))
+
+			# The same process served every request
+			self.assertIs(worker._process, process)
+			self.assertTrue(worker.alive)
+		finally:
+			worker.close()
+
+		self.assertFalse(worker.alive)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_restart_on_crash(self, mock_superManager):
+		mock_superManager.getInstance.return_value = MagicMock()
+		worker = newWorker()
+		try:
+			worker.start()
+			worker._process.kill()
+			worker._process.wait()
+
+			self.assertEqual(worker.run({'ok': True}), (True, ''))
+			self.assertEqual(worker.restarts, 1)
+		finally:
+			worker.close()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_timeout(self, mock_superManager):
+		mock_superManager.getInstance.return_value = MagicMock()
+		worker = newWorker(timeout=0.5)
+		try:
+			worker.start()
+			succeeded, _ = worker.run({'ok': True, 'sleep': 5})
+			self.assertFalse(succeeded)
+			self.assertFalse(worker.alive)
+			self.assertEqual(worker.run({'ok': True}), (True, ''))
+		finally:
+			worker.close()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_unavailable(self, mock_superManager):
+		mock_superManager.getInstance.return_value = MagicMock()
+		worker = newWorker(script=UNAVAILABLE)
+		try:
+			self.assertFalse(worker.start())
+			self.assertFalse(worker.run({'ok': True})[0])
+		finally:
+			worker.close()
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_pool(self, mock_superManager):
+		mock_superManager.getInstance.return_value = MagicMock()
+		pool = TtsWorkerPool(command=[sys.executable, '-c', ECHO], size=2)
+		try:
+			self.assertEqual(pool.size, 2)
+			self.assertTrue(pool.start())
+
+			# Two workers, two requests at a time at most
+			workers = [pool._idle.get(), pool._idle.get()]
+			self.assertTrue(pool._idle.empty())
+			for worker in workers:
+				pool._idle.put(worker)
+
+			self.assertEqual([pool.run({'ok': True}) for _ in range(3)], [(True, '')] * 3)
+		finally:
+			pool.close()
@@ -17,11 +17,31 @@
 #
 #  Last modified: 2021.04.13 at 12:56:52 CEST
 
+import tempfile
+import threading
 from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from core.voice.TTSManager import TTSManager
+
+
+def newManager(mock_instance: MagicMock) -> TTSManager:
+	configs = {'ttsInstances': 2, 'ttsInstanceIdleTimeout': 30, 'ttsWorkers': 2}
+	mock_instance.commonsManager.rootDir.return_value = tempfile.gettempdir()
+	mock_instance.configManager.getAliceConfigByName.side_effect = lambda name: configs[name]
+
+	manager = TTSManager()
+	manager._createTts = MagicMock(side_effect=lambda **kwargs: MagicMock(speaking=False))
+	return manager
+
+
+def newUser(tts: str = 'pico', voice: str = '') -> MagicMock:
+	return MagicMock(tts=tts, ttsLanguage='', ttsType='', ttsVoice=voice)
 
 
 class TestTTSManager(TestCase):
 
+
 	def test_on_start(self):
 		pass  # To be implemented or nothing to test()
 
@@ -38,6 +58,22 @@ class TestTTSManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
+	def test_cache(self):
+		pass  # To be implemented or nothing to test()
+
+
+	def test_trim_cache(self):
+		pass  # To be implemented or nothing to test()
+
+
+	def test_prewarm_cache(self):
+		pass  # To be implemented or nothing to test()
+
+
+	def test_static_talks(self):
+		pass  # To be implemented or nothing to test()
+
+
 	def test_on_internet_connected(self):
 		pass  # To be implemented or nothing to test()
 
@@ -48,3 +84,142 @@ class TestTTSManager(TestCase):
 
 	def test_on_say(self):
 		pass  # To be implemented or nothing to test()
+
+
+	def test__create_tts(self):
+		pass  # To be implemented or nothing to test()
+
+
+	def test_voice_profile(self):
+		self.assertEqual(TTSManager.voiceProfile(newUser(tts='Amazon', voice='Joanna')), ('amazon', '', '', 'Joanna'))
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_user_tts(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		manager = newManager(mock_instance)
+
+		first = manager.userTts(newUser())
+		self.assertIs(manager.userTts(newUser()), first)
+		manager._createTts.assert_called_once()
+
+		other = manager.userTts(newUser(voice='Joanna'))
+		self.assertIsNot(other, first)
+		self.assertEqual(manager._createTts.call_count, 2)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_user_tts_concurrent(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		manager = newManager(mock_instance)
+
+		creating = threading.Event()
+		release = threading.Event()
+
+		def createTts(userTTS: str, user: MagicMock):
+			if user.ttsVoice == 'slow':
+				creating.set()
+				release.wait(timeout=5)
+			return MagicMock(speaking=False)
+
+		manager._createTts.side_effect = createTts
+		results = list()
+		threads = [threading.Thread(target=lambda: results.append(manager.userTts(newUser(voice='slow')))) for _ in range(3)]
+		threads[0].start()
+		self.assertTrue(creating.wait(timeout=2))
+		for thread in threads[1:]:
+			thread.start()
+
+		# Another voice doesn't wait on the one being created
+		self.assertIsNotNone(manager.userTts(newUser(voice='other')))
+
+		release.set()
+		for thread in threads:
+			thread.join(timeout=2)
+
+		self.assertEqual(3, len(results))
+		self.assertTrue(all(tts is results[0] for tts in results))
+		self.assertEqual(2, manager._createTts.call_count)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_user_tts_evicts_least_recently_used(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		manager = newManager(mock_instance)
+
+		first = manager.userTts(newUser(voice='a'))
+		second = manager.userTts(newUser(voice='b'))
+		manager.userTts(newUser(voice='a'))
+		manager.userTts(newUser(voice='c'))
+
+		self.assertIs(manager.userTts(newUser(voice='a')), first)
+		self.assertIsNot(manager.userTts(newUser(voice='b')), second)
+
+
+	@patch('core.voice.TTSManager.time.monotonic')
+	@patch('core.base.SuperManager.SuperManager')
+	def test_user_tts_evicts_idle(self, mock_superManager, mock_monotonic):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		manager = newManager(mock_instance)
+
+		mock_monotonic.return_value = 1000
+		idle = manager.userTts(newUser(voice='a'))
+		speaking = manager.userTts(newUser(voice='b'))
+		speaking.speaking = True
+
+		mock_monotonic.return_value = 1000 + 31 * 60
+		self.assertIsNot(manager.userTts(newUser(voice='a')), idle)
+		self.assertIs(manager.userTts(newUser(voice='b')), speaking)
+
+
+	@patch('core.base.SuperManager.SuperManager')
+	def test_clear_instances(self, mock_superManager):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		manager = newManager(mock_instance)
+
+		first = manager.userTts(newUser())
+		manager.clearInstances()
+		self.assertIsNot(manager.userTts(newUser()), first)
+
+
+	@patch('core.voice.TTSManager.TtsWorkerPool')
+	@patch('core.base.SuperManager.SuperManager')
+	def test_synthesis_pool(self, mock_superManager, mock_pool):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		manager = newManager(mock_instance)
+		manager.logWarning = MagicMock()
+
+		mock_pool.return_value.start.return_value = True
+		pool = manager.synthesisPool(name='pico', command=['synthesizer'])
+		self.assertIs(pool, mock_pool.return_value)
+		self.assertIs(manager.synthesisPool(name='pico', command=['synthesizer']), pool)
+		mock_pool.assert_called_once_with(command=['synthesizer'], size=2)
+
+		# A synthesizer that can't be loaded isn't tried again
+		mock_pool.return_value.start.return_value = False
+		self.assertIsNone(manager.synthesisPool(name='other', command=['missing']))
+		self.assertIsNone(manager.synthesisPool(name='other', command=['missing']))
+		self.assertEqual(mock_pool.call_count, 2)
+
+
+	@patch('core.voice.TTSManager.TtsWorkerPool')
+	@patch('core.base.SuperManager.SuperManager')
+	def test_close_synthesis_pools(self, mock_superManager, mock_pool):
+		mock_instance = MagicMock()
+		mock_superManager.getInstance.return_value = mock_instance
+		manager = newManager(mock_instance)
+		mock_pool.return_value.start.return_value = True
+
+		manager.synthesisPool(name='pico', command=['synthesizer'])
+		manager.closeSynthesisPools()
+		mock_pool.return_value.close.assert_called_once()
+
+		# The next use starts new workers, with the new settings
+		manager.synthesisPool(name='pico', command=['synthesizer'])
+		self.assertEqual(mock_pool.call_count, 2)
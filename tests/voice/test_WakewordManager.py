@@ -34,7 +34,7 @@ class TestWakewordManager(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
-	def test_on_audio_frame(self):
+	def test_feed_audio_frame(self):
 		pass  # To be implemented or nothing to test()
 
 
@@ -19,6 +19,11 @@
 
 from unittest import TestCase
 
+import numpy as np
+from pydub import AudioSegment
+
+from core.voice.WakewordRecorder import WakewordRecorder
+
 
 class TestWakewordRecorder(TestCase):
 
@@ -58,6 +63,19 @@ class TestWakewordRecorder(TestCase):
 		pass  # To be implemented or nothing to test()
 
 
+	def test_detect_silence_edges(self):
+		quiet = np.full(1600, 10, dtype=np.int16)
+		loud = (np.sin(np.arange(4800) / 5) * 10000).astype(np.int16)
+		samples = np.concatenate((quiet, loud, quiet, quiet))
+		sound = AudioSegment(samples.tobytes(), frame_rate=16000, sample_width=2, channels=1)
+
+		self.assertEqual(WakewordRecorder.detectSilenceEdges(sound), (100, 200))
+		self.assertEqual(WakewordRecorder.detectSilenceEdges(sound, tuning=100), (len(sound), 0))
+
+		silence = AudioSegment.silent(duration=50, frame_rate=16000)
+		self.assertEqual(WakewordRecorder.detectSilenceEdges(silence), (0, 0))
+
+
 	def test_detect_leading_silence(self):
 		pass  # To be implemented or nothing to test()
 